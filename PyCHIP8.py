@@ -1,12 +1,28 @@
 import argparse
+import functools
 import logging
+import time
 from pathlib import Path
+from typing import Callable, Dict, Optional
 
 import pygame
 
+from PyCHIP8.audio import create_beeper
+from PyCHIP8.catalog import Catalog, map_rom
 from PyCHIP8.conf import Config
-from PyCHIP8.cpu import CPU
-from PyCHIP8.screen import Screen
+from PyCHIP8.cpu import CPU, state_template
+from PyCHIP8.debugger import Debugger, start_shell
+from PyCHIP8.emulation_thread import EmulationThread
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.keyboard import PygameKeypad
+from PyCHIP8.predecoder import PredecodedRunner
+from PyCHIP8.profiler import ProfiledCPU, SubsystemProfiler
+from PyCHIP8.quirks import PROFILES, parse_overrides, select_quirks
+from PyCHIP8.recorder import Recorder
+from PyCHIP8.screen import HeadlessScreen, Screen
+from PyCHIP8.shared_state import SharedStateWriter
+from PyCHIP8.telemetry import Telemetry
+from PyCHIP8.transpiler import CompiledProgram, CompiledRunner, compile_rom
 
 logging.basicConfig(level=logging.WARNING)
 
@@ -16,49 +32,458 @@ class PyCHIP8:
     Main class of the emulator
     """
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, threaded: bool = False, sound: bool = True, compiled: bool = False,
+                 quirks_profile: Optional[str] = None, quirks_overrides: Optional[Dict[str, bool]] = None,
+                 record: Optional[str] = None, debug: bool = False, debug_port: Optional[int] = None,
+                 overlay: bool = False, predecoded: bool = False, export: Optional[str] = None, watch: bool = False,
+                 profile: Optional[str] = None, cprofile_seconds: Optional[float] = None, run_ahead: int = 0):
         """
         PyCHIP8 class constructor, its only purpose is to initialize CPU and Screen objects
 
         :param path: Path to file containing CHIP8 game or program
+        :param threaded: If True CPU runs on a separate thread and main thread only handles events and presentation,
+                         defaults to False
+        :param sound: If False no sound is played, defaults to True
+        :param compiled: If True ROM is translated to Python code (or loaded from cache) before running,
+                         defaults to False
+        :param quirks_profile: Name of quirk profile (see PyCHIP8.quirks.PROFILES), defaults to None (profile is
+                               selected by ROM hash)
+        :param quirks_overrides: Quirks set on top of selected profile, defaults to None
+        :param record: Path to which displayed frames are recorded, defaults to None (no recording)
+        :param debug: If True emulator starts paused with debugger shell on console, defaults to False
+        :param debug_port: If given debugger shell is served on this TCP port on localhost instead of console,
+                           defaults to None
+        :param overlay: If True runtime statistics are drawn over displayed image, defaults to False
+        :param predecoded: If True instructions are decoded once per address and common sequences are executed as
+                           single steps, ignored when compiled is True, defaults to False
+        :param export: Name of shared memory segment to which frames and CPU state are published, defaults to None
+                       (nothing is published)
+        :param watch: If True ROM is loaded again whenever its file changes, defaults to False
+        :param profile: Path to which time spent in fetching, executing, drawing, presenting, event handling and
+                        sleeping is written as JSON when emulator stops, defaults to None (nothing is measured)
+        :param cprofile_seconds: If given together with profile, thread running emulation is also profiled with cProfile
+                                 for this many seconds, defaults to None
+        :param run_ahead: Number of frames emulated ahead of every displayed frame to hide input latency, used only
+                          when threaded is True, defaults to 0 (no frames are emulated ahead)
         """
-        self.screen = Screen()
-        self.cpu = CPU(self.screen)
+        self.threaded = threaded
+        self.run_ahead = run_ahead
+        self.compiled = compiled
+        self.predecoded = predecoded
+        self.window = Screen()
+        self.screen = HeadlessScreen() if threaded else self.window
+        self.keypad = PygameKeypad()
+        self.profile_path = Path(profile) if profile is not None else None
+        if self.profile_path is not None:
+            self.profiler = SubsystemProfiler(cprofile_seconds, threads=2 if threaded else 1)
+            self.cpu = ProfiledCPU(self.screen, self.keypad, self.profiler)
+        else:
+            self.profiler = None
+            self.cpu = CPU(self.screen, self.keypad)
         self.cpu.reset()
+        self.beeper = create_beeper(sound)
 
         self.rom_path = Path(path)
+        self.quirks_profile = quirks_profile
+        self.quirks_overrides = quirks_overrides
+        self.runner = None
+        self.recorder = Recorder(record) if record is not None else None
+        self.debug = debug or debug_port is not None
+        self.debug_port = debug_port
+        self.debugger = None
+        self.telemetry = Telemetry()
+        self.overlay = overlay
+        self.exporter = SharedStateWriter(export) if export is not None else None
+        self.catalog = Catalog()
+        self.clock_speed = Config.CPU_CLOCK_SPEED
+
+        self.watch = watch
+        self.reload_key = getattr(pygame, "K_" + Config.RELOAD_KEY)
+        # Size and modification time of loaded ROM file, used to detect changes of watched ROM
+        self.rom_stamp = (0, 0)
+        # State templates and compiled programs of loaded ROMs, keyed by SHA-1 of ROM
+        self.templates: Dict[str, bytes] = {}
+        self.programs: Dict[str, CompiledProgram] = {}
+
+    def load_rom(self):
+        """
+        Loads ROM into CPU memory and selects its quirks and clock speed, if compiled or predecoded mode is enabled also
+        prepares runner executing ROM. Suggested quirks and clock speed are taken from catalog index, so ROM which did
+        not change since it was indexed is not analysed again, its file is mapped into memory instead of being read.
+
+        It is also used to load another ROM (or the same ROM again) into running emulator: CPU is reset in place from
+        state template, window, audio device and debugger shell are kept. State templates and compiled programs are
+        cached by ROM hash, so switching back to unchanged ROM does not build them again
+
+        :throws FileNotFoundError: When ROM file does not exist
+        :throws ValueError: When ROM does not fit in memory
+        """
+        with map_rom(self.rom_path) as rom:
+            # Entry is checked against mapped contents, so templates and programs are cached under hash of what is
+            # actually loaded even if watched file changes meanwhile
+            entry = self.catalog.entry(self.rom_path, rom)
+            self.catalog.save()
+            logging.info("Platform: {} clock speed: {}Hz".format(entry.platform, entry.clock_speed))
+
+            profile = self.quirks_profile if self.quirks_profile is not None else entry.profile
+            quirks = select_quirks(rom, profile, self.quirks_overrides)
+            template = self.templates.get(entry.sha1)
+            if template is None:
+                template = self.templates[entry.sha1] = state_template(rom)
+            if self.compiled and entry.sha1 not in self.programs:
+                self.programs[entry.sha1] = compile_rom(bytes(rom))
+
+        self.cpu.set_quirks(quirks)
+        self.cpu.reset_to(template)
+        self.clock_speed = entry.clock_speed
+        self.telemetry.clock_speed = self.clock_speed
+        self.rom_stamp = (entry.size, entry.mtime_ns)
+        logging.info("Quirks: {}".format(self.cpu.quirks))
+
+        runner = None
+        if self.compiled:
+            runner = CompiledRunner(self.cpu, self.programs[entry.sha1])
+        elif self.predecoded:
+            runner = PredecodedRunner(self.cpu)
+        if self.debug:
+            # Debugger runs instructions itself, through compiled or predecoded runner when nothing is armed
+            if self.debugger is None:
+                self.debugger = Debugger(self.cpu, runner, paused=True)
+                start_shell(self.debugger, self.debug_port)
+            else:
+                self.debugger.runner = runner
+            runner = self.debugger
+        self.runner = runner
+
+    def reload_rom(self) -> bool:
+        """
+        Loads ROM from rom_path into running emulator, if it can not be loaded emulator continues with previous state
+
+        :return: True if ROM was loaded
+        """
+        try:
+            self.load_rom()
+        except (FileNotFoundError, ValueError) as error:
+            logging.error("ROM {} was not loaded: {}".format(self.rom_path, error))
+            return False
+        logging.info("Loaded {}".format(self.rom_path))
+        return True
+
+    def reload_requested(self, event: pygame.event.Event) -> bool:
+        """
+        Checks if event requests loading of ROM, dropped file replaces rom_path
+
+        :param event: pygame event
+        :return: True if file was dropped on window or reload key was pressed
+        """
+        if event.type == pygame.DROPFILE:
+            self.rom_path = Path(event.file)
+            return True
+        return event.type == pygame.KEYDOWN and event.key == self.reload_key
+
+    def rom_changed(self) -> bool:
+        """
+        Returns True if ROM is watched and its file changed since it was loaded, file that does not exist (for example
+        while it is being rebuilt) is not considered changed
+        """
+        if not self.watch:
+            return False
+        try:
+            stat = self.rom_path.stat()
+        except FileNotFoundError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) != self.rom_stamp
+
+    def start_recording(self):
+        """
+        Starts recorder thread if recording is enabled
+        """
+        if self.recorder is not None:
+            self.recorder.start()
+
+    def stop_recording(self):
+        """
+        Finishes recording if it is enabled, frames captured so far are encoded before this method returns
+        """
+        if self.recorder is not None:
+            self.recorder.stop()
+
+    def stop_export(self):
+        """
+        Removes shared memory segment if export is enabled
+        """
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def stop_profile(self):
+        """
+        Prints time spent in subsystems and writes it to profile file if profiling is enabled
+        """
+        if self.profiler is not None:
+            self.profiler.stop()
+            print("\n".join(self.profiler.table()))
+            self.profiler.save(self.profile_path)
+
+    def measured(self, subsystem: str, function: Callable) -> Callable:
+        """
+        Returns function whose time is attributed to subsystem if profiling is enabled, otherwise function itself
+        """
+        if self.profiler is None:
+            return function
+        return self.profiler.timed(subsystem, function)
 
     def run(self):
         """
         Main method of CHIP-8 emulator
         """
-        single_instruction_interval = (1000 // Config.CPU_CLOCK_SPEED)
+        if self.threaded:
+            self.run_threaded()
+            return
+
+        frame_interval = 1000 // Config.FRAME_RATE
 
         pygame.time.set_timer(pygame.USEREVENT, Config.TIMER_DELAY)
         pygame.display.set_caption("PyCHIP8 by Piotr Kramek")
 
         try:
-            self.cpu.load_rom(self.rom_path)
+            self.load_rom()
         except FileNotFoundError:
             print("\nFile does not exist\n")
+            self.stop_export()
         else:
+            self.start_recording()
+            single_instruction_interval = 1000 // self.clock_speed
+            interval = single_instruction_interval
+            execute = self.executor()
+            telemetry = self.telemetry
+            wait = self.measured("sleep", pygame.time.wait)
+            wait_event = self.measured("sleep", pygame.event.wait)
+            get_events = self.measured("events", pygame.event.get)
+            refresh = self.measured("present", self.screen.refresh)
+            next_capture = pygame.time.get_ticks()
+            # Instructions executed and time spent emulating and presenting since the last frame boundary
+            frame_instructions = 0
+            frame_emulation_time = frame_presentation_time = 0.0
             while self.cpu.running:
-                pygame.time.wait(single_instruction_interval)
+                events = []
+                if not self.cpu.wake():
+                    # CPU waits for key (FX0A), so nothing is executed until an event arrives, timer events keep
+                    # arriving every Config.TIMER_DELAY ms, so timers and presentation keep running
+                    events.append(wait_event())
+                    presentation_start = time.perf_counter()
+                    refresh()
+                    frame_presentation_time += time.perf_counter() - presentation_start
+                else:
+                    # Runners may execute several instructions in one step, loop then waits for all of them before the
+                    # next step
+                    wait(interval)
+
+                    start = time.perf_counter()
+                    executed = execute()
+                    presentation_start = time.perf_counter()
+                    refresh()
+                    frame_instructions += executed
+                    frame_emulation_time += presentation_start - start
+                    frame_presentation_time += time.perf_counter() - presentation_start
+                    # Paused debugger executes nothing, loop still waits as if it executed single instruction
+                    interval = max(1, executed) * single_instruction_interval
 
-                self.cpu.execute_opcode()
-                self.screen.refresh()
+                ticks = pygame.time.get_ticks()
+                if ticks >= next_capture:
+                    # Steps since the last boundary are recorded as a single frame, lateness is how much later than
+                    # scheduled the boundary was reached
+                    telemetry.record_frame(frame_instructions, frame_emulation_time, (ticks - next_capture) / 1000)
+                    telemetry.record_presentation(frame_presentation_time)
+                    frame_instructions = 0
+                    frame_emulation_time = frame_presentation_time = 0.0
+                    next_capture += frame_interval
+                    telemetry.tick()
+                    if self.overlay:
+                        self.screen.overlay = telemetry.lines()
+                        self.screen.dirty = True
+                    if self.recorder is not None:
+                        self.recorder.capture(self.screen.bitmap)
+                    if self.exporter is not None:
+                        self.exporter.publish(self.cpu)
+                    if self.profiler is not None:
+                        self.profiler.tick()
+                    reload = self.rom_changed()
+                else:
+                    reload = False
 
-                for event in pygame.event.get():
+                events.extend(get_events())
+                for event in events:
+                    self.keypad.handle_event(event)
                     if event.type == pygame.QUIT:
                         self.cpu.exit()
                     if event.type == pygame.USEREVENT:
                         self.cpu.decrement_values_in_timers()
+                        self.beeper.update(self.cpu.timer_st)
+                    reload = self.reload_requested(event) or reload
+
+                if reload and self.cpu.running and self.reload_rom():
+                    single_instruction_interval = interval = 1000 // self.clock_speed
+                    execute = self.executor()
+
+            self.beeper.close()
+            self.stop_recording()
+            self.stop_export()
+            self.stop_profile()
+
+    def executor(self) -> Callable[[], int]:
+        """
+        Returns function executing next instruction (or block or fused sequence of instructions) with current runner
+        and returning number of executed instructions, when profiling is enabled its time is attributed to execution
+        """
+        if self.debugger is not None:
+            execute = functools.partial(self.debugger.run, 1)
+        elif self.runner is not None:
+            # Step is limited to instructions of a single frame, so a long compiled block does not make the loop skip
+            # frame boundaries
+            execute = functools.partial(self.runner.step, max(1, self.clock_speed // Config.FRAME_RATE))
+        else:
+            execute_opcode = self.cpu.execute_opcode
+
+            def execute() -> int:
+                execute_opcode()
+                return 1
+        return self.measured("execute", execute)
+
+    def start_emulation(self, frames: FrameBuffer) -> EmulationThread:
+        """
+        Starts emulation thread running current ROM
+
+        :param frames: Frame buffer to which emulated frames are published
+        """
+        emulation = EmulationThread(self.cpu, frames, self.beeper, self.runner, clock_speed=self.clock_speed,
+                                    telemetry=self.telemetry, exporter=self.exporter, profiler=self.profiler,
+                                    run_ahead=self.run_ahead)
+        emulation.start()
+        return emulation
+
+    def run_threaded(self):
+        """
+        Runs CPU on emulation thread, main thread only handles pygame events and displays frames published by
+        emulation thread, so presentation stalls do not affect emulation timing
+        """
+        pygame.display.set_caption("PyCHIP8 by Piotr Kramek")
+
+        try:
+            self.load_rom()
+        except FileNotFoundError:
+            print("\nFile does not exist\n")
+            self.stop_export()
+            return
+
+        self.start_recording()
+        frames = FrameBuffer(self.screen.bitmap.shape)
+        emulation = self.start_emulation(frames)
+
+        clock = pygame.time.Clock()
+        get_events = self.measured("events", pygame.event.get)
+        present = self.measured("present", self.window.present)
+        tick = self.measured("sleep", clock.tick)
+        while self.cpu.running:
+            reload = self.rom_changed()
+            for event in get_events():
+                self.keypad.handle_event(event)
+                if event.type == pygame.QUIT:
+                    self.cpu.exit()
+                reload = self.reload_requested(event) or reload
+
+            if reload and self.cpu.running:
+                # CPU is reset only while emulation thread is stopped, then a new thread continues with new ROM
+                emulation.stop()
+                if emulation.error is not None:
+                    raise emulation.error
+                if not self.reload_rom():
+                    self.cpu.running = True
+                emulation = self.start_emulation(frames)
+
+            frame = frames.acquire()
+            if frame is not None:
+                self.telemetry.tick()
+                start = time.perf_counter()
+                present(frame, self.telemetry.lines() if self.overlay else ())
+                self.telemetry.record_presentation(time.perf_counter() - start)
+                if self.recorder is not None:
+                    self.recorder.capture(frame)
+
+            tick(Config.FRAME_RATE)
+
+        emulation.stop()
+        self.beeper.close()
+        self.stop_recording()
+        self.stop_export()
+        self.stop_profile()
+        logging.info("Frames produced: {} consumed: {} dropped: {}".format(
+            frames.frames_produced, frames.frames_consumed, frames.frames_dropped))
+
+        if emulation.error is not None:
+            raise emulation.error
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='CHIP-8 emulator')
     parser.add_argument('--rom', help='Path to ROM file containing CHIP-8 game or program')
+    parser.add_argument('--threaded', action='store_true',
+                        help='Run emulation on a separate thread from event handling and presentation')
+    parser.add_argument('--mute', action='store_true', help='Do not play any sound')
+    parser.add_argument('--compiled', action='store_true',
+                        help='Translate ROM to Python code before running, translated ROMs are cached on disk')
+    parser.add_argument('--predecoded', action='store_true',
+                        help='Decode instructions once and execute common instruction sequences as single steps')
+    parser.add_argument('--quirks', choices=sorted(PROFILES),
+                        help='Quirk profile of the ROM, by default it is selected from database of known ROMs')
+    parser.add_argument('--quirk', action='append', default=[], metavar='NAME=VALUE',
+                        help='Override single quirk of selected profile, for example --quirk clip_sprites=1, '
+                             'can be given multiple times')
+    parser.add_argument('--record', metavar='PATH',
+                        help='Record displayed frames, .gif and .png (APNG) require Pillow, other paths are written as '
+                             'raw bitmap stream')
+    parser.add_argument('--debug', action='store_true',
+                        help='Start paused with debugger shell on console, type help in the shell to list commands')
+    parser.add_argument('--debug-port', type=int, metavar='PORT',
+                        help='Start paused with debugger shell served on TCP port on localhost')
+    parser.add_argument('--stats', action='store_true',
+                        help='Periodically log instructions and frames per second, frame times and pacing lateness')
+    parser.add_argument('--overlay', action='store_true', help='Draw runtime statistics over displayed image')
+    parser.add_argument('--export', metavar='NAME',
+                        help='Publish frames and CPU state to shared memory segment with this name, other processes '
+                             'read them with PyCHIP8.shared_state.SharedStateReader')
+    parser.add_argument('--watch', action='store_true',
+                        help='Load ROM again whenever its file changes, ROM is also loaded again with reload key and '
+                             'another ROM is loaded by dropping its file on the window')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='Measure time spent in instruction fetching, execution, sprite drawing, presentation, '
+                             'event handling and sleeping, print it on exit and write it to PATH as JSON')
+    parser.add_argument('--cprofile', type=float, metavar='SECONDS',
+                        help='With --profile also profile emulation with cProfile for SECONDS, statistics are written '
+                             'next to profile with .prof suffix')
+    parser.add_argument('--run-ahead', type=int, default=0, metavar='FRAMES',
+                        help='With --threaded emulate FRAMES frames ahead of every frame and display the last of them, '
+                             'then continue from the real frame, this hides input latency of ROMs that react to keys '
+                             'in later frames')
     args = parser.parse_args()
 
-    emulator = PyCHIP8(args.rom)
+    try:
+        overrides = parse_overrides(args.quirk)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.cprofile is not None and args.profile is None:
+        parser.error("--cprofile requires --profile")
+    if args.run_ahead < 0:
+        parser.error("--run-ahead can not be negative")
+    if args.run_ahead and not args.threaded:
+        parser.error("--run-ahead requires --threaded")
+    if args.run_ahead and (args.debug or args.debug_port is not None):
+        parser.error("--run-ahead can not be used with debugger")
+    if args.stats:
+        logging.getLogger("PyCHIP8.telemetry").setLevel(logging.INFO)
+
+    emulator = PyCHIP8(args.rom, threaded=args.threaded, sound=not args.mute, compiled=args.compiled,
+                       quirks_profile=args.quirks, quirks_overrides=overrides, record=args.record,
+                       debug=args.debug, debug_port=args.debug_port, overlay=args.overlay,
+                       predecoded=args.predecoded, export=args.export, watch=args.watch,
+                       profile=args.profile, cprofile_seconds=args.cprofile, run_ahead=args.run_ahead)
     emulator.run()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from PyCHIP8.conf import Config
+from PyCHIP8.lazy import lazy_import
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+
+class NullBeeper:
+    """
+    Sound backend that does not play anything. It tracks sound timer the same way real backends do, so it can be used
+    in headless and batch runs, or when there is no audio device
+    """
+
+    def __init__(self):
+        self.playing = False
+        self.beeps = 0
+
+    @property
+    def buffer_latency(self) -> float:
+        """
+        Expected delay in seconds between starting a beep and hearing it, caused by audio buffer size
+        """
+        return 0.0
+
+    def update(self, sound_timer: int):
+        """
+        Starts or stops beep when sound timer changes between zero and non zero value. Calling this method when the
+        state did not change costs only a comparison, so it can be called after every timer tick
+
+        :param sound_timer: Current value of CPU sound timer
+        """
+        if (sound_timer > 0) is not self.playing:
+            if self.playing:
+                self.playing = False
+                self.stop()
+            else:
+                self.playing = True
+                self.beeps += 1
+                self.start()
+
+    def start(self):
+        """
+        Starts playing beep
+        """
+
+    def stop(self):
+        """
+        Stops playing beep
+        """
+
+    def close(self):
+        """
+        Releases audio device
+        """
+
+
+class PygameBeeper(NullBeeper):
+    """
+    Sound backend based on pygame.mixer. Square wave is generated once and played in a loop for as long as the sound
+    timer is non zero, so beeping does not allocate anything
+    """
+
+    def __init__(self, frequency: int = Config.SOUND_FREQUENCY, volume: float = Config.SOUND_VOLUME,
+                 sample_rate: int = Config.AUDIO_SAMPLE_RATE, buffer_size: int = Config.AUDIO_BUFFER_SIZE):
+        """
+        :param frequency: Frequency of the beep in Hz, defaults to Config.SOUND_FREQUENCY
+        :param volume: Volume of the beep in range (0, 1), defaults to Config.SOUND_VOLUME
+        :param sample_rate: Requested mixer sample rate in Hz, defaults to Config.AUDIO_SAMPLE_RATE
+        :param buffer_size: Requested mixer buffer size in samples, smaller buffer means lower latency but higher
+                            risk of audio glitches, defaults to Config.AUDIO_BUFFER_SIZE
+        :throws pygame.error: When audio device could not be opened
+        """
+        super().__init__()
+        pygame.mixer.init(frequency=sample_rate, size=-16, channels=1, buffer=buffer_size)
+        self.sample_rate, _, self.channels = pygame.mixer.get_init()
+        self.buffer_size = buffer_size
+
+        self.sound = pygame.sndarray.make_sound(self.square_wave(frequency, volume))
+        self.channel = None
+
+        self.start_time_total = 0.0
+        self.start_time_max = 0.0
+
+    def square_wave(self, frequency: int, volume: float) -> np.ndarray:
+        """
+        Generates square wave consisting of whole periods, so it can be looped without clicks
+
+        :param frequency: Frequency of the wave in Hz
+        :param volume: Amplitude of the wave relative to maximal amplitude
+        :return: Array of 16 bit samples in a shape expected by pygame.sndarray
+        """
+        period = max(2, round(self.sample_rate / frequency))
+        periods = max(1, self.sample_rate // 10 // period)
+        amplitude = int(volume * 32767)
+
+        wave = np.full(period * periods, -amplitude, dtype=np.int16)
+        wave.reshape(periods, period)[:, :period // 2] = amplitude
+
+        if self.channels > 1:
+            wave = np.repeat(wave[:, np.newaxis], self.channels, axis=1)
+        return np.ascontiguousarray(wave)
+
+    @property
+    def buffer_latency(self) -> float:
+        """
+        Expected delay in seconds between starting a beep and hearing it, caused by audio buffer size
+        """
+        return self.buffer_size / self.sample_rate
+
+    @property
+    def start_time_average(self) -> float:
+        """
+        Average time in seconds spent in starting a beep
+        """
+        return self.start_time_total / self.beeps if self.beeps else 0.0
+
+    def start(self):
+        """
+        Starts looping beep
+        """
+        start_time = time.perf_counter()
+        self.channel = self.sound.play(loops=-1)
+        elapsed = time.perf_counter() - start_time
+
+        self.start_time_total += elapsed
+        self.start_time_max = max(self.start_time_max, elapsed)
+
+    def stop(self):
+        """
+        Stops looping beep
+        """
+        if self.channel is not None:
+            self.channel.stop()
+            self.channel = None
+
+    def close(self):
+        """
+        Stops beep and releases audio device
+        """
+        self.stop()
+        logging.info("Audio buffer latency: {:.1f} ms, beep start time avg: {:.3f} ms max: {:.3f} ms".format(
+            self.buffer_latency * 1000, self.start_time_average * 1000, self.start_time_max * 1000))
+        pygame.mixer.quit()
+
+
+def create_beeper(enabled: bool = True, buffer_size: int = Config.AUDIO_BUFFER_SIZE) -> NullBeeper:
+    """
+    Creates sound backend, falls back to NullBeeper when sound is disabled or audio device is not available
+
+    :param enabled: If False NullBeeper is returned, defaults to True
+    :param buffer_size: Mixer buffer size in samples, defaults to Config.AUDIO_BUFFER_SIZE
+    """
+    if not enabled:
+        return NullBeeper()
+
+    try:
+        return PygameBeeper(buffer_size=buffer_size)
+    except pygame.error as error:
+        logging.warning("Sound disabled, could not open audio device: {}".format(error))
+        return NullBeeper()
@@ -0,0 +1,251 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from PyCHIP8.conf import Config
+from PyCHIP8.quirks import ROM_PROFILES
+
+# Version of index file layout and of platform detection, entries of other versions are analysed again
+CATALOG_VERSION = 1
+
+# Opcodes (masked with the second element) which exist only on given platform, XO-CHIP is a superset of SCHIP
+XOCHIP_OPCODES = [
+    (0x5002, 0xF00F),  # save register range
+    (0x5003, 0xF00F),  # load register range
+    (0xF000, 0xFFFF),  # load long address
+    (0xF001, 0xF0FF),  # select planes
+    (0xF002, 0xFFFF),  # load audio pattern
+    (0xF03A, 0xF0FF),  # set pitch
+    (0x00D0, 0xFFF0),  # scroll up
+]
+SCHIP_OPCODES = [
+    (0x00C0, 0xFFF0),  # scroll down
+    (0x00FB, 0xFFFF),  # scroll right
+    (0x00FC, 0xFFFF),  # scroll left
+    (0x00FD, 0xFFFF),  # exit
+    (0x00FE, 0xFFFF),  # disable extended screen
+    (0x00FF, 0xFFFF),  # enable extended screen
+    (0xD000, 0xF00F),  # draw 16x16 sprite
+    (0xF030, 0xF0FF),  # point I to large font
+    (0xF075, 0xF0FF),  # save flags
+    (0xF085, 0xF0FF),  # load flags
+]
+
+# Quirk profile suggested for detected platform, plain CHIP-8 ROMs keep behaviour of the emulator
+PLATFORM_PROFILES = {"chip8": "default", "schip": "schip", "xochip": "xochip"}
+
+
+class RomEntry(NamedTuple):
+    """
+    Metadata of ROM file stored in catalog index
+    """
+    path: str
+    size: int
+    mtime_ns: int
+    sha1: str
+    platform: str  # chip8, schip or xochip
+    profile: str  # name of quirk profile from PyCHIP8.quirks.PROFILES
+    clock_speed: int  # in HZ
+
+
+def reachable_opcodes(rom: bytes, start: int = Config.PROGRAM_COUNTER) -> Iterator[int]:
+    """
+    Yields opcodes of instructions reachable from start, following jumps, calls and both branches of skips. Targets of
+    BNNN and code written at runtime are not known statically, so they are not visited
+
+    :param rom: ROM contents
+    :param start: Address at which ROM is loaded and executed, defaults to Config.PROGRAM_COUNTER
+    """
+    rom_end = start + len(rom)
+    visited = set()
+    pending = [start]
+    while pending:
+        pc = pending.pop()
+        while start <= pc < rom_end - 1 and pc not in visited:
+            visited.add(pc)
+            opcode = (rom[pc - start] << 8) | rom[pc - start + 1]
+            yield opcode
+
+            family = opcode & 0xF000
+            if family == 0x1000:
+                pending.append(opcode & 0x0FFF)
+                break
+            if opcode in (0x00EE, 0x00FD) or family == 0xB000:
+                break
+            if family == 0x2000:
+                pending.append(opcode & 0x0FFF)
+            elif family in (0x3000, 0x4000) or opcode & 0xF00F in (0x5000, 0x9000) \
+                    or opcode & 0xF0FF in (0xE09E, 0xE0A1):
+                # Skip over F000 NNNN (XO-CHIP) skips four bytes
+                skipped = pc + 4 < rom_end - 1 and (rom[pc + 2 - start] << 8) | rom[pc + 3 - start] == 0xF000
+                pending.append(pc + 6 if skipped else pc + 4)
+            elif opcode == 0xF000:
+                pc += 2
+            pc += 2
+
+
+def detect_platform(rom: bytes, start: int = Config.PROGRAM_COUNTER) -> str:
+    """
+    Detects platform by statically scanning reachable instructions (see reachable_opcodes) for opcodes which exist only
+    on SCHIP or XO-CHIP, data stored in ROM is not scanned
+
+    :param rom: ROM contents
+    :param start: Address at which ROM is loaded and executed, defaults to Config.PROGRAM_COUNTER
+    :return: xochip, schip or chip8
+    """
+    schip = False
+    for opcode in reachable_opcodes(rom, start):
+        for value, mask in XOCHIP_OPCODES:
+            if opcode & mask == value:
+                return "xochip"
+        if not schip:
+            schip = any(opcode & mask == value for value, mask in SCHIP_OPCODES)
+    return "schip" if schip else "chip8"
+
+
+@contextlib.contextmanager
+def map_rom(rom_path: Path) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Maps ROM file into memory, so it can be hashed and loaded without reading it into a separate buffer
+
+    :param rom_path: Path to ROM file
+    :return: Context manager giving read-only mapping of file, or empty bytes for empty file (it can not be mapped)
+    :throws FileNotFoundError: When ROM file does not exist
+    """
+    with open(str(rom_path), "rb") as rom_file:
+        if os.fstat(rom_file.fileno()).st_size == 0:
+            yield b""
+            return
+        mapping = mmap.mmap(rom_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapping
+        finally:
+            mapping.close()
+
+
+def analyse_rom(rom_path: Path, rom: Optional[bytes] = None) -> RomEntry:
+    """
+    Computes metadata of ROM file
+
+    :param rom_path: Path to ROM file
+    :param rom: Contents of ROM file already read or mapped, if None file is mapped, defaults to None
+    :throws FileNotFoundError: When ROM file does not exist
+    """
+    rom_path = Path(rom_path).resolve()
+    stat = rom_path.stat()
+    if rom is None:
+        with map_rom(rom_path) as rom:
+            return analyse_rom(rom_path, rom)
+    sha1 = hashlib.sha1(rom).hexdigest()
+    platform = detect_platform(rom)
+    profile = ROM_PROFILES.get(sha1, PLATFORM_PROFILES[platform])
+    return RomEntry(str(rom_path), stat.st_size, stat.st_mtime_ns, sha1, platform, profile,
+                    Config.PLATFORM_CLOCK_SPEEDS[platform])
+
+
+class Catalog:
+    """
+    Persistent index of ROM files. Entries are keyed by absolute path and reused while size and modification time of
+    file do not change, so listing and launching known ROMs only needs stat of their files
+    """
+
+    def __init__(self, index_path: Optional[Path] = Config.CATALOG_INDEX):
+        """
+        :param index_path: Path of index file, if None index is kept only in memory, defaults to Config.CATALOG_INDEX
+        """
+        self.index_path = index_path
+        self.entries: Dict[str, RomEntry] = {}
+        self.changed = False
+        self.load()
+
+    def load(self):
+        """
+        Reads index file, index which is missing, damaged or of other version is replaced by an empty one
+        """
+        if self.index_path is None or not self.index_path.exists():
+            return
+        try:
+            index = json.loads(self.index_path.read_text())
+            if index.get("version") == CATALOG_VERSION:
+                self.entries = {path: RomEntry(**entry) for path, entry in index["roms"].items()}
+        except (ValueError, TypeError, KeyError) as error:
+            logging.warning("Catalog index {} is damaged, ROMs are analysed again: {}".format(self.index_path, error))
+
+    def save(self):
+        """
+        Writes index file if any entry changed since it was loaded, file is replaced atomically
+        """
+        if self.index_path is None or not self.changed:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        index = {"version": CATALOG_VERSION, "roms": {path: entry._asdict() for path, entry in self.entries.items()}}
+        temporary_path.write_text(json.dumps(index, indent=1, sort_keys=True))
+        temporary_path.replace(self.index_path)
+        self.changed = False
+
+    def entry(self, rom_path: Path, rom: Optional[bytes] = None) -> RomEntry:
+        """
+        Returns metadata of ROM file, file is analysed only if it is not in index or it changed since it was indexed
+
+        :param rom_path: Path to ROM file
+        :param rom: Contents of ROM file which will be loaded, if given entry describes exactly these contents, even
+                    when file changed after they were read, defaults to None
+        :throws FileNotFoundError: When ROM file does not exist
+        """
+        rom_path = Path(rom_path).resolve()
+        stat = rom_path.stat()
+        entry = self.entries.get(str(rom_path))
+        if (entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns
+                or rom is not None and entry.sha1 != hashlib.sha1(rom).hexdigest()):
+            entry = analyse_rom(rom_path, rom)
+            self.entries[entry.path] = entry
+            self.changed = True
+        return entry
+
+    def scan(self, directories: Iterable[Path], suffixes: Iterable[str] = Config.ROM_SUFFIXES) -> List[RomEntry]:
+        """
+        Indexes ROM files found recursively in directories, entries of files that no longer exist in them are removed
+
+        :param directories: Directories to scan
+        :param suffixes: Suffixes of ROM files, compared case insensitively, defaults to Config.ROM_SUFFIXES
+        :return: Entries of found ROMs sorted by path
+        """
+        suffixes = {suffix.lower() for suffix in suffixes}
+        found = []
+        for directory in directories:
+            directory = Path(directory).resolve()
+            for rom_path in sorted(directory.rglob("*")):
+                if rom_path.suffix.lower() in suffixes and rom_path.is_file():
+                    found.append(self.entry(rom_path))
+
+            prefix = str(directory) + os.sep
+            found_paths = {entry.path for entry in found}
+            for path in [path for path in self.entries if path.startswith(prefix) and path not in found_paths]:
+                del self.entries[path]
+                self.changed = True
+        return sorted(found, key=lambda entry: entry.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index and list CHIP-8 ROMs')
+    parser.add_argument('directories', nargs='+', help='Directories scanned for ROM files')
+    parser.add_argument('--index', type=Path, default=Config.CATALOG_INDEX, help='Path of index file')
+    args = parser.parse_args()
+
+    catalog = Catalog(args.index)
+    entries = catalog.scan(Path(directory) for directory in args.directories)
+    catalog.save()
+    for entry in entries:
+        print("{:<40} {:>6} {:<7} {:<8} {:>5}Hz {}".format(
+            Path(entry.path).name, entry.size, entry.platform, entry.profile, entry.clock_speed, entry.sha1[:12]))
+
+
+if __name__ == "__main__":
+    main()
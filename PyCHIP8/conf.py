@@ -1,10 +1,10 @@
-import pygame
+from pathlib import Path
 
 
 class Config:
 
     STACK_POINTER = 0x52
-    MAX_MEMORY = 4096
+    MAX_MEMORY = 65536  # XO-CHIP address space, CHIP-8 programs use only the first 4096 bytes
     PROGRAM_COUNTER = 0x200
     NUMBER_OF_REGISTERS = 0x10
 
@@ -14,31 +14,79 @@ class Config:
     SCREEN_WIDTH_EXTENDED = 128
     SCREEN_HEIGHT_EXTENDED = 64
 
-    # Colors in RGBA format
-    SCREEN_COLORS = [(0, 0, 0, 255), (65, 255, 0, 255)]
+    # XO-CHIP bitplanes, value of pixel in Screen.bitmap has bit p set if pixel of plane p is set
+    NUMBER_OF_PLANES = 2
+
+    # Colors in RGBA format, indexed by value of pixel (background, plane 0, plane 1, both planes)
+    SCREEN_COLORS = [(0, 0, 0, 255), (65, 255, 0, 255), (255, 170, 0, 255), (255, 255, 255, 255)]
 
     CPU_CLOCK_SPEED = 500  # in HZ
     TIMER_DELAY = 2  # in ms
+    FRAME_RATE = 60  # in HZ, used when emulation runs on its own thread
+
+    SOUND_FREQUENCY = 440  # in HZ
+    SOUND_VOLUME = 0.1
+    AUDIO_SAMPLE_RATE = 44100  # in HZ
+    AUDIO_BUFFER_SIZE = 512  # in samples, defines audio latency
+
+    # Directory in which ROMs translated to Python modules are cached
+    COMPILED_CACHE_DIR = Path.home() / ".cache" / "PyCHIP8" / "compiled"
+
+    # Index of scanned ROMs (size, hash, platform, suggested quirks and clock speed), updated when ROM files change
+    CATALOG_INDEX = Path.home() / ".cache" / "PyCHIP8" / "catalog.json"
+    ROM_SUFFIXES = (".ch8", ".c8", ".sc8", ".xo8")  # files with these suffixes are scanned by catalog
+    PLATFORM_CLOCK_SPEEDS = {"chip8": 500, "schip": 1000, "xochip": 1000}  # in HZ, suggested for detected platform
+
+    # Every n-th frame sent by streaming server is a keyframe instead of a delta to previous frame
+    STREAM_KEYFRAME_INTERVAL = 300  # in frames
+    STREAM_SEND_TIMEOUT = 1.0  # in seconds, clients that do not receive frame in this time are disconnected
+
+    CONTROL_MAX_PAYLOAD = 1 << 20  # in bytes, clients of control server sending longer requests are disconnected
+
+    RECORDING_QUEUE_SIZE = 120  # in frames, captured frames are dropped when encoder falls this far behind
+    RECORDING_SCALE = 4  # size of pixel in recorded animation
+    # Maximum number of distinct frames in GIF or PNG recording, Pillow writes whole animation at once, so they are
+    # kept in memory until recording ends. Later frames are not recorded, raw recordings are not limited
+    RECORDING_MAX_FRAMES = 3600
 
+    # Number of last instructions reported when engine diverges from reference interpreter
+    DIFFERENTIAL_TRACE_LENGTH = 16
+
+    TELEMETRY_LOG_INTERVAL = 5.0  # in seconds, minimal time between telemetry log lines
+    # Upper bounds of telemetry histogram buckets, in ms
+    TELEMETRY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133)
+    TELEMETRY_FONT_SIZE = 18  # in pixels, size of on-screen statistics overlay
+
+    # Number of frames emulated by a session before session manager switches to another session
+    SESSION_BATCH_FRAMES = 1
+
+    ENVIRONMENT_FRAME_SKIP = 4  # number of frames emulated by single step of reinforcement learning environment
+
+    NUMBER_OF_KEYS = 0x10
+
+    # Names of pygame keys (pygame K_ constants without the K_ prefix), they are resolved by the pygame frontend
     KEY_MAPPING = {
-        0x0: pygame.K_1,
-        0x1: pygame.K_2,
-        0x2: pygame.K_3,
-        0x3: pygame.K_4,
-        0x4: pygame.K_q,
-        0x5: pygame.K_w,
-        0x6: pygame.K_e,
-        0x7: pygame.K_r,
-        0x8: pygame.K_a,
-        0x9: pygame.K_s,
-        0xA: pygame.K_d,
-        0xB: pygame.K_f,
-        0xC: pygame.K_z,
-        0xD: pygame.K_x,
-        0xE: pygame.K_c,
-        0xF: pygame.K_v,
+        0x0: "1",
+        0x1: "2",
+        0x2: "3",
+        0x3: "4",
+        0x4: "q",
+        0x5: "w",
+        0x6: "e",
+        0x7: "r",
+        0x8: "a",
+        0x9: "s",
+        0xA: "d",
+        0xB: "f",
+        0xC: "z",
+        0xD: "x",
+        0xE: "c",
+        0xF: "v",
     }
 
+    # Name of pygame key (pygame K_ constant without the K_ prefix) which loads current ROM again
+    RELOAD_KEY = "F5"
+
 
 class Constants:
     NORMAL_MODE = 'NORMAL'
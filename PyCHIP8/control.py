@@ -0,0 +1,562 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import selectors
+import socket
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PyCHIP8.conf import Config, Constants
+from PyCHIP8.cpu import CPU, I, PC, SP, STATE_SIZE, TIMER_DT, TIMER_ST, state_template
+from PyCHIP8.headless import CYCLES_PER_FRAME, emulate_frame, run_cycles
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.quirks import select_quirks
+from PyCHIP8.streaming import parse_address, receive_exactly
+from PyCHIP8.transpiler import CompiledRunner, compile_rom
+
+np = lazy_import("numpy")
+
+# Every request starts with header: command, payload length
+REQUEST = struct.Struct("!BI")
+# Every response starts with header: status, payload length, responses are sent in order of requests
+RESPONSE = struct.Struct("!BI")
+OK = 0
+ERROR = 1  # payload is UTF-8 error message
+
+# Commands, payloads of requests and responses are described next to them
+LOAD_ROM = 1  # request: ROM contents
+SET_KEYS = 2  # request: KEY_MASK
+RUN_CYCLES = 3  # request: COUNT of instructions, response: COUNT of executed instructions
+RUN_FRAMES = 4  # request: COUNT of frames, response: COUNT of executed instructions
+READ_MEMORY = 5  # request: MEMORY_RANGE, response: memory contents
+WRITE_MEMORY = 6  # request: ADDRESS followed by written bytes
+READ_REGISTERS = 7  # response: REGISTERS
+READ_FRAME = 8  # response: FRAME_SIZE followed by bitmap, one byte per pixel in Screen.bitmap order
+SAVE_STATE = 9  # response: SAVED_STATE followed by CPU state and bitmap
+RESTORE_STATE = 10  # request: payload of SAVE_STATE response
+
+KEY_MASK = struct.Struct("!H")
+COUNT = struct.Struct("!I")
+ADDRESS = struct.Struct("!H")
+MEMORY_RANGE = struct.Struct("!HI")  # address, length
+REGISTERS = struct.Struct("!HHHBBB16s")  # pc, sp, i, delay timer, sound timer, flags, V registers
+FRAME_SIZE = struct.Struct("!HH")  # width, height
+SAVED_STATE = struct.Struct("!BHH")  # flags, width, height
+
+# Screen modes by size of saved bitmap
+SCREEN_SIZES = {
+    (Config.SCREEN_WIDTH_NORMAL, Config.SCREEN_HEIGHT_NORMAL): Constants.NORMAL_MODE,
+    (Config.SCREEN_WIDTH_EXTENDED, Config.SCREEN_HEIGHT_EXTENDED): Constants.EXTENDED_MODE,
+}
+
+# Flags of REGISTERS and SAVED_STATE
+RUNNING = 1
+HALTED = 2
+
+
+class ControlError(Exception):
+    """
+    Raised by client when server could not execute command
+    """
+
+
+class ControlServer:
+    """
+    Serves commands of external programs (test bots, automation harnesses) controlling headless CPU. Nothing runs on
+    its own, CPU executes instructions only when asked to, so clients can step and observe it in lockstep.
+
+    Clients send requests back to back without waiting for responses, server executes all complete requests it
+    received and sends all their responses at once, so a batch of commands costs a single round trip
+    """
+
+    def __init__(self, cpu: CPU, address: str, compiled: bool = False, quirks_profile: Optional[str] = None,
+                 cycles_per_frame: int = CYCLES_PER_FRAME):
+        """
+        :param cpu: CPU to control, its screen should not draw on a window (see HeadlessScreen)
+        :param address: Address to listen on, see PyCHIP8.streaming.parse_address
+        :param compiled: If True loaded ROMs are translated to Python code (or loaded from cache), defaults to False
+        :param quirks_profile: Name of quirk profile of loaded ROMs, defaults to None (profile is selected by ROM hash)
+        :param cycles_per_frame: Number of instructions executed in one frame, defaults to CYCLES_PER_FRAME
+        :throws OSError: When socket could not be bound to address
+        """
+        self.cpu = cpu
+        self.compiled = compiled
+        self.quirks_profile = quirks_profile
+        self.cycles_per_frame = cycles_per_frame
+        self.program = None
+        self.runner: Optional[CompiledRunner] = None
+
+        self.handlers: Dict[int, Callable[[bytes], bytes]] = {
+            LOAD_ROM: self.load_rom,
+            SET_KEYS: self.set_keys,
+            RUN_CYCLES: self.run_cycles,
+            RUN_FRAMES: self.run_frames,
+            READ_MEMORY: self.read_memory,
+            WRITE_MEMORY: self.write_memory,
+            READ_REGISTERS: self.read_registers,
+            READ_FRAME: self.read_frame,
+            SAVE_STATE: self.save_state,
+            RESTORE_STATE: self.restore_state,
+        }
+
+        self.family, address = parse_address(address)
+        self.listener = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        elif Path(address).is_socket():
+            # Left by server that was killed before it could clean up
+            os.unlink(address)
+        self.listener.bind(address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        # Bytes received from every client which do not form a complete request yet
+        self.clients: Dict[socket.socket, bytearray] = {}
+        self.serving = False
+        self.requests_handled = 0
+
+    def load_rom(self, payload: bytes) -> bytes:
+        """
+        Resets CPU and loads ROM, quirks are selected for the ROM and the keypad keeps its state
+        """
+        template = state_template(payload)
+        cpu = self.cpu
+        cpu.set_quirks(select_quirks(payload, self.quirks_profile))
+        cpu.reset_to(template)
+        if self.compiled:
+            self.program = compile_rom(payload)
+            self.runner = CompiledRunner(cpu, self.program)
+        return b""
+
+    def set_keys(self, payload: bytes) -> bytes:
+        self.cpu.keypad.mask, = KEY_MASK.unpack(payload)
+        return b""
+
+    def run_cycles(self, payload: bytes) -> bytes:
+        """
+        Executes instructions without decrementing timers, see PyCHIP8.headless.run_cycles
+        """
+        cycles, = COUNT.unpack(payload)
+        return COUNT.pack(run_cycles(self.cpu, cycles, self.runner))
+
+    def run_frames(self, payload: bytes) -> bytes:
+        """
+        Emulates frames, see PyCHIP8.headless.emulate_frame, stops early when CPU stops running
+        """
+        frames, = COUNT.unpack(payload)
+        cpu = self.cpu
+        executed = 0
+        for _ in range(frames):
+            if not cpu.running:
+                break
+            executed += emulate_frame(cpu, self.cycles_per_frame, self.runner)
+        return COUNT.pack(executed)
+
+    def read_memory(self, payload: bytes) -> bytes:
+        address, length = MEMORY_RANGE.unpack(payload)
+        if address + length > Config.MAX_MEMORY:
+            raise ValueError("Range of {} bytes at {:#x} is outside of memory".format(length, address))
+        return bytes(self.cpu.memory[address:address + length])
+
+    def write_memory(self, payload: bytes) -> bytes:
+        """
+        Writes memory, compiled blocks overlapping written range are dropped
+        """
+        address, = ADDRESS.unpack_from(payload)
+        data = payload[ADDRESS.size:]
+        if address + len(data) > Config.MAX_MEMORY:
+            raise ValueError("Range of {} bytes at {:#x} is outside of memory".format(len(data), address))
+        self.cpu.memory[address:address + len(data)] = data
+        if self.runner is not None:
+            self.runner.written(address, len(data))
+        return b""
+
+    def flags(self) -> int:
+        cpu = self.cpu
+        return (RUNNING if cpu.running else 0) | (HALTED if cpu.halted else 0)
+
+    def read_registers(self, payload: bytes) -> bytes:
+        registers = self.cpu.registers
+        return REGISTERS.pack(registers[PC], registers[SP], registers[I], registers[TIMER_DT], registers[TIMER_ST],
+                              self.flags(), bytes(self.cpu.v))
+
+    def read_frame(self, payload: bytes) -> bytes:
+        bitmap = self.cpu.screen.bitmap
+        return FRAME_SIZE.pack(*bitmap.shape) + bitmap.tobytes()
+
+    def save_state(self, payload: bytes) -> bytes:
+        """
+        Returns CPU state (registers, timers, V registers and memory) and screen bitmap
+        """
+        bitmap = self.cpu.screen.bitmap
+        return SAVED_STATE.pack(self.flags(), *bitmap.shape) + bytes(self.cpu.state) + bitmap.tobytes()
+
+    def restore_state(self, payload: bytes) -> bytes:
+        """
+        Restores state returned by save_state, compiled blocks are validated against restored memory again
+        """
+        flags, width, height = SAVED_STATE.unpack_from(payload)
+        if (width, height) not in SCREEN_SIZES:
+            raise ValueError("Saved state has screen of unknown size {}x{}".format(width, height))
+        if len(payload) != SAVED_STATE.size + STATE_SIZE + width * height:
+            raise ValueError("Saved state has {} bytes, expected {}".format(
+                len(payload), SAVED_STATE.size + STATE_SIZE + width * height))
+        cpu = self.cpu
+        screen = cpu.screen
+        mode = SCREEN_SIZES[width, height]
+        if screen.mode != mode:
+            if mode == Constants.EXTENDED_MODE:
+                screen.enable_extended_screen()
+            else:
+                screen.disable_extended_screen()
+
+        cpu.restore(payload[SAVED_STATE.size:SAVED_STATE.size + STATE_SIZE])
+        cpu.running = bool(flags & RUNNING)
+        cpu.halted = bool(flags & HALTED)
+        screen.bitmap[...] = np.frombuffer(payload, dtype="int8", offset=SAVED_STATE.size + STATE_SIZE).reshape(
+            width, height)
+        screen.dirty = True
+        if self.program is not None:
+            self.runner = CompiledRunner(cpu, self.program)
+        return b""
+
+    def handle(self, command: int, payload: bytes) -> bytes:
+        """
+        Executes single command
+
+        :return: Response with header
+        """
+        handler = self.handlers.get(command)
+        try:
+            if handler is None:
+                raise ValueError("Unknown command {}".format(command))
+            response = handler(payload)
+        except Exception as error:
+            # Malformed requests and programs crashing CPU are reported to client, server keeps serving
+            logging.debug("Control command {} failed".format(command), exc_info=True)
+            message = "{}: {}".format(type(error).__name__, error).encode()
+            return RESPONSE.pack(ERROR, len(message)) + message
+        return RESPONSE.pack(OK, len(response)) + response
+
+    def accept(self):
+        connection, _ = self.listener.accept()
+        if self.family == socket.AF_INET:
+            # Responses are small and clients wait for them, so they should not be delayed
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.clients[connection] = bytearray()
+        self.selector.register(connection, selectors.EVENT_READ)
+        logging.info("Control client connected, {} connected".format(len(self.clients)))
+
+    def disconnect(self, connection: socket.socket):
+        if self.clients.pop(connection, None) is None:
+            return
+        self.selector.unregister(connection)
+        connection.close()
+        logging.info("Control client disconnected, {} connected".format(len(self.clients)))
+
+    def receive(self, connection: socket.socket):
+        """
+        Executes all complete requests received from client and sends their responses together
+        """
+        received = self.clients[connection]
+        try:
+            data = connection.recv(65536)
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(connection)
+            return
+        received += data
+
+        responses = []
+        offset = 0
+        while len(received) - offset >= REQUEST.size:
+            command, length = REQUEST.unpack_from(received, offset)
+            if length > Config.CONTROL_MAX_PAYLOAD:
+                logging.warning("Control client sent request of {} bytes, it is disconnected".format(length))
+                self.disconnect(connection)
+                return
+            end = offset + REQUEST.size + length
+            if len(received) < end:
+                break
+            responses.append(self.handle(command, bytes(received[offset + REQUEST.size:end])))
+            offset = end
+        del received[:offset]
+        self.requests_handled += len(responses)
+
+        if responses:
+            try:
+                connection.sendall(b"".join(responses))
+            except OSError:
+                self.disconnect(connection)
+
+    def poll(self, timeout: Optional[float]):
+        """
+        Handles new connections and client requests
+
+        :param timeout: Maximum time in seconds to wait for socket events, None waits without limit
+        """
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+            else:
+                self.receive(key.fileobj)
+
+    def serve(self, timeout: float = 1.0):
+        """
+        Serves clients until stop is called
+
+        :param timeout: Maximum time in seconds between checks whether server was stopped, defaults to 1.0
+        """
+        self.serving = True
+        try:
+            while self.serving:
+                self.poll(timeout)
+        finally:
+            self.close()
+            logging.info("Control requests handled: {}".format(self.requests_handled))
+
+    def stop(self):
+        self.serving = False
+
+    def close(self):
+        """
+        Disconnects all clients and stops listening
+        """
+        for connection in list(self.clients):
+            self.disconnect(connection)
+        self.selector.close()
+        self.listener.close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+
+def decode_empty(payload: bytes) -> None:
+    return None
+
+
+def decode_count(payload: bytes) -> int:
+    return COUNT.unpack(payload)[0]
+
+
+def decode_bytes(payload: bytes) -> bytes:
+    return payload
+
+
+def decode_registers(payload: bytes) -> Dict[str, object]:
+    pc, sp, i, timer_dt, timer_st, flags, v = REGISTERS.unpack(payload)
+    return {"pc": pc, "sp": sp, "i": i, "timer_dt": timer_dt, "timer_st": timer_st, "v": v,
+            "running": bool(flags & RUNNING), "halted": bool(flags & HALTED)}
+
+
+def decode_frame(payload: bytes) -> np.ndarray:
+    width, height = FRAME_SIZE.unpack_from(payload)
+    return np.frombuffer(payload, dtype="int8", offset=FRAME_SIZE.size).reshape(width, height)
+
+
+class Commands:
+    """
+    Methods building requests of all commands, subclasses decide when requests are sent (see request)
+    """
+
+    def request(self, command: int, payload: bytes, decode: Callable[[bytes], object]):
+        raise NotImplementedError
+
+    def load_rom(self, rom: bytes):
+        """
+        Resets CPU and loads ROM contents
+        """
+        return self.request(LOAD_ROM, bytes(rom), decode_empty)
+
+    def set_keys(self, mask: int):
+        """
+        Sets state of all keys, bit k of mask is set if key k is pressed
+        """
+        return self.request(SET_KEYS, KEY_MASK.pack(mask), decode_empty)
+
+    def run_cycles(self, cycles: int):
+        """
+        Executes instructions without decrementing timers, returns number of executed instructions
+        """
+        return self.request(RUN_CYCLES, COUNT.pack(cycles), decode_count)
+
+    def run_frames(self, frames: int):
+        """
+        Emulates frames, returns number of executed instructions
+        """
+        return self.request(RUN_FRAMES, COUNT.pack(frames), decode_count)
+
+    def read_memory(self, address: int, length: int):
+        """
+        Returns bytes of memory range
+        """
+        return self.request(READ_MEMORY, MEMORY_RANGE.pack(address, length), decode_bytes)
+
+    def write_memory(self, address: int, data: bytes):
+        return self.request(WRITE_MEMORY, ADDRESS.pack(address) + bytes(data), decode_empty)
+
+    def read_registers(self):
+        """
+        Returns dictionary with pc, sp, i, timer_dt, timer_st, v, running and halted
+        """
+        return self.request(READ_REGISTERS, b"", decode_registers)
+
+    def read_frame(self):
+        """
+        Returns screen bitmap, indexed [x, y] like Screen.bitmap
+        """
+        return self.request(READ_FRAME, b"", decode_frame)
+
+    def save_state(self):
+        """
+        Returns opaque state which can be passed to restore_state
+        """
+        return self.request(SAVE_STATE, b"", decode_bytes)
+
+    def restore_state(self, state: bytes):
+        return self.request(RESTORE_STATE, state, decode_empty)
+
+
+class ControlClient(Commands):
+    """
+    Connection to ControlServer, every command method sends its request and waits for response. Commands added to
+    batch (see batch) are sent together and cost a single round trip
+    """
+
+    def __init__(self, address: str):
+        """
+        :param address: Address of server, see PyCHIP8.streaming.parse_address
+        :throws OSError: When connection could not be established
+        """
+        family, address = parse_address(address)
+        self.connection = socket.socket(family, socket.SOCK_STREAM)
+        self.connection.connect(address)
+        if family == socket.AF_INET:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def receive(self) -> Tuple[int, bytes]:
+        """
+        :return: Status and payload of the next response
+        :throws ConnectionError: When server closed connection
+        """
+        header = receive_exactly(self.connection, RESPONSE.size)
+        if header is None:
+            raise ConnectionError("Control server closed connection")
+        status, length = RESPONSE.unpack(header)
+        payload = receive_exactly(self.connection, length) if length else b""
+        if payload is None:
+            raise ConnectionError("Control server closed connection")
+        return status, payload
+
+    def execute(self, requests: List[Tuple[int, bytes, Callable[[bytes], object]]]) -> List[object]:
+        """
+        Sends all requests at once and receives their responses
+
+        :param requests: Commands, payloads and functions decoding payloads of responses
+        :return: Decoded responses
+        :throws ControlError: When any command failed, it is raised after all responses are received
+        """
+        self.connection.sendall(b"".join(REQUEST.pack(command, len(payload)) + payload
+                                         for command, payload, _ in requests))
+        results = []
+        error = None
+        for command, _, decode in requests:
+            status, payload = self.receive()
+            if status == OK:
+                results.append(decode(payload))
+            else:
+                results.append(None)
+                if error is None:
+                    error = ControlError(payload.decode(errors="replace"))
+        if error is not None:
+            raise error
+        return results
+
+    def request(self, command: int, payload: bytes, decode: Callable[[bytes], object]):
+        return self.execute([(command, payload, decode)])[0]
+
+    def batch(self) -> ControlBatch:
+        return ControlBatch(self)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> ControlClient:
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class ControlBatch(Commands):
+    """
+    Collects commands and sends them in one round trip when used as context manager exits (or when execute is called),
+    decoded responses are then stored in results in order of commands:
+
+        with client.batch() as batch:
+            batch.set_keys(0x20)
+            batch.run_frames(1)
+            batch.read_frame()
+        frame = batch.results[2]
+    """
+
+    def __init__(self, client: ControlClient):
+        self.client = client
+        self.requests: List[Tuple[int, bytes, Callable[[bytes], object]]] = []
+        self.results: List[object] = []
+
+    def request(self, command: int, payload: bytes, decode: Callable[[bytes], object]):
+        self.requests.append((command, payload, decode))
+
+    def execute(self) -> List[object]:
+        """
+        Sends collected commands
+
+        :return: Decoded responses
+        :throws ControlError: When any command failed
+        """
+        requests, self.requests = self.requests, []
+        self.results = self.client.execute(requests) if requests else []
+        return self.results
+
+    def __enter__(self) -> ControlBatch:
+        return self
+
+    def __exit__(self, exception_type, *exception):
+        if exception_type is None:
+            self.execute()
+
+
+def main():
+    from PyCHIP8.screen import HeadlessScreen
+
+    parser = argparse.ArgumentParser(description='Serve binary control protocol of headless CHIP-8 emulator')
+    parser.add_argument('address', help='HOST:PORT or unix:PATH to listen on')
+    parser.add_argument('--rom', help='Path to ROM file loaded before clients connect')
+    parser.add_argument('--compiled', action='store_true', help='Translate loaded ROMs to Python code')
+    parser.add_argument('--quirks', help='Quirk profile of loaded ROMs, see PyCHIP8.quirks.PROFILES')
+    args = parser.parse_args()
+
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    server = ControlServer(cpu, args.address, args.compiled, args.quirks)
+    if args.rom is not None:
+        server.load_rom(Path(args.rom).read_bytes())
+    print("Control server listening on {}".format(server.address))
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
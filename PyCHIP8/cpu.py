@@ -1,13 +1,99 @@
 import logging
 from pathlib import Path
 from random import randint
-
-import pygame
-from pygame import key, KEYDOWN
+from typing import TYPE_CHECKING, Optional
 
 from PyCHIP8.conf import Config
 from PyCHIP8.conf import Constants
-from PyCHIP8.screen import Screen
+from PyCHIP8.keypad import Keypad
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.quirks import Quirks
+
+if TYPE_CHECKING:
+    from PyCHIP8.screen import Screen
+
+np = lazy_import("numpy")
+
+# Layout of CPU state buffer, 16 bit registers are stored first and they are followed by V registers and memory
+PC, SP, I, TIMER_DT, TIMER_ST, OPCODE, MODE, PLANES = range(8)
+REGISTERS_SIZE = 16  # in bytes, room for eight 16 bit registers
+V_OFFSET = REGISTERS_SIZE
+MEMORY_OFFSET = V_OFFSET + Config.NUMBER_OF_REGISTERS
+STATE_SIZE = MEMORY_OFFSET + Config.MAX_MEMORY
+
+MODES = (Constants.NORMAL_MODE, Constants.EXTENDED_MODE)
+
+# Sprites of hexadecimal digits, they are stored at the beginning of the memory
+FONTSET = bytes([
+    0xF0, 0x90, 0x90, 0x90, 0xF0,  # 0
+    0x20, 0x60, 0x20, 0x20, 0x70,  # 1
+    0xF0, 0x10, 0xF0, 0x80, 0xF0,  # 2
+    0xF0, 0x10, 0xF0, 0x10, 0xF0,  # 3
+    0x90, 0x90, 0xF0, 0x10, 0x10,  # 4
+    0xF0, 0x80, 0xF0, 0x10, 0xF0,  # 5
+    0xF0, 0x80, 0xF0, 0x90, 0xF0,  # 6
+    0xF0, 0x10, 0x20, 0x40, 0x40,  # 7
+    0xF0, 0x90, 0xF0, 0x90, 0xF0,  # 8
+    0xF0, 0x90, 0xF0, 0x10, 0xF0,  # 9
+    0xF0, 0x90, 0xF0, 0x90, 0x90,  # A
+    0xE0, 0x90, 0xE0, 0x90, 0xE0,  # B
+    0xF0, 0x80, 0x80, 0x80, 0xF0,  # C
+    0xE0, 0x90, 0x90, 0x90, 0xE0,  # D
+    0xF0, 0x80, 0xF0, 0x80, 0xF0,  # E
+    0xF0, 0x80, 0xF0, 0x80, 0x80  # F
+])
+
+# Sprites of hexadecimal digits 8 pixels wide and 10 pixels high (SCHIP, digits A-F from XO-CHIP), they are stored
+# right below programs, so they are not overwritten by the stack growing up from Config.STACK_POINTER
+LARGE_FONTSET = bytes([
+    0xFF, 0xFF, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF,  # 0
+    0x18, 0x78, 0x78, 0x18, 0x18, 0x18, 0x18, 0x18, 0xFF, 0xFF,  # 1
+    0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF,  # 2
+    0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF,  # 3
+    0xC3, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF, 0x03, 0x03, 0x03, 0x03,  # 4
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF,  # 5
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF,  # 6
+    0xFF, 0xFF, 0x03, 0x03, 0x06, 0x0C, 0x18, 0x18, 0x18, 0x18,  # 7
+    0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF,  # 8
+    0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0x03, 0x03, 0xFF, 0xFF,  # 9
+    0x7E, 0xFF, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF, 0xC3, 0xC3, 0xC3,  # A
+    0xFC, 0xFC, 0xC3, 0xC3, 0xFC, 0xFC, 0xC3, 0xC3, 0xFC, 0xFC,  # B
+    0x3C, 0xFF, 0xC3, 0xC0, 0xC0, 0xC0, 0xC0, 0xC3, 0xFF, 0x3C,  # C
+    0xFC, 0xFE, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xFE, 0xFC,  # D
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF,  # E
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC0, 0xC0, 0xC0, 0xC0  # F
+])
+LARGE_FONT_ADDRESS = Config.PROGRAM_COUNTER - len(LARGE_FONTSET)
+
+
+def state_template(rom: bytes = b"", address: int = Config.PROGRAM_COUNTER) -> bytes:
+    """
+    Returns image of CPU state right after reset, with fontset and given ROM loaded. It can be restored with
+    CPU.reset_to in a single copy, so it is built once and reused by every reset
+
+    :param rom: ROM contents, defaults to no ROM
+    :param address: Address at which ROM is loaded, defaults to Config.PROGRAM_COUNTER
+    :throws ValueError: When ROM does not fit in memory
+    """
+    if address + len(rom) > Config.MAX_MEMORY:
+        raise ValueError("ROM of {} bytes does not fit in memory at {:#x}".format(len(rom), address))
+    state = bytearray(STATE_SIZE)
+    registers = memoryview(state)[:REGISTERS_SIZE].cast("H")
+    registers[PC] = Config.PROGRAM_COUNTER
+    registers[SP] = Config.STACK_POINTER
+    registers[PLANES] = 1
+    registers.release()
+    state[MEMORY_OFFSET:MEMORY_OFFSET + len(FONTSET)] = FONTSET
+    state[MEMORY_OFFSET + LARGE_FONT_ADDRESS:MEMORY_OFFSET + LARGE_FONT_ADDRESS + len(LARGE_FONTSET)] = LARGE_FONTSET
+    state[MEMORY_OFFSET + address:MEMORY_OFFSET + address + len(rom)] = rom
+    return bytes(state)
+
+
+# State restored by CPU.reset
+RESET_STATE = state_template()
+
+# XO-CHIP long instruction F000 NNNN, skip instructions skip over both of its words
+LONG_INSTRUCTION = 0xF000
 
 
 class CPU:
@@ -24,115 +110,252 @@ class CPU:
         def __init__(self, opcode):
             Exception.__init__(self, "Unknown instruction {}".format(hex(opcode)))
 
-    def __init__(self, screen: Screen):
+    # Attributes are fixed, so instances do not need __dict__
+    __slots__ = ("screen", "keypad", "state", "registers", "v", "memory", "running", "halted", "sound_flag",
+                 "quirks", "opcode_lookup", "leading_zero_opcodes_lookup", "leading_eight_opcodes_lookup",
+                 "leading_e_opcodes_lookup", "leading_f_opcodes_lookup")
+
+    def __init__(self, screen: "Screen", keypad: Optional[Keypad] = None):
         """
         This method initializes CPU. Object of class screen is necessary to be able to operate on screen in some
         opcodes
 
+        Whole architectural state of CPU is stored in a single buffer (see STATE_SIZE), registers, V registers and
+        memory are views into this buffer, so taking or restoring snapshot of CPU is a single copy
+
         :param screen: Screen class object on which emulator will draw pixels
+        :param keypad: Keypad from which key state is read, defaults to Keypad not connected to any input device
         """
         self.screen = screen
-        self.opcode = 0
-        self.memory = bytearray(Config.MAX_MEMORY)
-        self.mode = Constants.NORMAL_MODE
-
-        self.pc = 0
-        self.sp = 0
-        self.i = 0
-        self.v = bytearray(Config.NUMBER_OF_REGISTERS)
+        self.keypad = keypad if keypad is not None else Keypad()
 
-        self.timer_dt = 0
-        self.timer_st = 0
+        self.state = bytearray(STATE_SIZE)
+        state_view = memoryview(self.state)
+        self.registers = state_view[:REGISTERS_SIZE].cast("H")
+        self.v = state_view[V_OFFSET:MEMORY_OFFSET]
+        self.memory = state_view[MEMORY_OFFSET:]
 
         self.running = True
 
+        # Set when FX0A waits for key, run loops do not execute instructions until wake succeeds
+        self.halted = False
+
         # Flag used to define if sound should be played
         self.sound_flag = True
 
-        # Python dictionary is used in place of if-else statements when deciding what method to call
-        # In most cases opcodes are determined by four oldest bits and in this dict only those bits are used
-        self.opcode_lookup = {
-            0x0: self.execute_leading_zero_opcodes,
-            0x1: self.jump_to_address,
-            0x2: self.jump_to_subroutine,
-            0x3: self.skip_if_register_equals_value,
-            0x4: self.skip_if_register_not_equals_value,
-            0x5: self.skip_if_register_equal_other_register,
-            0x6: self.move_value_to_register,
-            0x7: self.add_value_to_register,
-            0x8: self.execute_leading_eight_opcodes,
-            0x9: self.skip_if_register_not_equal_other_register,
-            0xA: self.move_value_to_index,
-            0xB: self.jump_to_address_plus_v_zero,
-            0xC: self.generate_random_number,
-            0xD: self.draw_sprite,
-            0xE: self.execute_leading_e_opcodes,
-            0xF: self.execute_leading_f_opcodes
-        }
-
-        self.leading_zero_opcodes_lookup = {
-            0xE0: self.clear_screen,
-            0xEE: self.return_from_subroutine,
-            0xFB: self.screen_scroll_right,
-            0xFC: self.screen_scroll_left,
-            0xFD: self.exit,
-            0xFE: self.disable_extended_screen,
-            0xFF: self.enable_extended_screen
-        }
-
-        self.leading_eight_opcodes_lookup = {
-            0x0: self.move_register_to_register,
-            0x1: self.register_logical_or_register,
-            0x2: self.register_logical_and_register,
-            0x3: self.register_logical_xor_register,
-            0x4: self.add_register_to_register,
-            0x5: self.subtract_register_from_register,
-            0x6: self.shift_register_right,
-            0x7: self.negative_subtract_register_from_register,
-            0xE: self.shift_register_left
-        }
-
-        self.leading_e_opcodes_lookup = {
-            0x9E: self.skip_if_key_is_pressed,
-            0xA1: self.skip_if_key_is_not_pressed
-        }
-
-        self.leading_f_opcodes_lookup = {
-            0x07: self.move_delay_to_register,
-            0x0A: self.wait_for_keypress,
-            0x15: self.move_register_to_delay_timer,
-            0x18: self.move_register_to_sound_timer,
-            0x1E: self.add_register_to_index,
-            0x29: self.move_sprite_address_to_index,
-            0x30: self.move_extended_sprite_address_to_index,
-            0x33: self.store_bcd_in_memory,
-            0x55: self.store_registers_in_memory,
-            0x65: self.read_registers_from_memory
-        }
+        # Lookup tables are shared by all instances with the same quirks, see the end of class definition
+        self.set_quirks(Quirks())
+
+    @property
+    def pc(self) -> int:
+        """
+        Program counter, address of the next instruction
+        """
+        return self.registers[PC]
+
+    @pc.setter
+    def pc(self, value: int):
+        self.registers[PC] = value
+
+    @property
+    def sp(self) -> int:
+        """
+        Stack pointer, address in memory at which next return address will be stored
+        """
+        return self.registers[SP]
+
+    @sp.setter
+    def sp(self, value: int):
+        self.registers[SP] = value
+
+    @property
+    def i(self) -> int:
+        """
+        Index register
+        """
+        return self.registers[I]
+
+    @i.setter
+    def i(self, value: int):
+        self.registers[I] = value
+
+    @property
+    def timer_dt(self) -> int:
+        """
+        Delay timer
+        """
+        return self.registers[TIMER_DT]
+
+    @timer_dt.setter
+    def timer_dt(self, value: int):
+        self.registers[TIMER_DT] = value
+
+    @property
+    def timer_st(self) -> int:
+        """
+        Sound timer
+        """
+        return self.registers[TIMER_ST]
+
+    @timer_st.setter
+    def timer_st(self, value: int):
+        self.registers[TIMER_ST] = value
+
+    @property
+    def opcode(self) -> int:
+        """
+        Opcode of the instruction being executed
+        """
+        return self.registers[OPCODE]
+
+    @opcode.setter
+    def opcode(self, value: int):
+        self.registers[OPCODE] = value
+
+    @property
+    def mode(self) -> str:
+        """
+        Screen mode CPU is in, it is stored in state buffer as index of mode in MODES
+        """
+        return MODES[self.registers[MODE]]
+
+    @mode.setter
+    def mode(self, mode: str):
+        self.registers[MODE] = MODES.index(mode)
+
+    @property
+    def planes(self) -> int:
+        """
+        Mask of bitplanes selected for drawing, scrolling and clearing (XO-CHIP), bit p selects plane p
+        """
+        return self.registers[PLANES]
+
+    @planes.setter
+    def planes(self, value: int):
+        self.registers[PLANES] = value
+
+    @classmethod
+    def lookup_tables(cls, quirks: Quirks) -> tuple:
+        """
+        Returns lookup tables with handler variants selected by quirks bound in place of default handlers. Tables are
+        built once for every set of quirks and shared by all instances using it
+
+        :param quirks: Quirks for which tables are built
+        :return: Tuple of opcode lookup, leading zero, leading eight, leading E and leading F opcodes lookup tables
+        """
+        tables = cls.QUIRK_LOOKUP_TABLES.get(quirks)
+        if tables is not None:
+            return tables
+
+        opcode_lookup = dict(cls.OPCODE_LOOKUP)
+        leading_eight_opcodes_lookup = dict(cls.LEADING_EIGHT_OPCODES_LOOKUP)
+        leading_f_opcodes_lookup = dict(cls.LEADING_F_OPCODES_LOOKUP)
+
+        if quirks.shift_uses_vy:
+            leading_eight_opcodes_lookup[0x6] = cls.shift_other_register_right
+            leading_eight_opcodes_lookup[0xE] = cls.shift_other_register_left
+        if quirks.load_store_increments_i:
+            leading_f_opcodes_lookup[0x55] = cls.store_registers_in_memory_and_increment_index
+            leading_f_opcodes_lookup[0x65] = cls.read_registers_from_memory_and_increment_index
+        if quirks.jump_uses_vx:
+            opcode_lookup[0xB] = cls.jump_to_address_plus_register
+        if quirks.clip_sprites:
+            opcode_lookup[0xD] = cls.draw_clipped_sprite
+
+        tables = (opcode_lookup, cls.LEADING_ZERO_OPCODES_LOOKUP, leading_eight_opcodes_lookup,
+                  cls.LEADING_E_OPCODES_LOOKUP, leading_f_opcodes_lookup)
+        cls.QUIRK_LOOKUP_TABLES[quirks] = tables
+        return tables
+
+    def set_quirks(self, quirks: Quirks):
+        """
+        Binds handler variants selected by quirks into lookup tables used by this CPU, it should be called when ROM is
+        loaded, after that instructions are dispatched without checking quirks
+
+        :param quirks: Quirks of ROM that will be executed
+        """
+        self.quirks = quirks
+        (self.opcode_lookup, self.leading_zero_opcodes_lookup, self.leading_eight_opcodes_lookup,
+         self.leading_e_opcodes_lookup, self.leading_f_opcodes_lookup) = CPU.lookup_tables(quirks)
+
+    def snapshot(self) -> bytes:
+        """
+        Returns copy of the whole architectural state of CPU (registers, timers, V registers and memory)
+        """
+        return bytes(self.state)
+
+    def restore(self, snapshot: bytes):
+        """
+        Restores state previously returned by snapshot method
+
+        :param snapshot: CPU state returned by snapshot method
+        """
+        self.state[:] = snapshot
+        self.halted = False
+
+    def clone(self, screen: Optional["Screen"] = None, keypad: Optional[Keypad] = None) -> "CPU":
+        """
+        Creates independent CPU with the same state as this one, state is copied with a single buffer copy
+
+        :param screen: Screen on which cloned CPU will draw, defaults to copy of this CPU screen (see Screen.clone)
+        :param keypad: Keypad of cloned CPU, defaults to copy of this CPU keypad
+        """
+        if screen is None:
+            screen = self.screen.clone()
+        if keypad is None:
+            keypad = Keypad()
+            keypad.keys[:] = self.keypad.keys
+            keypad.latched_key = self.keypad.latched_key
+        cpu = CPU(screen, keypad)
+        cpu.set_quirks(self.quirks)
+        cpu.state[:] = self.state
+        cpu.running = self.running
+        cpu.halted = self.halted
+        cpu.sound_flag = self.sound_flag
+        return cpu
 
     def reset(self):
         """
-        Resets the CPU by resetting all registers and timers to its starting values
+        Resets the CPU by resetting all registers, timers and memory to its starting values
         """
-        self.v = bytearray(Config.NUMBER_OF_REGISTERS)
-        self.pc = Config.PROGRAM_COUNTER
-        self.sp = Config.STACK_POINTER
-        self.i = 0
-        self.timer_dt = 0
-        self.timer_st = 0
-        self.memory = bytearray(Config.MAX_MEMORY)
-        self.load_fontset()
+        self.state[:] = RESET_STATE
+        self.halted = False
+
+    def reset_to(self, template: bytes):
+        """
+        Restores CPU state from template (see state_template) and clears screen, it is a single copy, so it is much
+        faster than reset followed by loading ROM
+
+        :param template: Image of CPU state
+        """
+        self.state[:] = template
+        self.running = True
+        self.halted = False
+        if self.screen.mode != Constants.NORMAL_MODE:
+            self.screen.disable_extended_screen()
+        else:
+            self.screen.clear()
+
+    def wake(self) -> bool:
+        """
+        Ends halted state if a key was pressed since the CPU halted, FX0A is then executed again and takes the key
+
+        :return: True if CPU can execute instructions
+        """
+        if self.halted and self.keypad.latched_key is not None:
+            self.halted = False
+        return not self.halted
 
     def decrement_values_in_timers(self):
         """
         Subtracts one from timers if values stored in them are bigger than zero
         """
 
-        if self.timer_st > 0:
-            self.timer_st -= 1
+        if self.registers[TIMER_ST] > 0:
+            self.registers[TIMER_ST] -= 1
 
-        if self.timer_dt > 0:
-            self.timer_dt -= 1
+        if self.registers[TIMER_DT] > 0:
+            self.registers[TIMER_DT] -= 1
 
     def load_rom(self, rom_path: Path, address: int = Config.PROGRAM_COUNTER):
         """"
@@ -141,36 +364,24 @@ class CPU:
         :param rom_path: path to rom file
         :param address: address at which the rom data will begin to be stored in emulator memory
         """
-        with rom_path.open(mode='rb') as opened_file:
-            rom_data = opened_file.read()
-            for index, data in enumerate(rom_data):
-                self.memory[address + index] = data
+        self.load_rom_data(rom_path.read_bytes(), address)
+
+    def load_rom_data(self, rom: bytes, address: int = Config.PROGRAM_COUNTER):
+        """
+        Copies ROM contents to emulator memory
+
+        :param rom: ROM contents, any bytes-like object (for example mapped file, see PyCHIP8.catalog.map_rom)
+        :param address: Address at which ROM is stored, defaults to Config.PROGRAM_COUNTER
+        """
+        self.memory[address:address + len(rom)] = rom
 
     def load_fontset(self):
         """
-        This method loads fontset into CHIP-8 memory, it is stored at the beginning of the memory
-        """
-        fontset = [
-            0xF0, 0x90, 0x90, 0x90, 0xF0,  # 0
-            0x20, 0x60, 0x20, 0x20, 0x70,  # 1
-            0xF0, 0x10, 0xF0, 0x80, 0xF0,  # 2
-            0xF0, 0x10, 0xF0, 0x10, 0xF0,  # 3
-            0x90, 0x90, 0xF0, 0x10, 0x10,  # 4
-            0xF0, 0x80, 0xF0, 0x10, 0xF0,  # 5
-            0xF0, 0x80, 0xF0, 0x90, 0xF0,  # 6
-            0xF0, 0x10, 0x20, 0x40, 0x40,  # 7
-            0xF0, 0x90, 0xF0, 0x90, 0xF0,  # 8
-            0xF0, 0x90, 0xF0, 0x10, 0xF0,  # 9
-            0xF0, 0x90, 0xF0, 0x90, 0x90,  # A
-            0xE0, 0x90, 0xE0, 0x90, 0xE0,  # B
-            0xF0, 0x80, 0x80, 0x80, 0xF0,  # C
-            0xE0, 0x90, 0x90, 0x90, 0xE0,  # D
-            0xF0, 0x80, 0xF0, 0x80, 0xF0,  # E
-            0xF0, 0x80, 0xF0, 0x80, 0x80  # F
-        ]
-
-        for index, byte in enumerate(fontset):
-            self.memory[index] = byte
+        This method loads fontset into CHIP-8 memory, it is stored at the beginning of the memory and it is followed by
+        large fontset
+        """
+        self.memory[:len(FONTSET)] = FONTSET
+        self.memory[LARGE_FONT_ADDRESS:LARGE_FONT_ADDRESS + len(LARGE_FONTSET)] = LARGE_FONTSET
 
     def execute_opcode(self):
         """"
@@ -180,59 +391,101 @@ class CPU:
 
         :throws UnknownInstructionException: when there was no opcode defined in opcode lookup dictionaries
         """
+        registers = self.registers
+        pc = registers[PC]
+
         # Get next opcode from memory, opcode is 2 byte so we need two consecutive memory cells
-        self.opcode = (int(self.memory[self.pc]) << 8) + int(self.memory[self.pc + 1])
+        opcode = (self.memory[pc] << 8) | self.memory[pc + 1]
+        registers[OPCODE] = opcode
+
+        logging.info("sp: %d pc: %d executing opcode: 0x%04x", registers[SP], pc, opcode)
+
+        registers[PC] = pc + 2
+
+        four_oldest_bits = (opcode & 0xF000) >> 12
 
-        logging.info("sp: {} pc: {} executing opcode: 0x{}".format(self.sp, self.pc, hex(self.opcode)[2:].zfill(4)))
+        try:
+            self.opcode_lookup[four_oldest_bits](self)
+        except KeyError:
+            raise self.UnknownInstructionException(opcode)
 
-        self.pc += 2
+    def execute_instruction(self, opcode: int):
+        """"
+        This method is used to execute given instruction without fetching it from memory, PC is not changed before
+        execution. It is used by code that decodes instructions on its own, like compiled ROMs
 
-        four_oldest_bits = (self.opcode & 0xF000) >> 12
+        :param opcode: Opcode of instruction to execute
+        :throws UnknownInstructionException: when there was no opcode defined in opcode lookup dictionaries
+        """
+        self.registers[OPCODE] = opcode
 
         try:
-            self.opcode_lookup[four_oldest_bits]()
+            self.opcode_lookup[(opcode & 0xF000) >> 12](self)
         except KeyError:
-            raise self.UnknownInstructionException(self.opcode)
+            raise self.UnknownInstructionException(opcode)
 
     def execute_leading_zero_opcodes(self):
         """"
         This method is used to execute instructions, which opcodes hex representation start with 0
         """
+        opcode = self.registers[OPCODE]
         # To remove redundant scroll down and up methods we check if there is C or B on second youngest digit in opcode
-        operation = self.opcode & 0x00F0
+        operation = opcode & 0x00F0
         if operation == 0x00B0:
-            number_of_lines = self.opcode & 0x000F
+            number_of_lines = opcode & 0x000F
             self.screen_scroll_up(number_of_lines)
+            return
         if operation == 0x00C0:
-            number_of_lines = self.opcode & 0x000F
+            number_of_lines = opcode & 0x000F
             self.screen_scroll_down(number_of_lines)
+            return
 
-        operation = self.opcode & 0x00FF
-        self.leading_zero_opcodes_lookup[operation]()
+        operation = opcode & 0x00FF
+        self.leading_zero_opcodes_lookup[operation](self)
+
+    def execute_leading_five_opcodes(self):
+        """"
+        This method is used to execute instructions, which opcodes hex representation start with 5,
+        Those instructions are distinguished by four youngest bits
+        """
+        operation = self.registers[OPCODE] & 0x000F
+        self.LEADING_FIVE_OPCODES_LOOKUP[operation](self)
 
     def execute_leading_eight_opcodes(self):
         """"
         This method is used to execute instructions, which opcodes hex representation start with 8,
         Those instructions are distinguished by four youngest bits
         """
-        operation = self.opcode & 0x000F
-        self.leading_eight_opcodes_lookup[operation]()
+        operation = self.registers[OPCODE] & 0x000F
+        self.leading_eight_opcodes_lookup[operation](self)
 
     def execute_leading_e_opcodes(self):
         """"
         This method is used to execute instructions, which opcodes hex representation start with E,
         Those instructions are distinguished by eight youngest bits
         """
-        operation = self.opcode & 0x00FF
-        self.leading_e_opcodes_lookup[operation]()
+        operation = self.registers[OPCODE] & 0x00FF
+        self.leading_e_opcodes_lookup[operation](self)
 
     def execute_leading_f_opcodes(self):
         """"
         This method is used to execute instructions, which opcodes hex representation start with F,
         Those instructions are distinguished by eight youngest bits
         """
-        operation = self.opcode & 0x00FF
-        self.leading_f_opcodes_lookup[operation]()
+        operation = self.registers[OPCODE] & 0x00FF
+        self.leading_f_opcodes_lookup[operation](self)
+
+    def skip_next_instruction(self):
+        """
+        Moves PC over the next instruction, XO-CHIP long instruction F000 NNNN is skipped as a whole
+        """
+        registers = self.registers
+        pc = registers[PC]
+        memory = self.memory
+        if (memory[pc] << 8) | memory[pc + 1] == LONG_INSTRUCTION:
+            registers[PC] = pc + 4
+        else:
+            registers[PC] = pc + 2
 
     def screen_scroll_up(self, number_of_lines: int):
         """"
@@ -243,7 +496,7 @@ class CPU:
 
         :param number_of_lines: number of lines to scroll screen up
         """
-        self.screen.scroll_up(number_of_lines)
+        self.screen.scroll_up(number_of_lines, self.registers[PLANES])
 
     def screen_scroll_down(self, number_of_lines: int):
         """"
@@ -253,16 +506,16 @@ class CPU:
         Scrolls screen down n lines ( n/2 if not in extended mode )
         :param number_of_lines: number of lines to scroll screen down
         """
-        self.screen.scroll_down(number_of_lines)
+        self.screen.scroll_down(number_of_lines, self.registers[PLANES])
 
     def clear_screen(self):
         """"
         Opcode: 0x00E0
         Mnemonic: CLS
 
-        Clears screen memory
+        Clears selected bitplanes of screen memory
         """
-        self.screen.clear()
+        self.screen.clear(self.registers[PLANES])
 
     def return_from_subroutine(self):
         """"
@@ -271,8 +524,10 @@ class CPU:
 
         Return from subroutine by subtracting 1 from SP and setting PC to value from memory pointed to by SP
         """
-        self.sp -= 2
-        self.pc = (self.memory[self.sp + 1] << 8) | self.memory[self.sp]
+        registers = self.registers
+        sp = registers[SP] - 2
+        registers[SP] = sp
+        registers[PC] = (self.memory[sp + 1] << 8) | self.memory[sp]
 
     def screen_scroll_right(self):
         """"
@@ -281,7 +536,7 @@ class CPU:
 
         Scrolls screen right 4 lines ( 2 if not in extended mode )
         """
-        self.screen.scroll_right()
+        self.screen.scroll_right(self.registers[PLANES])
 
     def screen_scroll_left(self):
         """"
@@ -290,7 +545,7 @@ class CPU:
 
         Scrolls screen left 4 lines ( 2 if not in extended mode )
         """
-        self.screen.scroll_left()
+        self.screen.scroll_left(self.registers[PLANES])
 
     def exit(self):
         """"
@@ -328,7 +583,7 @@ class CPU:
 
         Sets PC to value defined in 12 youngest bits of Opcode
         """
-        self.pc = self.opcode & 0x0FFF
+        self.registers[PC] = self.registers[OPCODE] & 0x0FFF
 
     def jump_to_subroutine(self):
         """"
@@ -337,12 +592,14 @@ class CPU:
 
         Saves current context ( value of PC ) in memory and sets PC to value defined in 12 youngest bits of Opcode
         """
-        self.memory[self.sp] = self.pc & 0x00FF
-        self.sp += 1
-        self.memory[self.sp] = (self.pc & 0xFF00) >> 8
-        self.sp += 1
+        registers = self.registers
+        sp = registers[SP]
+        pc = registers[PC]
+        self.memory[sp] = pc & 0x00FF
+        self.memory[sp + 1] = (pc & 0xFF00) >> 8
+        registers[SP] = sp + 2
 
-        self.pc = self.opcode & 0x0FFF
+        registers[PC] = registers[OPCODE] & 0x0FFF
 
     def skip_if_register_equals_value(self):
         """"
@@ -352,9 +609,10 @@ class CPU:
         Skips next instruction if value in register Vx is equal to value in 8 youngest bits of opcode
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        if self.v[x] == self.opcode & 0x00FF:
-            self.pc += 2
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        if self.v[x] == opcode & 0x00FF:
+            self.skip_next_instruction()
 
     def skip_if_register_not_equals_value(self):
         """"
@@ -364,9 +622,10 @@ class CPU:
         Skips next instruction if value in register Vx is not equal to value in 8 youngest bits of opcode
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        if self.v[x] != self.opcode & 0x00FF:
-            self.pc += 2
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        if self.v[x] != opcode & 0x00FF:
+            self.skip_next_instruction()
 
     def skip_if_register_equal_other_register(self):
         """"
@@ -377,10 +636,49 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
         if self.v[x] == self.v[y]:
-            self.pc += 2
+            self.skip_next_instruction()
+
+    def store_register_range_in_memory(self):
+        """"
+        Opcode: 0x5XY2
+        Mnemonic: SAVE VX - VY
+
+        XO-CHIP, stores registers VX - VY in memory starting at position pointed to in index register, registers are
+        stored in reverse order if X is bigger than Y. Index register is not changed
+        x is stored in bits 8-11 of opcode
+        y is stored in bits 4-7 of opcode
+        """
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
+        step = 1 if x <= y else -1
+
+        i = self.registers[I]
+        for offset, register in enumerate(range(x, y + step, step)):
+            self.memory[i + offset] = self.v[register]
+
+    def read_register_range_from_memory(self):
+        """"
+        Opcode: 0x5XY3
+        Mnemonic: LOAD VX - VY
+
+        XO-CHIP, sets registers VX - VY with values stored in memory starting at position pointed to in index register,
+        registers are read in reverse order if X is bigger than Y. Index register is not changed
+        x is stored in bits 8-11 of opcode
+        y is stored in bits 4-7 of opcode
+        """
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
+        step = 1 if x <= y else -1
+
+        i = self.registers[I]
+        for offset, register in enumerate(range(x, y + step, step)):
+            self.v[register] = self.memory[i + offset]
 
     def move_value_to_register(self):
         """"
@@ -390,8 +688,9 @@ class CPU:
         Loads value stored in 8 youngest bits of opcode to register Vx
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.v[x] = (self.opcode & 0x00FF)
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        self.v[x] = (opcode & 0x00FF)
 
     def add_value_to_register(self):
         """"
@@ -401,8 +700,9 @@ class CPU:
         Adds value in 8 youngest bits of opcode to register Vx
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.v[x] = (self.v[x] + (self.opcode & 0x00FF)) % 256
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        self.v[x] = (self.v[x] + (opcode & 0x00FF)) % 256
 
     def move_register_to_register(self):
         """"
@@ -413,8 +713,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
         self.v[x] = self.v[y]
 
     def register_logical_or_register(self):
@@ -426,8 +727,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
         self.v[x] |= self.v[y]
 
     def register_logical_and_register(self):
@@ -439,8 +741,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
         self.v[x] &= self.v[y]
 
     def register_logical_xor_register(self):
@@ -452,8 +755,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
         self.v[x] ^= self.v[y]
 
     def add_register_to_register(self):
@@ -465,8 +769,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
 
         sum = self.v[x] + self.v[y]
 
@@ -488,8 +793,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
 
         if self.v[x] >= self.v[y]:
             self.v[x] -= self.v[y]
@@ -509,11 +815,29 @@ class CPU:
         *In original CHIP-8 this instruction would store shifted right value of Vy in Vx, but every emulator and rom
         today uses behavior described above
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
 
         self.v[0xF] = (self.v[x] & 0x1)
         self.v[x] = self.v[x] >> 1
 
+    def shift_other_register_right(self):
+        """"
+        Opcode: 0x8XY6
+        Mnemonic: SHR VX, VY
+
+        Original CHIP-8 variant of SHR (see Quirks.shift_uses_vy), stores the least significant bit of Vy in VF and
+        shifted right value of Vy in Vx
+        x is stored in bits 8-11 of opcode
+        y is stored in bits 4-7 of opcode
+        """
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
+
+        value = self.v[y]
+        self.v[x] = value >> 1
+        self.v[0xF] = value & 0x1
+
     def negative_subtract_register_from_register(self):
         """"
         Opcode: 0x8XY8
@@ -525,8 +849,9 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
 
         if self.v[y] >= self.v[x]:
             self.v[x] = self.v[y] - self.v[x]
@@ -546,11 +871,29 @@ class CPU:
         *In original CHIP-8 this instruction would store shifted left value of Vy in Vx, but every emulator and rom
         today uses behavior described above
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
 
         self.v[0xF] = (self.v[x] & 0x80) >> 8
         self.v[x] = (self.v[x] << 1) & 0xFF
 
+    def shift_other_register_left(self):
+        """"
+        Opcode: 0x8XYE
+        Mnemonic: SHL VX, VY
+
+        Original CHIP-8 variant of SHL (see Quirks.shift_uses_vy), stores the most significant bit of Vy in VF and
+        shifted left value of Vy in Vx
+        x is stored in bits 8-11 of opcode
+        y is stored in bits 4-7 of opcode
+        """
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
+
+        value = self.v[y]
+        self.v[x] = (value << 1) & 0xFF
+        self.v[0xF] = value >> 7
+
     def skip_if_register_not_equal_other_register(self):
         """"
         Opcode: 0x9XY0
@@ -560,10 +903,11 @@ class CPU:
         x is stored in bits 8-11 of opcode
         y is stored in bits 4-7 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
         if self.v[x] != self.v[y]:
-            self.pc += 2
+            self.skip_next_instruction()
 
     def move_value_to_index(self):
         """"
@@ -572,7 +916,7 @@ class CPU:
 
         Loads value stored in 12 youngest bits of opcode to index register
         """
-        self.i = (self.opcode & 0x0FFF)
+        self.registers[I] = (self.registers[OPCODE] & 0x0FFF)
 
     def jump_to_address_plus_v_zero(self):
         """"
@@ -581,7 +925,20 @@ class CPU:
 
         Sets PC to value defined in 12 youngest bits of Opcode plus value stored in register V0
         """
-        self.pc = self.v[0] + (self.opcode & 0x0FFF)
+        self.registers[PC] = self.v[0] + (self.registers[OPCODE] & 0x0FFF)
+
+    def jump_to_address_plus_register(self):
+        """"
+        Opcode: 0xBXNN
+        Mnemonic: JP VX, XNN
+
+        SCHIP variant of JP V0, NNN (see Quirks.jump_uses_vx), sets PC to value defined in 12 youngest bits of opcode
+        plus value stored in register Vx
+        x is stored in bits 8-11 of opcode
+        """
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
+        self.registers[PC] = self.v[x] + (opcode & 0x0FFF)
 
     def generate_random_number(self):
         """"
@@ -591,9 +948,10 @@ class CPU:
         Sets value in register Vx as a result of logical AND operation between random number from range (0, 255) and
         value stored in 8 youngest bits of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
+        opcode = self.registers[OPCODE]
+        x = (opcode & 0x0F00) >> 8
         random_int = randint(0, 255)
-        self.v[x] = (self.opcode & 0x00FF) & random_int
+        self.v[x] = (opcode & 0x00FF) & random_int
 
     def draw_sprite_v1(self):
         """"
@@ -606,12 +964,13 @@ class CPU:
 
         This method was causing weird screen behavior
         """
+        opcode = self.registers[OPCODE]
         # TODO Fix this method
-        x = (self.opcode & 0x0F00) >> 8
+        x = (opcode & 0x0F00) >> 8
         vx = self.v[x]
-        y = (self.opcode & 0x00F0) >> 4
+        y = (opcode & 0x00F0) >> 4
         vy = self.v[y]
-        n = (self.opcode & 0x000F)
+        n = (opcode & 0x000F)
 
         self.v[0xF] = 0
 
@@ -624,7 +983,7 @@ class CPU:
             for b in range(num_of_bytes):
 
                 # Byte describing pixels is encoded as int but we need binary representation of that number
-                pixels = bin(self.memory[self.i + horizontal_line_num + b])[2:].zfill(8)
+                pixels = bin(self.memory[self.registers[I] + horizontal_line_num + b])[2:].zfill(8)
                 # In CHIP-8 when sprite does not fit on screen we draw the rest of it on the opposite side of screen
                 y_pos = (vy + horizontal_line_num) % self.screen.height
 
@@ -640,38 +999,71 @@ class CPU:
                     pixel = self.screen.xor_pixel_value(x_pos, y_pos, pixel)
                     self.screen.draw_pixel(x_pos, y_pos, pixel)
 
+    def sprite_planes(self, rows: int) -> "np.ndarray":
+        """
+        Reads sprite for every selected bitplane, sprites for consecutive selected planes are stored one after
+        another starting at address in index register (XO-CHIP). Pixels of all planes are combined into one array of
+        bitmap values, bit p of value is pixel of plane p. Rows are unpacked whole, 8 pixels from every byte
+
+        :param rows: Height of sprite, 0 selects 16x16 sprite (SCHIP) which is stored as two bytes per row
+        :return: Array with the same layout as Screen.bitmap, indexed [x, y]
+        """
+        planes = self.registers[PLANES]
+        selected = [plane for plane in range(Config.NUMBER_OF_PLANES) if planes >> plane & 1]
+        row_bytes = 1 if rows else 2
+        rows = rows or 16
+        size = rows * row_bytes * len(selected)
+        i = self.registers[I]
+        data = np.frombuffer(self.memory[i:i + size], dtype="uint8")
+        # Memory ends before sprite does, missing rows are empty
+        data = np.pad(data, (0, size - data.size))
+        bits = np.unpackbits(data).reshape(len(selected), rows, 8 * row_bytes).astype("int8")
+        sprite = bits[0] << selected[0]
+        for index in range(1, len(selected)):
+            sprite |= bits[index] << selected[index]
+        return sprite.T
+
     def draw_sprite(self):
         """"
         Opcode: 0xDXYN
         Mnemonic: DRW VX, VY, N
 
-        Draws a sprite at coordinate (VX, VY) that has width of 8 pixels (16 pixels in extended mode)
-        and height of N pixels. Each horizontal line is read from memory
-        location pointed in I register plus number of line
+        Draws a sprite at coordinate (VX, VY) that has width of 8 pixels and height of N pixels on every selected
+        bitplane, DXY0 draws sprite of 16x16 pixels. Each horizontal line is read from memory location pointed in
+        I register plus number of line (times two for 16x16 sprite). Parts of sprite that do not fit on screen are drawn
+        on the opposite side. VF is set to 1 if any pixel is turned off
         """
-        # TODO add extended mode support
-        x = (self.opcode & 0x0F00) >> 8
-        vx = self.v[x]
-        y = (self.opcode & 0x00F0) >> 4
-        vy = self.v[y]
-        n = (self.opcode & 0x000F)
+        opcode = self.registers[OPCODE]
+        n = opcode & 0x000F
 
         self.v[0xF] = 0
+        if not self.registers[PLANES]:
+            return
 
-        for y_offset in range(n):
-            sprite = self.memory[self.i + y_offset]
+        vx = self.v[(opcode & 0x0F00) >> 8]
+        vy = self.v[(opcode & 0x00F0) >> 4]
+        if self.screen.xor_sprite(vx, vy, self.sprite_planes(n), clip=False):
+            self.v[0xF] = 1
 
-            y_position = (vy + y_offset) % self.screen.height
+    def draw_clipped_sprite(self):
+        """"
+        Opcode: 0xDXYN
+        Mnemonic: DRW VX, VY, N
 
-            for x_offset, bit in enumerate(bin(sprite)[2:].zfill(8)):
-                x_position = (vx + x_offset) % self.screen.width
+        Variant of DRW (see Quirks.clip_sprites) in which sprite starts at coordinate (VX, VY) wrapped to screen size,
+        but parts of sprite that do not fit on screen are not drawn
+        """
+        opcode = self.registers[OPCODE]
+        n = opcode & 0x000F
 
-                current_pixel = self.screen.get_pixel(x_position, y_position)
+        self.v[0xF] = 0
+        if not self.registers[PLANES]:
+            return
 
-                if int(bit) == current_pixel == 1:
-                    self.v[0xF] = 1
-                pixel_value = self.screen.xor_pixel_value(x_position, y_position, int(bit))
-                self.screen.draw_pixel(x_position, y_position, pixel_value)
+        vx = self.v[(opcode & 0x0F00) >> 8]
+        vy = self.v[(opcode & 0x00F0) >> 4]
+        if self.screen.xor_sprite(vx, vy, self.sprite_planes(n), clip=True):
+            self.v[0xF] = 1
 
     def skip_if_key_is_pressed(self):
         """"
@@ -681,11 +1073,10 @@ class CPU:
         Skips next instruction if key specified in register Vx is pressed
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
         key_in_vx = self.v[x]
-        pressed_keys = key.get_pressed()
-        if pressed_keys[Config.KEY_MAPPING[key_in_vx]]:
-            self.pc += 2
+        if self.keypad.keys[key_in_vx]:
+            self.skip_next_instruction()
 
     def skip_if_key_is_not_pressed(self):
         """"
@@ -695,11 +1086,37 @@ class CPU:
         Skips next instruction if key specified in register Vx is pressed
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
         key_in_vx = self.v[x]
-        pressed_keys = key.get_pressed()
-        if not pressed_keys[Config.KEY_MAPPING[key_in_vx]]:
-            self.pc += 2
+        if not self.keypad.keys[key_in_vx]:
+            self.skip_next_instruction()
+
+    def load_long_address_to_index(self):
+        """"
+        Opcode: 0xF000 0xNNNN
+        Mnemonic: LD I, NNNN
+
+        XO-CHIP, loads 16 bit address stored in the word following the opcode to index register and skips that word.
+        Other FX00 opcodes are not instructions
+
+        :throws UnknownInstructionException: when opcode is FX00 with X other than 0
+        """
+        registers = self.registers
+        if registers[OPCODE] != LONG_INSTRUCTION:
+            raise self.UnknownInstructionException(registers[OPCODE])
+        pc = registers[PC]
+        registers[I] = (self.memory[pc] << 8) | self.memory[pc + 1]
+        registers[PC] = pc + 2
+
+    def select_planes(self):
+        """"
+        Opcode: 0xFN01
+        Mnemonic: PLANE N
+
+        XO-CHIP, selects bitplanes used by drawing, scrolling and clearing, bit p of N selects plane p
+        N is stored in bits 8-11 of opcode
+        """
+        self.registers[PLANES] = ((self.registers[OPCODE] & 0x0F00) >> 8) & ((1 << Config.NUMBER_OF_PLANES) - 1)
 
     def move_delay_to_register(self):
         """"
@@ -709,8 +1126,8 @@ class CPU:
         Sets value in register Vx to value from delay timer
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.v[x] = self.timer_dt
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+        self.v[x] = self.registers[TIMER_DT]
 
     def wait_for_keypress(self):
         """"
@@ -719,20 +1136,20 @@ class CPU:
 
         All execution stops until key is pressed, then the value of that key is stored in Vx
         x is stored in bits 8-11 of opcode
-        """
-        x = (self.opcode & 0x0F00) >> 8
 
-        key_pressed = False
-        while not key_pressed:
-            event = pygame.event.wait()
-            if event.type == KEYDOWN:
-                pressed_keys = key.get_pressed()
+        Only a new press of a key counts (see Keypad.wait_for_key), key held since an earlier FX0A does not. If no key
+        was pressed PC is moved back and CPU is halted, run loops stop dispatching instructions until wake finds a
+        pressed key, then this instruction is executed again. Snapshot taken while halted does not need the
+        halted flag, restored CPU executes this instruction and halts again
+        """
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
 
-                for key_address, key_value in Config.KEY_MAPPING.items():
-                    if pressed_keys[key_value]:
-                        self.v[x] = key_address
-                        key_pressed = True
-                        break
+        key_address = self.keypad.wait_for_key()
+        if key_address is None:
+            self.registers[PC] -= 2
+            self.halted = True
+        else:
+            self.v[x] = key_address
 
     def move_register_to_delay_timer(self):
         """"
@@ -742,8 +1159,8 @@ class CPU:
         Sets value in delay timer to value from register Vx
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.timer_dt = self.v[x]
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+        self.registers[TIMER_DT] = self.v[x]
 
     def move_register_to_sound_timer(self):
         """"
@@ -753,8 +1170,8 @@ class CPU:
         Sets value in sound timer to value from register Vx
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.timer_st = self.v[x]
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+        self.registers[TIMER_ST] = self.v[x]
 
     def add_register_to_index(self):
         """"
@@ -764,8 +1181,8 @@ class CPU:
         Sets value in index register I to sum of values in registers Vx and I
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.i += self.v[x]
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+        self.registers[I] = (self.registers[I] + self.v[x]) & 0xFFFF
 
     def move_sprite_address_to_index(self):
         """"
@@ -777,21 +1194,21 @@ class CPU:
         value stored in Vx by 5
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.i = self.v[x] * 5
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+        self.registers[I] = self.v[x] * 5
 
     def move_extended_sprite_address_to_index(self):
         """"
         Opcode: 0xFX30
         Mnemonic: LDH F, Vx
 
-        Sets value in index register I to address of the sprite for decimal character specified in Vx.
-        Each character is represented as 10 bytes so to get specific character address we need to multiply
-        value stored in Vx by 10
+        Sets value in index register I to address of the large sprite for hexadecimal character specified in
+        lowest 4 bits of Vx. Each character is represented as 10 bytes so to get specific character address we need to
+        multiply digit by 10 and add address of large fontset
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
-        self.i = self.v[x] * 10
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+        self.registers[I] = LARGE_FONT_ADDRESS + (self.v[x] & 0xF) * 10
 
     def store_bcd_in_memory(self):
         """"
@@ -802,12 +1219,12 @@ class CPU:
         tens are stored at I + 1 and ones are stored at addres I+2
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
         value = str(self.v[x]).zfill(3)
 
-        self.memory[self.i] = int(value[0])
-        self.memory[self.i + 1] = int(value[1])
-        self.memory[self.i + 2] = int(value[2])
+        self.memory[self.registers[I]] = int(value[0])
+        self.memory[self.registers[I] + 1] = int(value[1])
+        self.memory[self.registers[I] + 2] = int(value[2])
 
     def store_registers_in_memory(self):
         """"
@@ -818,10 +1235,10 @@ class CPU:
         register is stored in next memory cell
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
 
-        for i in range(x + 1):
-            self.memory[self.i + i] = self.v[i]
+        i = self.registers[I]
+        self.memory[i:i + x + 1] = self.v[:x + 1]
 
     def read_registers_from_memory(self):
         """"
@@ -832,7 +1249,113 @@ class CPU:
         every consecutive value is stored in next memory cell
         x is stored in bits 8-11 of opcode
         """
-        x = (self.opcode & 0x0F00) >> 8
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+
+        i = self.registers[I]
+        self.v[:x + 1] = self.memory[i:i + x + 1]
+
+    def store_registers_in_memory_and_increment_index(self):
+        """"
+        Opcode: 0xFX55
+        Mnemonic: LD [I], Vx
 
-        for i in range(x + 1):
-            self.v[i] = self.memory[self.i + i]
+        Original CHIP-8 variant of LD [I], Vx (see Quirks.load_store_increments_i), after storing registers V0 - VX
+        index register points to memory cell after the last stored register
+        x is stored in bits 8-11 of opcode
+        """
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+
+        i = self.registers[I]
+        self.memory[i:i + x + 1] = self.v[:x + 1]
+        self.registers[I] = (i + x + 1) & 0xFFFF
+
+    def read_registers_from_memory_and_increment_index(self):
+        """"
+        Opcode: 0xFX65
+        Mnemonic: LD Vx, [I]
+
+        Original CHIP-8 variant of LD Vx, [I] (see Quirks.load_store_increments_i), after reading registers V0 - VX
+        index register points to memory cell after the last read value
+        x is stored in bits 8-11 of opcode
+        """
+        x = (self.registers[OPCODE] & 0x0F00) >> 8
+
+        i = self.registers[I]
+        self.v[:x + 1] = self.memory[i:i + x + 1]
+        self.registers[I] = (i + x + 1) & 0xFFFF
+
+    # Python dictionary is used in place of if-else statements when deciding what method to call
+    # In most cases opcodes are determined by four oldest bits and in this dict only those bits are used
+    # Handlers are plain functions, so they are called with CPU instance as the only argument
+    OPCODE_LOOKUP = {
+        0x0: execute_leading_zero_opcodes,
+        0x1: jump_to_address,
+        0x2: jump_to_subroutine,
+        0x3: skip_if_register_equals_value,
+        0x4: skip_if_register_not_equals_value,
+        0x5: execute_leading_five_opcodes,
+        0x6: move_value_to_register,
+        0x7: add_value_to_register,
+        0x8: execute_leading_eight_opcodes,
+        0x9: skip_if_register_not_equal_other_register,
+        0xA: move_value_to_index,
+        0xB: jump_to_address_plus_v_zero,
+        0xC: generate_random_number,
+        0xD: draw_sprite,
+        0xE: execute_leading_e_opcodes,
+        0xF: execute_leading_f_opcodes
+    }
+
+    LEADING_ZERO_OPCODES_LOOKUP = {
+        0xE0: clear_screen,
+        0xEE: return_from_subroutine,
+        0xFB: screen_scroll_right,
+        0xFC: screen_scroll_left,
+        0xFD: exit,
+        0xFE: disable_extended_screen,
+        0xFF: enable_extended_screen
+    }
+
+    LEADING_FIVE_OPCODES_LOOKUP = {
+        0x0: skip_if_register_equal_other_register,
+        0x2: store_register_range_in_memory,
+        0x3: read_register_range_from_memory
+    }
+
+    LEADING_EIGHT_OPCODES_LOOKUP = {
+        0x0: move_register_to_register,
+        0x1: register_logical_or_register,
+        0x2: register_logical_and_register,
+        0x3: register_logical_xor_register,
+        0x4: add_register_to_register,
+        0x5: subtract_register_from_register,
+        0x6: shift_register_right,
+        0x7: negative_subtract_register_from_register,
+        0xE: shift_register_left
+    }
+
+    LEADING_E_OPCODES_LOOKUP = {
+        0x9E: skip_if_key_is_pressed,
+        0xA1: skip_if_key_is_not_pressed
+    }
+
+    LEADING_F_OPCODES_LOOKUP = {
+        0x00: load_long_address_to_index,
+        0x01: select_planes,
+        0x07: move_delay_to_register,
+        0x0A: wait_for_keypress,
+        0x15: move_register_to_delay_timer,
+        0x18: move_register_to_sound_timer,
+        0x1E: add_register_to_index,
+        0x29: move_sprite_address_to_index,
+        0x30: move_extended_sprite_address_to_index,
+        0x33: store_bcd_in_memory,
+        0x55: store_registers_in_memory,
+        0x65: read_registers_from_memory
+    }
+
+    # Lookup tables with handler variants bound for given Quirks, filled by lookup_tables method
+    QUIRK_LOOKUP_TABLES = {
+        Quirks(): (OPCODE_LOOKUP, LEADING_ZERO_OPCODES_LOOKUP, LEADING_EIGHT_OPCODES_LOOKUP,
+                   LEADING_E_OPCODES_LOOKUP, LEADING_F_OPCODES_LOOKUP)
+    }
@@ -0,0 +1,565 @@
+import cmd
+import operator
+import socket
+import threading
+from typing import Callable, List, Optional, Set, TextIO, Tuple
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.transpiler import CompiledRunner
+
+NO_ACCESS = range(0)
+
+# Operators available in register conditions, "changed" is handled separately
+CONDITION_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+SPECIAL_REGISTERS = {"pc": "pc", "sp": "sp", "i": "i", "dt": "timer_dt", "st": "timer_st"}
+
+
+def register_reader(name: str) -> Callable[[CPU], int]:
+    """
+    Returns function reading register from CPU
+
+    :param name: v0 - vf, pc, sp, i, dt or st
+    :throws ValueError: When name is not a register
+    """
+    name = name.lower()
+    if name in SPECIAL_REGISTERS:
+        attribute = SPECIAL_REGISTERS[name]
+        return lambda cpu: getattr(cpu, attribute)
+    if len(name) == 2 and name[0] == "v" and name[1] in "0123456789abcdef":
+        index = int(name[1], 16)
+        return lambda cpu: cpu.v[index]
+    raise ValueError("Unknown register {}".format(name))
+
+
+class Condition:
+    """
+    Register condition checked after every instruction, for example v3 == 5 or i changed
+    """
+
+    def __init__(self, register: str, condition: str, value: Optional[int] = None):
+        """
+        :param register: Name of register, see register_reader
+        :param condition: One of CONDITION_OPERATORS or "changed"
+        :param value: Value register is compared with, not used by "changed"
+        :throws ValueError: When register or condition is not known
+        """
+        self.read = register_reader(register)
+        if condition != "changed" and condition not in CONDITION_OPERATORS:
+            raise ValueError("Unknown condition {}".format(condition))
+        self.description = " ".join(str(part) for part in (register, condition, value) if part is not None)
+        self.condition = condition
+        self.value = value
+        self.last_value: Optional[int] = None
+
+    def reset(self, cpu: CPU):
+        """
+        Remembers current value of register, "changed" condition compares with it
+        """
+        self.last_value = self.read(cpu)
+
+    def check(self, cpu: CPU) -> bool:
+        current = self.read(cpu)
+        if self.condition == "changed":
+            changed = current != self.last_value
+            self.last_value = current
+            return changed
+        return CONDITION_OPERATORS[self.condition](current, self.value)
+
+
+def memory_accesses(cpu: CPU, opcode: int) -> Tuple[range, range]:
+    """
+    Returns memory ranges instruction will read and write, instruction fetch is not included
+
+    :param cpu: CPU which will execute instruction
+    :param opcode: Opcode of instruction
+    :return: Read addresses and written addresses
+    """
+    family = opcode & 0xF000
+    x = (opcode & 0x0F00) >> 8
+    i = cpu.i
+
+    if family == 0x2000:
+        return NO_ACCESS, range(cpu.sp, cpu.sp + 2)
+    if opcode == 0x00EE:
+        return range(cpu.sp - 2, cpu.sp), NO_ACCESS
+    if family == 0x5000 and opcode & 0x000F in (0x2, 0x3):
+        count = abs(x - ((opcode & 0x00F0) >> 4)) + 1
+        if opcode & 0x000F == 0x2:
+            return NO_ACCESS, range(i, i + count)
+        return range(i, i + count), NO_ACCESS
+    if family == 0xD000:
+        planes = bin(cpu.planes).count("1")
+        # DXY0 draws 16x16 sprite, two bytes per row
+        size = opcode & 0x000F or 32
+        return range(i, i + size * planes), NO_ACCESS
+    if family == 0xF000:
+        operation = opcode & 0x00FF
+        if operation == 0x33:
+            return NO_ACCESS, range(i, i + 3)
+        if operation == 0x55:
+            return NO_ACCESS, range(i, i + x + 1)
+        if operation == 0x65:
+            return range(i, i + x + 1), NO_ACCESS
+    return NO_ACCESS, NO_ACCESS
+
+
+class Debugger:
+    """
+    Runs CPU with breakpoints, memory watchpoints and register conditions. It has the same run method as
+    CompiledRunner, so it can be used wherever runner is accepted
+
+    run is switched between three implementations when debugger state changes: fast (nothing is armed, instructions
+    are executed exactly like without debugger), checked (every instruction is checked) and paused (nothing is
+    executed), so there is no check of debugger state per instruction when nothing is armed
+    """
+
+    def __init__(self, cpu: CPU, runner: Optional[CompiledRunner] = None, paused: bool = False):
+        """
+        :param cpu: CPU to debug
+        :param runner: Runner executing compiled ROM used when nothing is armed, defaults to None
+        :param paused: If True debugger starts paused, defaults to False
+        """
+        self.cpu = cpu
+        self.runner = runner
+        self.lock = threading.RLock()
+
+        self.breakpoints: Set[int] = set()
+        self.read_watchpoints: Set[int] = set()
+        self.write_watchpoints: Set[int] = set()
+        self.conditions: List[Condition] = []
+        # Temporary stop condition used by step over and step out
+        self.until: Optional[Callable[[], bool]] = None
+
+        self.paused = paused
+        self.reason: Optional[str] = "started paused" if paused else None
+        self.stopped = threading.Event()
+        if paused:
+            self.stopped.set()
+        # Breakpoint at PC is not checked for the first instruction after resuming, so execution can leave it
+        self.skip_breakpoint = False
+
+        self.run_implementation: Callable[[int], int] = self.run_fast
+        self.select_implementation()
+
+    @property
+    def armed(self) -> bool:
+        """
+        True if anything has to be checked per instruction
+        """
+        return bool(self.breakpoints or self.read_watchpoints or self.write_watchpoints or self.conditions
+                    or self.until is not None)
+
+    def select_implementation(self):
+        """
+        Switches run implementation to match debugger state, it has to be called after every change of state
+        """
+        if self.paused:
+            self.run_implementation = self.run_paused
+        elif self.armed:
+            self.run_implementation = self.run_checked
+        else:
+            self.run_implementation = self.run_fast
+
+    def run(self, cycles: int) -> int:
+        """
+        Executes up to given number of instructions, less if execution stops at breakpoint
+
+        :param cycles: Number of instructions to execute
+        :return: Number of executed instructions
+        """
+        with self.lock:
+            return self.run_implementation(cycles)
+
+    def run_fast(self, cycles: int) -> int:
+        if self.runner is not None:
+            return self.runner.run(cycles)
+
+        cpu = self.cpu
+        execute_opcode = cpu.execute_opcode
+        for executed in range(cycles):
+            execute_opcode()
+            if not cpu.running or cpu.halted:
+                return executed + 1
+        return cycles
+
+    def run_paused(self, cycles: int) -> int:
+        return 0
+
+    def run_checked(self, cycles: int) -> int:
+        cpu = self.cpu
+        for executed in range(cycles):
+            if not cpu.running or cpu.halted:
+                return executed
+            reason = self.check_before()
+            if reason is not None:
+                self.pause(reason)
+                return executed
+            self.execute()
+            reason = self.check_after()
+            if reason is not None:
+                self.pause(reason)
+                return executed + 1
+        return cycles
+
+    def execute(self):
+        """
+        Executes single instruction with the interpreter
+        """
+        if self.runner is not None:
+            self.runner.interpret()
+        else:
+            self.cpu.execute_opcode()
+
+    def check_before(self) -> Optional[str]:
+        """
+        Checks breakpoints and watchpoints before instruction at PC is executed
+
+        :return: Reason of stopping, None if execution should continue
+        """
+        cpu = self.cpu
+        pc = cpu.pc
+        if self.skip_breakpoint:
+            self.skip_breakpoint = False
+        elif pc in self.breakpoints:
+            return "breakpoint {:#05x}".format(pc)
+
+        if self.read_watchpoints or self.write_watchpoints:
+            opcode = (cpu.memory[pc] << 8) | cpu.memory[pc + 1]
+            reads, writes = memory_accesses(cpu, opcode)
+            for address in reads:
+                if address in self.read_watchpoints:
+                    return "read of {:#05x} by {:04x} at {:#05x}".format(address, opcode, pc)
+            for address in writes:
+                if address in self.write_watchpoints:
+                    return "write of {:#05x} by {:04x} at {:#05x}".format(address, opcode, pc)
+        return None
+
+    def check_after(self) -> Optional[str]:
+        """
+        Checks register conditions and temporary stop condition after instruction is executed
+
+        :return: Reason of stopping, None if execution should continue
+        """
+        for condition in self.conditions:
+            if condition.check(self.cpu):
+                return "condition {}".format(condition.description)
+        if self.until is not None and self.until():
+            return "step finished"
+        return None
+
+    def pause(self, reason: str = "paused"):
+        """
+        Stops execution, threads waiting in wait_until_stopped are woken up
+
+        :param reason: Reason of stopping shown to user
+        """
+        with self.lock:
+            self.paused = True
+            self.reason = reason
+            self.until = None
+            self.select_implementation()
+            self.stopped.set()
+
+    def resume(self):
+        """
+        Continues execution until breakpoint, watchpoint or condition stops it
+        """
+        with self.lock:
+            self.paused = False
+            self.reason = None
+            self.skip_breakpoint = True
+            for condition in self.conditions:
+                condition.reset(self.cpu)
+            self.stopped.clear()
+            self.select_implementation()
+
+    def wait_until_stopped(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until execution stops
+
+        :return: True if execution stopped, False on timeout
+        """
+        return self.stopped.wait(timeout)
+
+    def step(self, count: int = 1) -> int:
+        """
+        Executes instructions while paused, breakpoints are not checked
+
+        :param count: Number of instructions to execute
+        :return: Number of executed instructions
+        """
+        with self.lock:
+            executed = 0
+            while executed < count and self.cpu.running:
+                self.execute()
+                executed += 1
+            return executed
+
+    def step_over(self):
+        """
+        Executes instruction, if it is a call whole subroutine is executed. Execution can be stopped earlier by
+        breakpoint
+        """
+        cpu = self.cpu
+        opcode = (cpu.memory[cpu.pc] << 8) | cpu.memory[cpu.pc + 1]
+        if opcode & 0xF000 != 0x2000:
+            self.step()
+            return
+
+        return_address, stack_pointer = cpu.pc + 2, cpu.sp
+        self.resume_until(lambda: cpu.pc == return_address and cpu.sp == stack_pointer)
+
+    def step_out(self):
+        """
+        Executes instructions until current subroutine returns. Execution can be stopped earlier by breakpoint
+        """
+        cpu = self.cpu
+        stack_pointer = cpu.sp
+        if stack_pointer <= Config.STACK_POINTER:
+            raise ValueError("Not in subroutine")
+        self.resume_until(lambda: cpu.sp < stack_pointer)
+
+    def resume_until(self, until: Callable[[], bool]):
+        with self.lock:
+            self.resume()
+            self.until = until
+            self.select_implementation()
+
+    def call_stack(self) -> List[int]:
+        """
+        Returns return addresses stored on stack, the most recent call is the last one
+        """
+        cpu = self.cpu
+        memory = cpu.memory
+        return [memory[address] | (memory[address + 1] << 8)
+                for address in range(Config.STACK_POINTER, cpu.sp - 1, 2)]
+
+    def add_breakpoint(self, address: int):
+        with self.lock:
+            self.breakpoints.add(address)
+            self.select_implementation()
+
+    def remove_breakpoint(self, address: int):
+        with self.lock:
+            self.breakpoints.discard(address)
+            self.select_implementation()
+
+    def add_watchpoint(self, address: int, length: int = 1, read: bool = False, write: bool = True):
+        """
+        Stops execution before instruction reading or writing memory range
+
+        :param address: First watched address
+        :param length: Number of watched bytes, defaults to 1
+        :param read: If True reads are watched, defaults to False
+        :param write: If True writes are watched, defaults to True
+        """
+        with self.lock:
+            addresses = range(address, address + length)
+            if read:
+                self.read_watchpoints.update(addresses)
+            if write:
+                self.write_watchpoints.update(addresses)
+            self.select_implementation()
+
+    def add_condition(self, condition: Condition):
+        with self.lock:
+            condition.reset(self.cpu)
+            self.conditions.append(condition)
+            self.select_implementation()
+
+    def clear(self):
+        """
+        Removes all breakpoints, watchpoints and conditions
+        """
+        with self.lock:
+            self.breakpoints.clear()
+            self.read_watchpoints.clear()
+            self.write_watchpoints.clear()
+            self.conditions.clear()
+            self.select_implementation()
+
+
+def parse_number(text: str) -> int:
+    """
+    Parses decimal or 0x prefixed hexadecimal number
+    """
+    return int(text, 0)
+
+
+class DebuggerShell(cmd.Cmd):
+    """
+    Command line front end of Debugger, it can use any text streams, so it works both on console and on socket
+    """
+
+    intro = "PyCHIP8 debugger, type help or ? to list commands"
+    prompt = "(chip8) "
+
+    def __init__(self, debugger: Debugger, stdin: Optional[TextIO] = None, stdout: Optional[TextIO] = None):
+        super().__init__(stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.debugger = debugger
+        self.reporter: Optional[threading.Thread] = None
+
+    def write(self, text: str):
+        self.stdout.write(text + "\n")
+        self.stdout.flush()
+
+    def onecmd(self, line: str) -> bool:
+        try:
+            return super().onecmd(line)
+        except (ValueError, IndexError) as error:
+            self.write("Error: {}".format(error))
+            return False
+
+    def location(self) -> str:
+        cpu = self.debugger.cpu
+        opcode = (cpu.memory[cpu.pc] << 8) | cpu.memory[cpu.pc + 1]
+        return "{:#05x}: {:04x}".format(cpu.pc, opcode)
+
+    def report_stop(self):
+        """
+        Reports stop of execution when it happens, shell accepts commands (for example pause) in the meantime
+        """
+        if self.reporter is not None and self.reporter.is_alive():
+            return
+
+        def report():
+            self.debugger.wait_until_stopped()
+            self.write("Stopped: {}".format(self.debugger.reason))
+            self.write(self.location())
+
+        self.reporter = threading.Thread(target=report, name="PyCHIP8 debugger report", daemon=True)
+        self.reporter.start()
+
+    def do_break(self, argument: str):
+        """break ADDRESS - stop before executing instruction at address"""
+        self.debugger.add_breakpoint(parse_number(argument))
+
+    def do_delete(self, argument: str):
+        """delete ADDRESS - remove breakpoint"""
+        self.debugger.remove_breakpoint(parse_number(argument))
+
+    def do_watch(self, argument: str):
+        """watch [r|w|rw] ADDRESS [LENGTH] - stop before instruction reading or writing memory, default w"""
+        arguments = argument.split()
+        mode = arguments.pop(0) if arguments and arguments[0] in ("r", "w", "rw") else "w"
+        address = parse_number(arguments[0])
+        length = parse_number(arguments[1]) if len(arguments) > 1 else 1
+        self.debugger.add_watchpoint(address, length, read="r" in mode, write="w" in mode)
+
+    def do_cond(self, argument: str):
+        """cond REGISTER OPERATOR VALUE | cond REGISTER changed - stop after instruction making condition true"""
+        arguments = argument.split()
+        value = parse_number(arguments[2]) if len(arguments) > 2 else None
+        self.debugger.add_condition(Condition(arguments[0], arguments[1], value))
+
+    def do_clear(self, argument: str):
+        """clear - remove all breakpoints, watchpoints and conditions"""
+        self.debugger.clear()
+
+    def do_info(self, argument: str):
+        """info - list breakpoints, watchpoints and conditions"""
+        debugger = self.debugger
+        self.write("Breakpoints: " + " ".join("{:#05x}".format(address) for address in sorted(debugger.breakpoints)))
+        self.write("Read watchpoints: " + " ".join(
+            "{:#05x}".format(address) for address in sorted(debugger.read_watchpoints)))
+        self.write("Write watchpoints: " + " ".join(
+            "{:#05x}".format(address) for address in sorted(debugger.write_watchpoints)))
+        self.write("Conditions: " + ", ".join(condition.description for condition in debugger.conditions))
+
+    def do_pause(self, argument: str):
+        """pause - stop execution"""
+        self.debugger.pause()
+        self.write(self.location())
+
+    def do_continue(self, argument: str):
+        """continue - run until breakpoint, watchpoint or condition stops execution"""
+        self.debugger.resume()
+        self.report_stop()
+
+    def do_step(self, argument: str):
+        """step [COUNT] - execute instructions"""
+        self.debugger.step(parse_number(argument) if argument else 1)
+        self.write(self.location())
+
+    def do_next(self, argument: str):
+        """next - execute instruction, whole subroutine if it is a call"""
+        self.debugger.step_over()
+        self.report_stop()
+
+    def do_finish(self, argument: str):
+        """finish - run until current subroutine returns"""
+        self.debugger.step_out()
+        self.report_stop()
+
+    def do_regs(self, argument: str):
+        """regs - show registers"""
+        cpu = self.debugger.cpu
+        self.write(" ".join("v{:x}={:02x}".format(index, value) for index, value in enumerate(cpu.v)))
+        self.write("pc={:#05x} sp={:#04x} i={:#05x} dt={} st={}".format(
+            cpu.pc, cpu.sp, cpu.i, cpu.timer_dt, cpu.timer_st))
+
+    def do_stack(self, argument: str):
+        """stack - show return addresses, the most recent call last"""
+        self.write(" ".join("{:#05x}".format(address) for address in self.debugger.call_stack()) or "empty")
+
+    def do_mem(self, argument: str):
+        """mem ADDRESS [LENGTH] - show memory"""
+        arguments = argument.split()
+        address = parse_number(arguments[0])
+        length = parse_number(arguments[1]) if len(arguments) > 1 else 16
+        data = self.debugger.cpu.memory[address:address + length]
+        for offset in range(0, len(data), 16):
+            self.write("{:#05x}: {}".format(address + offset, data[offset:offset + 16].hex()))
+
+    def do_quit(self, argument: str) -> bool:
+        """quit - leave debugger, execution continues without breakpoints"""
+        self.debugger.clear()
+        self.debugger.resume()
+        return True
+
+    do_EOF = do_quit
+
+
+def serve_shell(debugger: Debugger, port: int):
+    """
+    Accepts connections on localhost and runs debugger shell for each of them, one at a time. This function does not
+    return, it is meant to be run on a separate thread
+
+    :param debugger: Debugger controlled by shell
+    :param port: TCP port to listen on
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", port))
+    listener.listen()
+    while True:
+        connection, _ = listener.accept()
+        with connection, connection.makefile("r") as stdin, connection.makefile("w") as stdout:
+            DebuggerShell(debugger, stdin, stdout).cmdloop()
+
+
+def start_shell(debugger: Debugger, port: Optional[int] = None) -> threading.Thread:
+    """
+    Runs debugger shell on a daemon thread, on console or on socket if port is given
+
+    :param debugger: Debugger controlled by shell
+    :param port: TCP port on localhost, defaults to None (console)
+    """
+    if port is None:
+        target, arguments = DebuggerShell(debugger).cmdloop, ()
+    else:
+        target, arguments = serve_shell, (debugger, port)
+    thread = threading.Thread(target=target, args=arguments, name="PyCHIP8 debugger", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import random
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU, MODE, OPCODE
+from PyCHIP8.headless import CYCLES_PER_FRAME, create_headless_cpu
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.predecoder import PredecodedRunner
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import MAX_BLOCK_LENGTH, CompiledRunner, compile_rom
+
+np = lazy_import("numpy")
+
+# Names of 16 bit registers in the order in which they are stored in CPU state (see PyCHIP8.cpu)
+REGISTER_NAMES = ("pc", "sp", "i", "timer_dt", "timer_st", "opcode", "mode", "planes")
+
+
+class Divergence(NamedTuple):
+    """
+    First difference between engine and reference interpreter
+    """
+    instructions: int  # number of instructions executed before difference was found
+    location: str  # register, memory address or screen that differs
+    engine: object
+    reference: object
+    trace: List[str]  # last instructions executed by reference, the last one is where difference was found
+
+    def __str__(self):
+        lines = ["Divergence after {} instructions in {}: engine {} reference {}".format(
+            self.instructions, self.location, self.engine, self.reference)]
+        lines.extend("    " + line for line in self.trace)
+        return "\n".join(lines)
+
+
+def compare(engine: CPU, reference: CPU) -> Optional[Tuple[str, object, object]]:
+    """
+    Compares architectural state and screens of two CPUs, opcode register is not compared, because engines that decode
+    instructions on their own do not have to update it
+
+    :return: Location of the first difference with values in engine and reference, None if states are the same
+    """
+    # Opcode register is stored as two bytes at index OPCODE * 2
+    opcode_start, opcode_end = OPCODE * 2, OPCODE * 2 + 2
+    if (engine.state[:opcode_start] != reference.state[:opcode_start]
+            or engine.state[opcode_end:] != reference.state[opcode_end:]):
+        for index, name in enumerate(REGISTER_NAMES):
+            if index != OPCODE and engine.registers[index] != reference.registers[index]:
+                value = engine.mode if index == MODE else engine.registers[index]
+                return name, value, reference.mode if index == MODE else reference.registers[index]
+        for index in range(Config.NUMBER_OF_REGISTERS):
+            if engine.v[index] != reference.v[index]:
+                return "v[{:x}]".format(index), engine.v[index], reference.v[index]
+        for address in range(Config.MAX_MEMORY):
+            if engine.memory[address] != reference.memory[address]:
+                return "memory[{:#05x}]".format(address), engine.memory[address], reference.memory[address]
+
+    engine_bitmap, reference_bitmap = engine.screen.bitmap, reference.screen.bitmap
+    if engine_bitmap.shape != reference_bitmap.shape:
+        return "screen size", engine_bitmap.shape, reference_bitmap.shape
+    if not np.array_equal(engine_bitmap, reference_bitmap):
+        x, y = np.argwhere(engine_bitmap != reference_bitmap)[0]
+        return "screen[{}, {}]".format(x, y), engine_bitmap[x, y], reference_bitmap[x, y]
+    return None
+
+
+class LockstepExecutor:
+    """
+    Runs engine (any faster way of executing instructions) next to the reference interpreter and compares their
+    states after every engine step. Engine step can execute single instruction or a whole block, reference executes
+    the same number of instructions one by one. Both sides draw the same random numbers
+    """
+
+    def __init__(self, cpu: CPU, engine_step: Callable[[], int],
+                 trace_length: int = Config.DIFFERENTIAL_TRACE_LENGTH):
+        """
+        :param cpu: CPU on which engine runs, reference CPU is its clone drawing on HeadlessScreen
+        :param engine_step: Function executing instructions on cpu and returning number of executed instructions
+        :param trace_length: Number of last instructions executed by reference kept for divergence report,
+                             defaults to Config.DIFFERENTIAL_TRACE_LENGTH
+        """
+        self.cpu = cpu
+        self.engine_step = engine_step
+        self.reference = cpu.clone(keypad=cpu.keypad)
+        self.trace = deque(maxlen=trace_length)
+        self.instructions = 0
+
+    def execute_reference(self) -> None:
+        """
+        Executes single instruction on reference CPU and records it in trace
+        """
+        reference = self.reference
+        pc = reference.pc
+        opcode = (reference.memory[pc] << 8) | reference.memory[pc + 1] if pc + 1 < Config.MAX_MEMORY else None
+        self.trace.append("{:#05x}: {}".format(pc, "{:04x}".format(opcode) if opcode is not None else "----"))
+        reference.execute_opcode()
+        self.instructions += 1
+
+    def divergence(self, location: str, engine: object, reference: object) -> Divergence:
+        return Divergence(self.instructions, location, engine, reference, list(self.trace))
+
+    def step(self) -> Optional[Divergence]:
+        """
+        Executes single engine step and the same number of reference instructions, then compares both CPUs
+
+        :return: Divergence if states differ, None otherwise
+        :throws Exception: Exception raised by both engine and reference, it means that program can not continue
+        """
+        random_state = random.getstate()
+        try:
+            executed = self.engine_step()
+        except Exception as engine_error:
+            # Engine could have executed part of block, so reference runs until it fails too
+            random.setstate(random_state)
+            for _ in range(MAX_BLOCK_LENGTH + 1):
+                try:
+                    self.execute_reference()
+                except Exception as reference_error:
+                    if type(reference_error) is not type(engine_error):
+                        return self.divergence("exception", repr(engine_error), repr(reference_error))
+                    raise engine_error
+            return self.divergence("exception", repr(engine_error), "none")
+
+        random.setstate(random_state)
+        for _ in range(executed):
+            try:
+                self.execute_reference()
+            except Exception as reference_error:
+                return self.divergence("exception", "none", repr(reference_error))
+
+        difference = compare(self.cpu, self.reference)
+        if difference is not None:
+            return self.divergence(*difference)
+        return None
+
+    def run(self, instructions: int, cycles_per_frame: int = CYCLES_PER_FRAME) -> Optional[Divergence]:
+        """
+        Runs both CPUs until given number of instructions is executed, CPU stops running or program fails in the
+        same way on both sides. Timers are decremented on both CPUs every cycles_per_frame instructions
+
+        :param instructions: Number of instructions to execute
+        :param cycles_per_frame: Number of instructions between timer decrements, defaults to CYCLES_PER_FRAME
+        :return: The first divergence, None if there was none
+        """
+        next_frame = cycles_per_frame
+        try:
+            while self.instructions < instructions and self.cpu.running:
+                divergence = self.step()
+                if divergence is not None:
+                    return divergence
+                if self.instructions >= next_frame:
+                    next_frame += cycles_per_frame
+                    self.cpu.decrement_values_in_timers()
+                    self.reference.decrement_values_in_timers()
+        except Exception:
+            # Both sides failed the same way
+            pass
+        return None
+
+
+def compiled_engine(cpu: CPU, rom: bytes) -> Callable[[], int]:
+    """
+    Returns step function of CompiledRunner, ROM is compiled in memory without using cache
+    """
+    return CompiledRunner(cpu, compile_rom(rom, cache_dir=None)).step
+
+
+def predecoded_engine(cpu: CPU, rom: bytes) -> Callable[[], int]:
+    """
+    Returns step function of PredecodedRunner with fused sequences
+    """
+    return PredecodedRunner(cpu).step
+
+
+# Engines that can be compared with reference interpreter, each is a function creating step function for CPU and ROM
+ENGINES: Dict[str, Callable[[CPU, bytes], Callable[[], int]]] = {
+    "compiled": compiled_engine,
+    "predecoded": predecoded_engine,
+}
+
+
+def check_rom(rom_path: Path, engine: str = "compiled", instructions: int = 100000,
+              seed: int = 0) -> Optional[Divergence]:
+    """
+    Runs ROM on engine in lockstep with reference interpreter
+
+    :param rom_path: Path to ROM file
+    :param engine: Name of engine from ENGINES, defaults to compiled
+    :param instructions: Maximum number of instructions to execute, defaults to 100000
+    :param seed: Random seed, defaults to 0
+    :return: The first divergence, None if there was none
+    """
+    random.seed(seed)
+    cpu = create_headless_cpu(rom_path)
+    step = ENGINES[engine](cpu, Path(rom_path).read_bytes())
+    return LockstepExecutor(cpu, step).run(instructions)
+
+
+def random_rom(seed: int, length: int = 256) -> bytes:
+    """
+    Generates ROM consisting of random instructions. Most instructions are valid, so programs run for a while
+    before hitting unknown instruction
+
+    :param seed: Seed from which ROM is generated
+    :param length: Number of instructions
+    """
+    generator = random.Random(seed)
+    families = [0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0x7, 0x8, 0x9, 0xA, 0xC, 0xD, 0xF]
+    eight_operations = [0x0, 0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0x7, 0xE]
+    f_operations = [0x07, 0x15, 0x18, 0x1E, 0x29, 0x33, 0x55, 0x65]
+
+    rom = bytearray()
+    for _ in range(length):
+        family = generator.choice(families)
+        operand = generator.randrange(0x1000)
+        if family in (0x1, 0x2):
+            # Jumps stay inside ROM
+            operand = Config.PROGRAM_COUNTER + 2 * generator.randrange(length)
+        elif family == 0x8:
+            operand = (operand & 0xFF0) | generator.choice(eight_operations)
+        elif family == 0xF:
+            operand = (operand & 0xF00) | generator.choice(f_operations)
+        elif family == 0xA:
+            # I points into ROM or above it, so FX55 sometimes modifies code
+            operand = Config.PROGRAM_COUNTER + generator.randrange(2 * length + 0x100)
+        opcode = (family << 12) | operand
+        rom += bytes((opcode >> 8, opcode & 0xFF))
+    return bytes(rom)
+
+
+def check_random_rom(arguments: Tuple[int, str, int]) -> Tuple[int, Optional[Divergence]]:
+    """
+    Checks single random ROM, it is run in campaign worker processes
+
+    :param arguments: Seed of ROM, engine name and maximum number of instructions
+    :return: Seed and the first divergence, None if there was none
+    """
+    seed, engine, instructions = arguments
+    rom = random_rom(seed)
+    random.seed(seed)
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.memory[Config.PROGRAM_COUNTER:Config.PROGRAM_COUNTER + len(rom)] = rom
+    try:
+        step = ENGINES[engine](cpu, rom)
+    except SyntaxError as error:
+        return seed, Divergence(0, "translation", repr(error), "none", [])
+    return seed, LockstepExecutor(cpu, step).run(instructions)
+
+
+def campaign(roms: int, engine: str = "compiled", instructions: int = 2000, first_seed: int = 0,
+             jobs: Optional[int] = None) -> List[Tuple[int, Divergence]]:
+    """
+    Checks many random ROMs in worker processes
+
+    :param roms: Number of ROMs to check
+    :param engine: Name of engine from ENGINES, defaults to compiled
+    :param instructions: Maximum number of instructions executed by every ROM, defaults to 2000
+    :param first_seed: Seed of the first ROM, next ROMs use next seeds, defaults to 0
+    :param jobs: Number of worker processes, defaults to number of CPUs
+    :return: Seeds of ROMs that diverged with their divergences
+    """
+    arguments = [(seed, engine, instructions) for seed in range(first_seed, first_seed + roms)]
+    with multiprocessing.Pool(jobs) as pool:
+        results = pool.imap_unordered(check_random_rom, arguments, chunksize=max(1, roms // 64))
+        return sorted((seed, divergence) for seed, divergence in results if divergence is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare execution engines with reference interpreter')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='compiled', help='Engine to compare')
+    commands = parser.add_subparsers(dest='command', required=True)
+    rom_parser = commands.add_parser('rom', help='Run ROM file in lockstep')
+    rom_parser.add_argument('rom', help='Path to ROM file containing CHIP-8 game or program')
+    rom_parser.add_argument('--instructions', type=int, default=100000, help='Maximum number of instructions')
+    rom_parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    campaign_parser = commands.add_parser('campaign', help='Run random ROMs in lockstep')
+    campaign_parser.add_argument('--roms', type=int, default=1000, help='Number of random ROMs')
+    campaign_parser.add_argument('--instructions', type=int, default=2000, help='Maximum number of instructions')
+    campaign_parser.add_argument('--seed', type=int, default=0, help='Seed of the first ROM')
+    campaign_parser.add_argument('--jobs', type=int, help='Number of worker processes')
+    args = parser.parse_args()
+
+    if args.command == 'rom':
+        divergence = check_rom(Path(args.rom), args.engine, args.instructions, args.seed)
+        if divergence is not None:
+            print(divergence)
+        sys.exit(1 if divergence is not None else 0)
+
+    divergences = campaign(args.roms, args.engine, args.instructions, args.seed, args.jobs)
+    for seed, divergence in divergences:
+        print("ROM seed {}".format(seed))
+        print(divergence)
+    print("{} of {} ROMs diverged".format(len(divergences), args.roms))
+    sys.exit(1 if divergences else 0)
+
+
+if __name__ == "__main__":
+    main()
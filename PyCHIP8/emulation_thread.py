@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from PyCHIP8.audio import NullBeeper
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.headless import emulate_frame
+from PyCHIP8.profiler import SubsystemProfiler
+from PyCHIP8.run_ahead import RunAhead
+from PyCHIP8.shared_state import SharedStateWriter
+from PyCHIP8.telemetry import Telemetry
+from PyCHIP8.transpiler import CompiledRunner
+
+
+class EmulationThread(threading.Thread):
+    """
+    Thread running CPU independently of presentation. After each emulated frame the screen bitmap is published to a
+    frame buffer, from which the main thread takes frames to display
+    """
+
+    def __init__(self, cpu: CPU, frames: FrameBuffer, beeper: Optional[NullBeeper] = None,
+                 runner: Optional[CompiledRunner] = None,
+                 frame_rate: int = Config.FRAME_RATE, clock_speed: int = Config.CPU_CLOCK_SPEED,
+                 telemetry: Optional[Telemetry] = None, exporter: Optional[SharedStateWriter] = None,
+                 profiler: Optional[SubsystemProfiler] = None, run_ahead: int = 0):
+        """
+        :param cpu: CPU to run, its screen should not draw on a window (see HeadlessScreen)
+        :param frames: Frame buffer to which finished frames are published
+        :param beeper: Sound backend updated after every frame, defaults to NullBeeper
+        :param runner: Object executing instructions with run method (CompiledRunner or Debugger), if None
+                       instructions are interpreted by CPU, defaults to None
+        :param frame_rate: Number of frames emulated per second, timers are decremented once per frame,
+                           defaults to Config.FRAME_RATE
+        :param clock_speed: Number of instructions executed per second, defaults to Config.CPU_CLOCK_SPEED
+        :param telemetry: Statistics to which executed instructions, emulation time and lateness of every frame are
+                          recorded, their target clock speed is set to clock_speed, defaults to None (nothing is
+                          recorded)
+        :param exporter: Shared memory segment to which every frame and CPU state are published, defaults to None
+        :param profiler: Profiler to which time of emulated frames and of waiting between them is attributed,
+                         defaults to None
+        :param run_ahead: Number of frames emulated ahead of every real frame to hide input latency, published frames
+                          are the last of them (see RunAhead), defaults to 0 (no frames are emulated ahead)
+        """
+        super().__init__(name="PyCHIP8 emulation", daemon=True)
+        self.cpu = cpu
+        self.frames = frames
+        self.beeper = beeper if beeper is not None else NullBeeper()
+        self.runner = runner
+        self.frame_rate = frame_rate
+        self.cycles_per_frame = max(1, clock_speed // frame_rate)
+        self.telemetry = telemetry
+        if telemetry is not None:
+            telemetry.clock_speed = self.cycles_per_frame * frame_rate
+        self.exporter = exporter
+        self.profiler = profiler
+        self.run_ahead = RunAhead(cpu, run_ahead, self.cycles_per_frame, runner) if run_ahead > 0 else None
+
+        self.error: Optional[Exception] = None
+
+    def run(self):
+        """
+        Emulates frames until CPU stops running. Pacing is based only on the emulation clock, so slow presentation
+        does not stretch emulation timing. When emulation falls more than a frame behind, the schedule is reset instead
+        of trying to catch up in a burst
+        """
+        cpu = self.cpu
+        screen = cpu.screen
+        beeper = self.beeper
+        telemetry = self.telemetry
+        exporter = self.exporter
+        profiler = self.profiler
+        run_ahead = self.run_ahead
+        emulate = emulate_frame
+        emulate_ahead = run_ahead.run if run_ahead is not None else None
+        sleep = time.sleep
+        if profiler is not None:
+            emulate = profiler.timed("execute", emulate_frame)
+            sleep = profiler.timed("pacing", time.sleep)
+            if run_ahead is not None:
+                emulate_ahead = profiler.timed("execute", run_ahead.run)
+        frame_interval = 1 / self.frame_rate
+        next_frame = time.perf_counter()
+
+        screen.bitmap = self.frames.publish(screen.bitmap)
+
+        try:
+            while cpu.running:
+                start = time.perf_counter()
+                executed = emulate(cpu, self.cycles_per_frame, self.runner)
+                if telemetry is not None:
+                    telemetry.record_frame(executed, time.perf_counter() - start, max(0.0, start - next_frame))
+                beeper.update(cpu.timer_st)
+                if exporter is not None:
+                    exporter.publish(cpu)
+                if profiler is not None:
+                    profiler.tick()
+                if run_ahead is None:
+                    screen.bitmap = self.frames.publish(screen.bitmap)
+                else:
+                    # Displayed frame is emulated ahead, the next real frame continues from state saved before it
+                    run_ahead.save()
+                    emulate_ahead()
+                    screen.bitmap = self.frames.publish(screen.bitmap)
+                    run_ahead.restore()
+
+                next_frame += frame_interval
+                delay = next_frame - time.perf_counter()
+                if delay > 0:
+                    sleep(delay)
+                elif delay < -frame_interval:
+                    next_frame = time.perf_counter()
+        except Exception as exception:
+            logging.exception("Emulation thread stopped")
+            self.error = exception
+            cpu.exit()
+        finally:
+            # Beeper is left silent and not playing, so thread started again with it (after reload) starts the beep
+            beeper.update(0)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops emulation and waits until the thread finishes
+
+        :param timeout: Maximum time in seconds to wait for the thread, waits without limit if None
+        """
+        self.cpu.exit()
+        self.join(timeout)
@@ -0,0 +1,133 @@
+import random
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.headless import CYCLES_PER_FRAME, create_headless_cpu, emulate_frame
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.transpiler import CompiledRunner, compile_rom
+
+np = lazy_import("numpy")
+
+# Reward and termination functions get CPU memory and return reward of last step or whether episode has ended
+RewardFunction = Callable[[memoryview], float]
+DoneFunction = Callable[[memoryview], bool]
+
+
+def no_reward(memory: memoryview) -> float:
+    return 0.0
+
+
+class Environment:
+    """
+    Reinforcement learning environment with gym-like interface. Action is a 16 bit keypad mask (bit k is key k), every
+    step holds the keys for frame_skip frames and returns observation, reward, done flag and info dictionary.
+
+    Observation is a read-only view of screen bitmap, not a copy, so it changes with the next step. It is indexed
+    [x, y] like Screen.bitmap. Reset restores snapshot of CPU taken right after ROM was loaded, which is a single copy
+    of CPU state and bitmap
+    """
+
+    def __init__(self, rom_path: Path, reward: RewardFunction = no_reward, done: Optional[DoneFunction] = None,
+                 frame_skip: int = Config.ENVIRONMENT_FRAME_SKIP, max_frames: Optional[int] = None,
+                 compiled: bool = True, quirks_profile: Optional[str] = None,
+                 cache_dir: Optional[Path] = Config.COMPILED_CACHE_DIR):
+        """
+        :param rom_path: Path to ROM file
+        :param reward: Function returning reward from CPU memory after every step, defaults to no reward
+        :param done: Function returning True from CPU memory when episode is finished, episode is also finished when
+                     CPU stops running, defaults to None
+        :param frame_skip: Number of 60Hz frames emulated by single step, defaults to Config.ENVIRONMENT_FRAME_SKIP
+        :param max_frames: Episode is finished after this many frames, defaults to None (no limit)
+        :param compiled: If True ROM is compiled before running, defaults to True
+        :param quirks_profile: Name of quirk profile, defaults to None (profile is selected by ROM hash)
+        :param cache_dir: Directory with compiled ROMs, if None they are not cached on disk,
+                          defaults to Config.COMPILED_CACHE_DIR
+        :throws FileNotFoundError: When ROM file does not exist
+        """
+        self.cpu: CPU = create_headless_cpu(Path(rom_path), quirks_profile)
+        self.runner = CompiledRunner(self.cpu, compile_rom(Path(rom_path).read_bytes(), cache_dir)) \
+            if compiled else None
+        self.reward = reward
+        self.done = done
+        self.frame_skip = frame_skip
+        self.max_frames = max_frames
+
+        self.frames = 0
+        self.action = 0
+        self.info: Dict[str, int] = {"frames": 0, "halted": False}
+        self.bitmap = None
+        self.view = None
+
+        self.snapshot_state = bytes(self.cpu.state)
+        self.snapshot_bitmap = self.cpu.screen.bitmap.copy()
+        self.snapshot_blocks = dict(self.runner.blocks) if self.runner is not None else None
+
+    def observation(self) -> "np.ndarray":
+        """
+        Returns read-only view of screen bitmap, new view is created only when screen replaces its bitmap (when
+        extended mode is switched)
+        """
+        bitmap = self.cpu.screen.bitmap
+        if bitmap is not self.bitmap:
+            self.bitmap = bitmap
+            self.view = bitmap.view()
+            self.view.flags.writeable = False
+        return self.view
+
+    def reset(self, seed: Optional[int] = None) -> "np.ndarray":
+        """
+        Restores CPU to the state right after ROM was loaded
+
+        :param seed: Seed of random generator used by CXNN instruction, it is the global generator of random module,
+                     so it is shared by all CPUs in process, defaults to None (generator is not seeded)
+        :return: Observation
+        """
+        if seed is not None:
+            random.seed(seed)
+        cpu = self.cpu
+        cpu.state[:] = self.snapshot_state
+        cpu.running = True
+        cpu.halted = False
+        screen = cpu.screen
+        if screen.bitmap.shape != self.snapshot_bitmap.shape:
+            screen.disable_extended_screen()
+        screen.bitmap[...] = self.snapshot_bitmap
+        cpu.keypad.mask = 0
+        self.action = 0
+        runner = self.runner
+        if runner is not None and len(runner.blocks) != len(self.snapshot_blocks):
+            runner.blocks = dict(self.snapshot_blocks)
+
+        self.frames = 0
+        self.info["frames"] = 0
+        self.info["halted"] = False
+        return self.observation()
+
+    def step(self, action: int) -> Tuple["np.ndarray", float, bool, Dict[str, int]]:
+        """
+        Holds keys from action mask for frame_skip frames
+
+        :param action: Keypad mask, bit k is set if key k is pressed
+        :return: Observation, reward, whether episode is finished and info dictionary (the same object is returned
+                 by every step), halted in info is True if program waits for key (FX0A), further steps without
+                 keys in action do not execute any instructions
+        """
+        cpu = self.cpu
+        runner = self.runner
+        if action != self.action:
+            cpu.keypad.mask = action
+            self.action = action
+        for _ in range(self.frame_skip):
+            emulate_frame(cpu, CYCLES_PER_FRAME, runner)
+            if not cpu.running:
+                break
+        self.frames += self.frame_skip
+
+        memory = cpu.memory
+        done = not cpu.running or (self.done is not None and self.done(memory)) \
+            or (self.max_frames is not None and self.frames >= self.max_frames)
+        self.info["frames"] = self.frames
+        self.info["halted"] = cpu.halted
+        return self.observation(), self.reward(memory), done, self.info
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+from typing import Optional, Tuple
+
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.screen import BACKING_SHAPE
+
+np = lazy_import("numpy")
+
+
+class FrameBuffer:
+    """
+    Triple buffer used to hand finished frames from the emulation thread over to the presentation thread.
+
+    The producer always owns the back buffer, the consumer always owns the front buffer and the third (ready) buffer
+    holds the newest finished frame. Publishing and acquiring a frame only swap buffer indices under a lock, so neither
+    side ever waits for the other to finish drawing or presenting and no frame is copied during the handoff.
+
+    Like Screen.bitmap, buffers are views of arrays big enough for extended screen, so frames of both screen modes fit
+    in them without allocation
+    """
+
+    def __init__(self, shape: Tuple[int, int], dtype: str = "int8"):
+        """
+        :param shape: Shape of a single frame, it should be the same as shape of Screen.bitmap
+        :param dtype: Type of frame elements, it should be the same as type of Screen.bitmap elements, defaults to int8
+        """
+        backing_shape = (max(shape[0], BACKING_SHAPE[0]), max(shape[1], BACKING_SHAPE[1]))
+        self._buffers = [np.zeros(backing_shape, dtype=dtype)[:shape[0], :shape[1]] for _ in range(3)]
+        self._back = 0
+        self._ready = 1
+        self._front = 2
+        self._fresh = False
+        self._lock = threading.Lock()
+
+        self.frames_produced = 0
+        self.frames_consumed = 0
+
+    @property
+    def back(self) -> np.ndarray:
+        """
+        Buffer owned by the producer, emulation should draw into this array
+        """
+        return self._buffers[self._back]
+
+    @property
+    def front(self) -> np.ndarray:
+        """
+        Buffer owned by the consumer, it holds the last acquired frame
+        """
+        return self._buffers[self._front]
+
+    @property
+    def frames_dropped(self) -> int:
+        """
+        Number of produced frames that were replaced by a newer frame before the consumer acquired them
+        """
+        return self.frames_produced - self.frames_consumed
+
+    def publish(self, bitmap: np.ndarray) -> np.ndarray:
+        """
+        Marks bitmap as the newest finished frame and returns the buffer the producer should continue drawing into
+
+        CHIP-8 draws by XOR-ing sprites into the existing picture, so the returned buffer is brought up to date with the
+        published frame. This happens after the handoff, outside of the lock, on the producer side.
+
+        :param bitmap: Finished frame, normally this is the array returned by the previous call to this method, but
+                       the array is adopted if screen had to allocate a new one (for example after mode change)
+        :return: Array that should be used as the new Screen.bitmap
+        """
+        self._buffers[self._back] = bitmap
+
+        with self._lock:
+            self._back, self._ready = self._ready, self._back
+            self._fresh = True
+
+        self.frames_produced += 1
+
+        back = self._buffers[self._back]
+        if back.shape != bitmap.shape or back.dtype != bitmap.dtype:
+            width, height = bitmap.shape
+            backing = back.base if back.base is not None else back
+            if backing.dtype == bitmap.dtype and backing.shape[0] >= width and backing.shape[1] >= height:
+                back = backing[:width, :height]
+            else:
+                back = np.empty_like(bitmap)
+            self._buffers[self._back] = back
+        np.copyto(back, bitmap)
+
+        return back
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """
+        Takes ownership of the newest finished frame
+
+        :return: Newest frame if it was published since the last call, None otherwise
+        """
+        with self._lock:
+            if not self._fresh:
+                return None
+            self._front, self._ready = self._ready, self._front
+            self._fresh = False
+
+        self.frames_consumed += 1
+
+        return self._buffers[self._front]
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import importlib.util
+import json
+import random
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.headless import create_headless_cpu, emulate_frame
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.streaming import decode_runs, encode_runs
+
+np = lazy_import("numpy")
+
+# Characters used in ASCII diff: pixel set in both frames, only in expected frame, only in actual frame, in neither
+DIFF_CHARACTERS = {(1, 1): "#", (1, 0): "-", (0, 1): "+", (0, 0): "."}
+# Character of pixel set in both frames, but in different bitplanes (XO-CHIP)
+PLANES_DIFFER_CHARACTER = "x"
+
+
+class Mismatch(NamedTuple):
+    """
+    Checkpoint at which digest of emulator state differs from golden digest
+    """
+    case: str
+    frame: int
+    expected: str
+    actual: str
+
+
+def state_digest(cpu: CPU, include_state: bool = False) -> str:
+    """
+    Returns digest of screen bitmap, it is a fast hash, so comparing frames does not need comparing pixels
+
+    :param cpu: CPU whose screen is hashed
+    :param include_state: If True V registers and memory are hashed too, defaults to False
+    """
+    bitmap = cpu.screen.bitmap
+    digest = hashlib.blake2b(struct.pack("!HH", *bitmap.shape), digest_size=16)
+    digest.update(np.ascontiguousarray(bitmap))
+    if include_state:
+        digest.update(cpu.v)
+        digest.update(cpu.memory)
+    return digest.hexdigest()
+
+
+def encode_frame(bitmap: np.ndarray) -> Dict[str, object]:
+    """
+    Encodes frame stored next to golden digest, it is only decoded to show diff when digests differ
+    """
+    width, height = bitmap.shape
+    return {"width": width, "height": height, "runs": base64.b64encode(encode_runs(bitmap.ravel())).decode("ascii")}
+
+
+def decode_frame(frame: Dict[str, object]) -> np.ndarray:
+    """
+    Decodes frame encoded by encode_frame
+    """
+    width, height = frame["width"], frame["height"]
+    return decode_runs(base64.b64decode(frame["runs"]), width * height).reshape((width, height))
+
+
+def diff_character(expected: int, actual: int) -> str:
+    """
+    Returns character of pixel in ASCII diff
+
+    :param expected: Mask of planes in which pixel is set in golden frame
+    :param actual: Mask of planes in which pixel is set in frame produced by emulator
+    """
+    if expected and actual and expected != actual:
+        return PLANES_DIFFER_CHARACTER
+    return DIFF_CHARACTERS[(int(expected != 0), int(actual != 0))]
+
+
+def ascii_diff(expected: np.ndarray, actual: np.ndarray) -> str:
+    """
+    Draws two frames as text, one line per row of pixels, see DIFF_CHARACTERS and PLANES_DIFFER_CHARACTER
+
+    :param expected: Golden frame
+    :param actual: Frame produced by emulator
+    """
+    if expected.shape != actual.shape:
+        return "Frame size differs, expected {} got {}\n".format(expected.shape, actual.shape)
+
+    width, height = expected.shape
+    lines = []
+    for y in range(height):
+        lines.append("".join(diff_character(int(expected[x, y]), int(actual[x, y])) for x in range(width)))
+    return "\n".join(lines) + "\n"
+
+
+def save_png_diff(path: Path, expected: np.ndarray, actual: np.ndarray, scale: int = 4):
+    """
+    Saves image in which pixels set in both frames are white (yellow if they are set in different bitplanes), only in
+    expected frame red and only in actual frame green, it needs Pillow
+    """
+    from PIL import Image
+
+    colors = np.array([[0, 0, 0], [0, 255, 0], [255, 0, 0], [255, 255, 255], [255, 255, 0]], dtype="uint8")
+    expected = expected.T
+    actual = actual.T
+    indexes = ((expected != 0).astype("uint8") << 1) | (actual != 0)
+    indexes[(indexes == 3) & (expected != actual)] = 4
+    pixels = colors[indexes]
+    pixels = np.repeat(np.repeat(pixels, scale, axis=0), scale, axis=1)
+    Image.fromarray(pixels, mode="RGB").save(path)
+
+
+def run_case(case: dict, root: Path) -> Dict[int, tuple]:
+    """
+    Runs ROM headless for scripted inputs and computes digests at checkpoints
+
+    :param case: Description of test case, see "Golden frames" in README
+    :param root: Directory to which path of ROM is relative
+    :return: Dictionary mapping checkpoint frames to pairs of digest and copy of screen bitmap
+    """
+    random.seed(case.get("seed", 0))
+    cpu = create_headless_cpu(root / case["rom"], case.get("quirks"))
+    inputs = {int(frame): mask for frame, mask in case.get("inputs", {}).items()}
+    checkpoints = set(case["checkpoints"])
+    include_state = case.get("state", False)
+
+    results = {}
+    for frame in range(1, max(checkpoints) + 1):
+        if frame in inputs:
+            cpu.keypad.mask = inputs[frame]
+        emulate_frame(cpu)
+        if frame in checkpoints:
+            results[frame] = (state_digest(cpu, include_state), cpu.screen.bitmap.copy())
+        if not cpu.running:
+            break
+    return results
+
+
+def check_case(case: dict, root: Path, diff_dir: Optional[Path] = None) -> List[Mismatch]:
+    """
+    Compares digests at checkpoints with golden digests, for every mismatch diff of frames is saved to diff_dir
+
+    :param case: Description of test case with golden digests
+    :param root: Directory to which path of ROM is relative
+    :param diff_dir: Directory to which ASCII (and PNG if Pillow is installed) diffs are saved, defaults to None
+    :return: List of mismatches, empty if all checkpoints match
+    """
+    golden = case.get("golden", {})
+    mismatches = []
+    for frame, (digest, bitmap) in run_case(case, root).items():
+        expected = golden.get(str(frame))
+        expected_digest = expected["digest"] if expected else "missing"
+        if digest == expected_digest:
+            continue
+
+        mismatches.append(Mismatch(case["name"], frame, expected_digest, digest))
+        if diff_dir is not None and expected:
+            diff_dir.mkdir(parents=True, exist_ok=True)
+            name = "{}_{}".format(case["name"], frame)
+            expected_bitmap = decode_frame(expected["frame"])
+            (diff_dir / (name + ".txt")).write_text(ascii_diff(expected_bitmap, bitmap))
+            if importlib.util.find_spec("PIL") is not None and expected_bitmap.shape == bitmap.shape:
+                save_png_diff(diff_dir / (name + ".png"), expected_bitmap, bitmap)
+    return mismatches
+
+
+def update_case(case: dict, root: Path):
+    """
+    Stores current digests and frames as golden ones
+    """
+    case["golden"] = {str(frame): {"digest": digest, "frame": encode_frame(bitmap)}
+                      for frame, (digest, bitmap) in sorted(run_case(case, root).items())}
+
+
+def load_manifest(path: Path) -> dict:
+    """
+    Loads JSON file with list of test cases
+    """
+    return json.loads(Path(path).read_text())
+
+
+def check_manifest(path: Path, diff_dir: Optional[Path] = None) -> List[Mismatch]:
+    """
+    Checks all test cases from manifest
+
+    :param path: Path to manifest, paths of ROMs are relative to its directory
+    :param diff_dir: Directory to which diffs are saved, defaults to None
+    :return: List of mismatches of all cases
+    """
+    path = Path(path)
+    mismatches = []
+    for case in load_manifest(path)["cases"]:
+        mismatches.extend(check_case(case, path.parent, diff_dir))
+    return mismatches
+
+
+def update_manifest(path: Path):
+    """
+    Replaces golden digests of all test cases in manifest with current ones
+    """
+    path = Path(path)
+    manifest = load_manifest(path)
+    for case in manifest["cases"]:
+        update_case(case, path.parent)
+    path.write_text(json.dumps(manifest, indent=2) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare emulator frames with golden frames')
+    parser.add_argument('command', choices=['check', 'update'], help='Check frames or store current frames as golden')
+    parser.add_argument('manifest', help='Path to JSON file describing test cases')
+    parser.add_argument('--diff-dir', help='Directory to which diffs of mismatched frames are saved')
+    args = parser.parse_args()
+
+    if args.command == 'update':
+        update_manifest(Path(args.manifest))
+        return
+
+    mismatches = check_manifest(Path(args.manifest), Path(args.diff_dir) if args.diff_dir else None)
+    for mismatch in mismatches:
+        print("{} frame {}: expected {} got {}".format(*mismatch))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
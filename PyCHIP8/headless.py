@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Dict, Optional
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.quirks import select_quirks
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledRunner
+
+# Number of instructions executed in one emulated frame, timers are decremented once per frame
+CYCLES_PER_FRAME = max(1, Config.CPU_CLOCK_SPEED // Config.FRAME_RATE)
+
+
+def create_headless_cpu(rom_path: Path, quirks_profile: Optional[str] = None,
+                        quirks_overrides: Optional[Dict[str, bool]] = None) -> CPU:
+    """
+    Creates CPU drawing on HeadlessScreen, with ROM loaded and its quirks selected
+
+    :param rom_path: Path to ROM file
+    :param quirks_profile: Name of quirk profile, defaults to None (profile is selected by ROM hash)
+    :param quirks_overrides: Quirks set on top of selected profile, defaults to None
+    :throws FileNotFoundError: When ROM file does not exist
+    """
+    rom_path = Path(rom_path)
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.set_quirks(select_quirks(rom_path.read_bytes(), quirks_profile, quirks_overrides))
+    cpu.load_rom(rom_path)
+    return cpu
+
+
+def run_cycles(cpu: CPU, cycles: int, runner: Optional[CompiledRunner] = None) -> int:
+    """
+    Executes cycles instructions without decrementing timers. Less instructions are executed if CPU stops running or
+    halts waiting for key (FX0A), halted CPU which can not be woken up executes nothing
+
+    :param cpu: CPU to run
+    :param cycles: Number of instructions to execute
+    :param runner: Runner executing compiled ROM, if None instructions are interpreted by CPU, defaults to None
+    :return: Number of executed instructions
+    """
+    if not cpu.wake():
+        return 0
+    if runner is not None:
+        return runner.run(cycles)
+
+    execute_opcode = cpu.execute_opcode
+    executed = 0
+    while executed < cycles:
+        execute_opcode()
+        executed += 1
+        if not cpu.running or cpu.halted:
+            break
+    return executed
+
+
+def emulate_frame(cpu: CPU, cycles: int = CYCLES_PER_FRAME, runner: Optional[CompiledRunner] = None) -> int:
+    """
+    Emulates single frame, executes cycles instructions (see run_cycles) and decrements timers
+
+    :param cpu: CPU to run
+    :param cycles: Number of instructions to execute, defaults to CYCLES_PER_FRAME
+    :param runner: Runner executing compiled ROM, if None instructions are interpreted by CPU, defaults to None
+    :return: Number of executed instructions
+    """
+    executed = run_cycles(cpu, cycles, runner)
+    cpu.decrement_values_in_timers()
+    return executed
@@ -0,0 +1,59 @@
+from typing import Dict, Optional
+
+import pygame
+
+from PyCHIP8.conf import Config
+from PyCHIP8.keypad import Keypad
+
+
+def resolve_key_mapping(key_mapping: Dict[int, str] = Config.KEY_MAPPING) -> Dict[int, int]:
+    """
+    Translates key names used in configuration into pygame key codes
+
+    :param key_mapping: Dictionary mapping CHIP-8 key addresses to names of pygame keys (pygame K_ constants without
+                        the K_ prefix), defaults to Config.KEY_MAPPING
+    :return: Dictionary mapping pygame key codes to CHIP-8 key addresses
+    :throws ValueError: When one of names is not a pygame key
+    """
+    key_codes = {}
+    for key_address, key_name in key_mapping.items():
+        try:
+            key_codes[getattr(pygame, "K_" + key_name)] = key_address
+        except AttributeError:
+            raise ValueError("Unknown key {}".format(key_name))
+    return key_codes
+
+
+class PygameKeypad(Keypad):
+    """
+    Keypad updated from pygame keyboard events
+    """
+
+    __slots__ = ("key_codes",)
+
+    def __init__(self, key_mapping: Dict[int, str] = Config.KEY_MAPPING):
+        """
+        :param key_mapping: Dictionary mapping CHIP-8 key addresses to names of pygame keys,
+                            defaults to Config.KEY_MAPPING
+        """
+        super().__init__()
+        self.key_codes = resolve_key_mapping(key_mapping)
+
+    def handle_event(self, event: pygame.event.Event) -> Optional[int]:
+        """
+        Updates key state if event is press or release of one of mapped keys
+
+        :param event: pygame event
+        :return: Address of pressed key if event was press of mapped key, None otherwise
+        """
+        if event.type == pygame.KEYDOWN:
+            key_address = self.key_codes.get(event.key)
+            if key_address is not None:
+                self.press(key_address)
+            return key_address
+
+        if event.type == pygame.KEYUP:
+            key_address = self.key_codes.get(event.key)
+            if key_address is not None:
+                self.release(key_address)
+        return None
@@ -0,0 +1,78 @@
+from typing import Optional
+
+from PyCHIP8.conf import Config
+
+
+class Keypad:
+    """
+    State of CHIP-8 hexadecimal keypad. It does not depend on any input library, frontends (see PygameKeypad) and
+    headless runners update key state by calling its methods.
+
+    Key that goes down is latched until it is taken by wait_for_key or released, so FX0A reacts only to new presses
+    and a key held across several FX0A instructions satisfies only the first of them
+    """
+
+    __slots__ = ("keys", "latched_key")
+
+    def __init__(self):
+        # Value at index k is 1 if key k is pressed
+        self.keys = bytearray(Config.NUMBER_OF_KEYS)
+        # Key pressed since the last wait_for_key, None if there is no such key
+        self.latched_key: Optional[int] = None
+
+    def press(self, key: int):
+        """
+        Marks key as pressed
+
+        :param key: Address of key (0x0 - 0xF)
+        """
+        if not self.keys[key]:
+            self.latched_key = key
+        self.keys[key] = 1
+
+    def release(self, key: int):
+        """
+        Marks key as released
+
+        :param key: Address of key (0x0 - 0xF)
+        """
+        self.keys[key] = 0
+        if self.latched_key == key:
+            self.latched_key = None
+
+    def is_pressed(self, key: int) -> bool:
+        """
+        Checks if key is pressed
+
+        :param key: Address of key (0x0 - 0xF)
+        """
+        return self.keys[key] == 1
+
+    @property
+    def mask(self) -> int:
+        """
+        State of all keys as 16 bit mask, bit k is set if key k is pressed
+        """
+        mask = 0
+        for key, pressed in enumerate(self.keys):
+            mask |= pressed << key
+        return mask
+
+    @mask.setter
+    def mask(self, mask: int):
+        # Keys are pressed from the highest, so the lowest of newly pressed keys is latched
+        for key in reversed(range(Config.NUMBER_OF_KEYS)):
+            if (mask >> key) & 1:
+                self.press(key)
+            else:
+                self.release(key)
+
+    def wait_for_key(self) -> Optional[int]:
+        """
+        Takes key latched by press without waiting, the same press is not returned again
+
+        :return: Address of key pressed since the last call, None if no key was pressed or it was already released
+        """
+        key = self.latched_key
+        self.latched_key = None
+        return key
@@ -0,0 +1,27 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns module which is executed only when one of its attributes is used for the first time. It is used for heavy
+    dependencies (pygame, NumPy), so importing emulator core does not load them when they are not needed
+
+    :param name: Name of top level module, submodules should be accessed as attributes of their package
+    :throws ModuleNotFoundError: When module is not installed
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named '{}'".format(name), name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,276 @@
+from typing import Callable, List, Optional
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU, I, PC, SP, TIMER_DT
+
+# Handler executes instruction (or fused sequence of instructions) at address it was decoded for and returns number of
+# executed instructions
+Handler = Callable[[], int]
+
+# Longest fused sequence, in bytes, a write to memory invalidates handlers decoded this far before written address
+MAX_FUSED_LENGTH = 6
+
+# Most instructions executed by single fused handler, with smaller cycle budget left instructions run one at a time
+MAX_FUSED_INSTRUCTIONS = 3
+
+# Instructions writing memory at I, they are executed by CPU and followed by invalidation of written range
+WRITE_OPCODES = {0xF033, 0xF055}
+
+
+class PredecodedRunner:
+    """
+    Executes instructions through handlers decoded once per address. Handlers are closures with operands already
+    extracted from opcode, instructions that are not predecoded are executed by CPU.
+
+    Recurring sequences are fused into a single handler (superinstruction) stored at address of the first instruction
+    of the sequence: 6XNN;6YNN register pairs, ANNN;DXYN draws, 7XNN;3XNN;1NNN counted loops and FX07;3X00;1NNN
+    waits for delay timer. Handlers of addresses inside the sequence are decoded on their own, so jump into the middle
+    of a fused run executes single instructions. Handlers are decoded lazily and dropped when memory they were
+    decoded from is written
+    """
+
+    def __init__(self, cpu: CPU, fuse: bool = True):
+        """
+        :param cpu: CPU with program ROM already loaded into memory
+        :param fuse: If False recurring sequences are not fused, defaults to True
+        """
+        self.cpu = cpu
+        self.fuse = fuse
+        self.handlers: List[Optional[Handler]] = [None] * Config.MAX_MEMORY
+
+    def written(self, address: int, length: int):
+        """
+        Drops handlers decoded from written memory range
+
+        :param address: First written address
+        :param length: Number of written bytes
+        """
+        handlers = self.handlers
+        for handler_address in range(max(0, address - MAX_FUSED_LENGTH + 1), min(address + length, len(handlers))):
+            handlers[handler_address] = None
+
+    def opcode_at(self, address: int) -> Optional[int]:
+        """
+        Returns opcode stored at address, None if it does not fit in memory
+        """
+        memory = self.cpu.memory
+        if address + 1 >= Config.MAX_MEMORY:
+            return None
+        return (memory[address] << 8) | memory[address + 1]
+
+    def decode(self, address: int) -> Handler:
+        """
+        Decodes handler of instruction at address and stores it in handler table
+
+        :param address: Address of instruction
+        :return: Decoded handler
+        """
+        handler = None
+        if self.fuse:
+            handler = self.decode_fused(address)
+        if handler is None:
+            handler = self.decode_single(address, self.opcode_at(address))
+        self.handlers[address] = handler
+        return handler
+
+    def decode_single(self, address: int, opcode: Optional[int]) -> Handler:
+        """
+        Returns handler of single instruction
+        """
+        cpu = self.cpu
+        registers = cpu.registers
+        v = cpu.v
+        if opcode is None:
+            return self.execute
+
+        family = opcode & 0xF000
+        x = (opcode & 0x0F00) >> 8
+        nn = opcode & 0x00FF
+        nnn = opcode & 0x0FFF
+        next_address = address + 2
+
+        if family == 0x1000:
+            def jump() -> int:
+                registers[PC] = nnn
+                return 1
+            return jump
+        if family == 0x6000:
+            def load() -> int:
+                v[x] = nn
+                registers[PC] = next_address
+                return 1
+            return load
+        if family == 0x7000:
+            def add() -> int:
+                v[x] = (v[x] + nn) & 0xFF
+                registers[PC] = next_address
+                return 1
+            return add
+        if family == 0xA000:
+            def load_index() -> int:
+                registers[I] = nnn
+                registers[PC] = next_address
+                return 1
+            return load_index
+        if family == 0x2000:
+            memory = cpu.memory
+            written = self.written
+
+            def call() -> int:
+                sp = registers[SP]
+                memory[sp] = next_address & 0xFF
+                memory[sp + 1] = next_address >> 8
+                registers[SP] = sp + 2
+                registers[PC] = nnn
+                written(sp, 2)
+                return 1
+            return call
+        if opcode & 0xF0FF in WRITE_OPCODES:
+            length = 3 if nn == 0x33 else x + 1
+            return self.execute_write(length)
+        if opcode & 0xF00F == 0x5002:
+            return self.execute_write(abs(x - ((opcode & 0x00F0) >> 4)) + 1)
+        return self.execute
+
+    def decode_fused(self, address: int) -> Optional[Handler]:
+        """
+        Returns handler of fused sequence starting at address, None if there is no recurring sequence there
+        """
+        first = self.opcode_at(address)
+        second = self.opcode_at(address + 2)
+        if first is None or second is None:
+            return None
+
+        cpu = self.cpu
+        registers = cpu.registers
+        v = cpu.v
+        x = (first & 0x0F00) >> 8
+
+        if first & 0xF000 == 0x6000 and second & 0xF000 == 0x6000:
+            y = (second & 0x0F00) >> 8
+            first_value, second_value = first & 0x00FF, second & 0x00FF
+            next_address = address + 4
+
+            def load_pair() -> int:
+                v[x] = first_value
+                v[y] = second_value
+                registers[PC] = next_address
+                return 2
+            return load_pair
+
+        if first & 0xF000 == 0xA000 and second & 0xF000 == 0xD000:
+            index = first & 0x0FFF
+            next_address = address + 4
+            execute_instruction = cpu.execute_instruction
+
+            def load_index_and_draw() -> int:
+                registers[I] = index
+                registers[PC] = next_address
+                execute_instruction(second)
+                return 2
+            return load_index_and_draw
+
+        third = self.opcode_at(address + 4)
+        if third is None or third & 0xF000 != 0x1000 or second & 0xFF00 != 0x3000 | (x << 8):
+            return None
+        target = third & 0x0FFF
+        exit_address = address + 6
+        limit = second & 0x00FF
+
+        if first & 0xF000 == 0x7000:
+            step = first & 0x00FF
+
+            def counted_loop() -> int:
+                value = (v[x] + step) & 0xFF
+                v[x] = value
+                if value == limit:
+                    registers[PC] = exit_address
+                    return 2
+                registers[PC] = target
+                return 3
+            return counted_loop
+
+        if first & 0xF0FF == 0xF007 and limit == 0:
+            def wait_for_delay_timer() -> int:
+                value = registers[TIMER_DT]
+                v[x] = value
+                if value == 0:
+                    registers[PC] = exit_address
+                    return 2
+                registers[PC] = target
+                return 3
+            return wait_for_delay_timer
+
+        return None
+
+    def execute(self) -> int:
+        """
+        Handler of instructions that are not predecoded, they are fetched and executed by CPU
+        """
+        self.cpu.execute_opcode()
+        return 1
+
+    def execute_write(self, length: int) -> Handler:
+        """
+        Returns handler executing instruction that writes length bytes of memory at I
+        """
+        cpu = self.cpu
+        written = self.written
+
+        def write() -> int:
+            address = cpu.i
+            cpu.execute_opcode()
+            written(address, length)
+            return 1
+        return write
+
+    def interpret(self) -> int:
+        """
+        Executes single instruction at PC, fused sequences are not used, so debugger can stop between their
+        instructions
+
+        :return: Number of executed instructions
+        """
+        pc = self.cpu.registers[PC]
+        return self.decode_single(pc, self.opcode_at(pc))()
+
+    def step(self, budget: int = MAX_FUSED_INSTRUCTIONS) -> int:
+        """
+        Executes single handler
+
+        :param budget: Maximum number of executed instructions, when fused handler may not fit in it single
+                       instruction is executed instead, defaults to MAX_FUSED_INSTRUCTIONS
+        :return: Number of executed instructions
+        """
+        if budget < MAX_FUSED_INSTRUCTIONS:
+            return self.interpret()
+        pc = self.cpu.registers[PC]
+        handler = self.handlers[pc]
+        if handler is None:
+            handler = self.decode(pc)
+        return handler()
+
+    def run(self, cycles: int) -> int:
+        """
+        Executes given number of instructions, less if CPU stops running or halts. Fused handlers are used only while
+        they fit in the remaining budget
+
+        :param cycles: Number of instructions to execute
+        :return: Number of executed instructions
+        """
+        cpu = self.cpu
+        registers = cpu.registers
+        handlers = self.handlers
+        decode = self.decode
+        executed = 0
+        fused_cycles = cycles - MAX_FUSED_INSTRUCTIONS
+        while executed <= fused_cycles and cpu.running and not cpu.halted:
+            pc = registers[PC]
+            handler = handlers[pc]
+            if handler is None:
+                handler = decode(pc)
+            executed += handler()
+        interpret = self.interpret
+        while executed < cycles and cpu.running and not cpu.halted:
+            executed += interpret()
+        return executed
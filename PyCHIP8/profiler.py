@@ -0,0 +1,203 @@
+import cProfile
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from PyCHIP8.cpu import CPU
+
+# Host subsystems to which wall time is attributed, in the order in which they are reported
+SUBSYSTEMS = (
+    "fetch",  # fetching and decoding opcode in CPU.execute_opcode
+    "execute",  # instruction handlers and runners, without fetching and sprite drawing
+    "draw",  # sprite rasterization (Screen.xor_sprite)
+    "present",  # composing and flipping displayed image
+    "events",  # pygame event queue
+    "sleep",  # waiting in main loop
+    "pacing",  # waiting of emulation thread for the next frame
+)
+
+
+class SubsystemProfiler:
+    """
+    Attributes wall time of emulator loop to host subsystems (see SUBSYSTEMS). Time is accumulated in nanoseconds
+    (time.perf_counter_ns) per subsystem, so recording is an addition and the profiler can stay enabled for the whole
+    run. Time not attributed to any subsystem is reported as other. When several threads record into one profiler,
+    their times are summed, so shares of subsystems are shares of wall time of a single thread.
+
+    Optionally the thread running emulation is profiled with cProfile for a bounded window, started by the first tick
+    """
+
+    def __init__(self, cprofile_seconds: Optional[float] = None, threads: int = 1):
+        """
+        :param cprofile_seconds: Length of cProfile window in seconds, defaults to None (cProfile is not used)
+        :param threads: Number of threads recording time, other is what remains of their combined wall time,
+                        defaults to 1
+        """
+        self.threads = threads
+        self.totals: Dict[str, int] = {subsystem: 0 for subsystem in SUBSYSTEMS}
+        self.calls: Dict[str, int] = {subsystem: 0 for subsystem in SUBSYSTEMS}
+        self.started = time.perf_counter_ns()
+        self.stopped: Optional[int] = None
+
+        self.cprofile_seconds = cprofile_seconds
+        self.cprofile: Optional[cProfile.Profile] = None
+        self.cprofile_end: Optional[float] = None
+        self.cprofile_done = False
+
+    def add(self, subsystem: str, elapsed: int, parent: Optional[str] = None):
+        """
+        :param subsystem: Name of subsystem from SUBSYSTEMS
+        :param elapsed: Time in nanoseconds
+        :param parent: Subsystem in which the measured code is nested, elapsed time is subtracted from it, so every
+                       nanosecond is attributed only once, defaults to None
+        """
+        self.totals[subsystem] += elapsed
+        self.calls[subsystem] += 1
+        if parent is not None:
+            self.totals[parent] -= elapsed
+
+    def timed(self, subsystem: str, function: Callable, parent: Optional[str] = None) -> Callable:
+        """
+        Returns function which calls given function and attributes its time to subsystem
+
+        :param subsystem: Name of subsystem from SUBSYSTEMS
+        :param function: Measured function
+        :param parent: Subsystem in which calls are nested, see add, defaults to None
+        """
+        add = self.add
+        clock = time.perf_counter_ns
+
+        def measured(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add(subsystem, clock() - start, parent)
+        return measured
+
+    def instrument_screen(self, screen):
+        """
+        Measures sprite drawing of screen, it is nested in instruction execution
+        """
+        screen.xor_sprite = self.timed("draw", screen.xor_sprite, parent="execute")
+
+    def tick(self):
+        """
+        Starts and stops cProfile window, it should be called regularly by thread running emulation
+        """
+        if self.cprofile_seconds is None or self.cprofile_done:
+            return
+        now = time.perf_counter()
+        if self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile_end = now + self.cprofile_seconds
+            self.cprofile.enable()
+        elif now >= self.cprofile_end:
+            self.cprofile.disable()
+            self.cprofile_done = True
+
+    def stop(self):
+        """
+        Ends measurement, wall time of report is measured until this call
+        """
+        self.stopped = time.perf_counter_ns()
+        if self.cprofile is not None and not self.cprofile_done:
+            self.cprofile.disable()
+            self.cprofile_done = True
+
+    def report(self) -> Dict[str, object]:
+        """
+        Returns wall time and time of every subsystem in nanoseconds with its share of wall time
+        """
+        end = self.stopped if self.stopped is not None else time.perf_counter_ns()
+        wall = end - self.started
+        subsystems = {}
+        for subsystem in SUBSYSTEMS:
+            subsystems[subsystem] = {"ns": self.totals[subsystem], "calls": self.calls[subsystem],
+                                     "share": self.totals[subsystem] / wall if wall else 0.0}
+        other = wall * self.threads - sum(self.totals.values())
+        subsystems["other"] = {"ns": other, "calls": 0, "share": other / wall if wall else 0.0}
+        return {"wall_ns": wall, "threads": self.threads, "subsystems": subsystems}
+
+    def table(self) -> List[str]:
+        """
+        Returns report formatted as lines of a table
+        """
+        report = self.report()
+        lines = ["{:<10} {:>12} {:>7} {:>12} {:>10}".format("subsystem", "ms", "share", "calls", "us/call")]
+        for subsystem, values in report["subsystems"].items():
+            per_call = values["ns"] / values["calls"] / 1000 if values["calls"] else 0.0
+            lines.append("{:<10} {:>12.1f} {:>6.1f}% {:>12} {:>10.2f}".format(
+                subsystem, values["ns"] / 1e6, values["share"] * 100, values["calls"], per_call))
+        lines.append("{:<10} {:>12.1f}".format("wall", report["wall_ns"] / 1e6))
+        return lines
+
+    def save(self, path: Path):
+        """
+        Writes report as JSON to path, if cProfile was used its statistics are written next to it with .prof suffix
+        (they can be read with pstats or snakeviz)
+
+        :param path: Path of JSON file
+        """
+        path = Path(path)
+        path.write_text(json.dumps(self.report(), indent=1))
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(str(path.with_suffix(".prof")))
+        logging.info("Profile saved to {}".format(path))
+
+
+def timed_dispatch(handler: Callable[[CPU], None]) -> Callable[[CPU], None]:
+    """
+    Returns handler which stores time at which instruction was dispatched to it in ProfiledCPU.dispatched before
+    calling given handler
+
+    :param handler: Handler of instruction family from CPU lookup table
+    """
+    clock = time.perf_counter_ns
+
+    def dispatched(cpu: "ProfiledCPU"):
+        cpu.dispatched = clock()
+        handler(cpu)
+    return dispatched
+
+
+class ProfiledCPU(CPU):
+    """
+    CPU which measures fetching and decoding of opcodes and sprite drawing. Fetch is the time from the start of
+    execute_opcode until its instruction family handler is called, handlers are wrapped with timed_dispatch, so
+    CPU.execute_opcode itself is not changed. Both are nested in execution, which is measured by caller (around single
+    instruction, frame or runner), so runners which fall back to execute_opcode are measured correctly as well
+    """
+
+    __slots__ = ("profiler", "dispatched")
+
+    def __init__(self, screen, keypad=None, profiler: Optional[SubsystemProfiler] = None):
+        """
+        :param screen: Screen on which CPU draws, its sprite drawing is measured too
+        :param keypad: Keypad from which key state is read, defaults to Keypad not connected to any input device
+        :param profiler: Profiler to which time is attributed, defaults to new profiler
+        """
+        self.dispatched = 0
+        super().__init__(screen, keypad)
+        self.profiler = profiler if profiler is not None else SubsystemProfiler()
+        self.profiler.instrument_screen(screen)
+
+    def set_quirks(self, quirks):
+        """
+        Binds handlers selected by quirks like CPU.set_quirks and wraps instruction family handlers with
+        timed_dispatch
+        """
+        super().set_quirks(quirks)
+        self.opcode_lookup = {family: timed_dispatch(handler) for family, handler in self.opcode_lookup.items()}
+
+    def execute_opcode(self):
+        """
+        Executes next instruction like CPU.execute_opcode and attributes time until its dispatch to fetching
+
+        :throws UnknownInstructionException: when there was no opcode defined in opcode lookup dictionaries
+        """
+        start = time.perf_counter_ns()
+        super().execute_opcode()
+        self.profiler.add("fetch", self.dispatched - start, parent="execute")
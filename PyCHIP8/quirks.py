@@ -0,0 +1,87 @@
+import hashlib
+from typing import Dict, Iterable, NamedTuple, Optional
+
+
+class Quirks(NamedTuple):
+    """
+    Set of behaviours that differ between CHIP-8 interpreters. Each field selects variant of one or more instruction
+    handlers, variants are bound into CPU lookup tables once (see CPU.set_quirks), so there is no check of quirks when
+    instruction is executed
+
+    Default values describe behaviour this emulator always had
+    """
+
+    # 8XY6 and 8XYE shift VY and store result in VX, instead of shifting VX in place
+    shift_uses_vy: bool = False
+    # FX55 and FX65 leave I pointing after the last stored or loaded register
+    load_store_increments_i: bool = False
+    # BNNN is treated as BXNN and jumps to XNN plus VX instead of NNN plus V0
+    jump_uses_vx: bool = False
+    # Sprites are clipped at screen edges instead of wrapping around, starting coordinate still wraps
+    clip_sprites: bool = False
+
+
+PROFILES: Dict[str, Quirks] = {
+    "default": Quirks(),
+    "chip8": Quirks(shift_uses_vy=True, load_store_increments_i=True, clip_sprites=True),
+    "schip": Quirks(jump_uses_vx=True, clip_sprites=True),
+    "xochip": Quirks(shift_uses_vy=True, load_store_increments_i=True),
+}
+
+# Known ROMs, SHA-1 of ROM file mapped to name of profile from PROFILES it was written for
+ROM_PROFILES: Dict[str, str] = {
+    "1ba58656810b67fd131eb9af3e3987863bf26c90": "chip8",  # IBM Logo
+}
+
+
+def rom_hash(rom: bytes) -> str:
+    """
+    Returns key under which ROM is stored in ROM_PROFILES
+
+    :param rom: Content of ROM file
+    """
+    return hashlib.sha1(rom).hexdigest()
+
+
+def parse_overrides(overrides: Iterable[str]) -> Dict[str, bool]:
+    """
+    Parses quirk overrides given in NAME=VALUE form, for example shift_uses_vy=1
+
+    :param overrides: Overrides, value is one of 1, 0, true, false, on, off
+    :return: Dictionary mapping names of Quirks fields to their values
+    :throws ValueError: When override is malformed or names unknown quirk
+    """
+    values = {"1": True, "true": True, "on": True, "0": False, "false": False, "off": False}
+
+    parsed = {}
+    for override in overrides:
+        name, separator, value = override.partition("=")
+        if not separator or value.lower() not in values:
+            raise ValueError("Quirk override should have NAME=VALUE form, got {}".format(override))
+        if name not in Quirks._fields:
+            raise ValueError("Unknown quirk {}".format(name))
+        parsed[name] = values[value.lower()]
+    return parsed
+
+
+def select_quirks(rom: bytes, profile: Optional[str] = None, overrides: Optional[Dict[str, bool]] = None) -> Quirks:
+    """
+    Selects quirks for ROM. Explicitly given profile has priority over ROM_PROFILES, ROMs that are not known use
+    default profile. Overrides are applied on top of selected profile
+
+    :param rom: Content of ROM file
+    :param profile: Name of profile from PROFILES, defaults to None (select by ROM hash)
+    :param overrides: Dictionary mapping names of Quirks fields to their values, defaults to None
+    :throws ValueError: When profile is not known
+    """
+    if profile is None:
+        profile = ROM_PROFILES.get(rom_hash(rom), "default")
+
+    try:
+        quirks = PROFILES[profile]
+    except KeyError:
+        raise ValueError("Unknown quirk profile {}".format(profile))
+
+    if overrides:
+        quirks = quirks._replace(**overrides)
+    return quirks
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import queue
+import struct
+import threading
+from pathlib import Path
+from typing import Optional
+
+from PyCHIP8.conf import Config
+from PyCHIP8.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Every frame in raw recording starts with header: length of frame data, width, height, number of repeats
+RAW_FRAME_HEADER = struct.Struct("!IHHH")
+
+# Formats written with Pillow, if it is not installed raw recording is written instead
+ANIMATION_SUFFIXES = {".gif", ".png", ".apng"}
+
+
+class RawWriter:
+    """
+    Writes frames as a stream of length prefixed bitmaps, it does not need any additional library. Each frame is
+    stored with number of consecutive emulated frames it was displayed for
+    """
+
+    def __init__(self, path: Path):
+        """
+        :param path: Path of recording
+        """
+        self.path = path
+        self.file = path.open("wb")
+
+    def write(self, bitmap: np.ndarray, repeats: int) -> bool:
+        """
+        :param bitmap: Frame, it has the same layout as Screen.bitmap
+        :param repeats: Number of emulated frames for which frame was displayed
+        :return: True, every frame is written
+        """
+        data = bitmap.astype("uint8").tobytes()
+        width, height = bitmap.shape
+        self.file.write(RAW_FRAME_HEADER.pack(len(data), width, height, repeats))
+        self.file.write(data)
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+class AnimationWriter:
+    """
+    Writes frames as animated GIF or PNG using Pillow. Frames are kept in memory until recording is closed, because
+    Pillow writes whole animation at once. They are kept as bitmaps and scaled only while the animation is written,
+    at most max_frames of them, frames written after that are dropped
+    """
+
+    def __init__(self, path: Path, frame_rate: int = Config.FRAME_RATE, scale: int = Config.RECORDING_SCALE,
+                 max_frames: int = Config.RECORDING_MAX_FRAMES):
+        """
+        :param path: Path of recording, its suffix selects format
+        :param frame_rate: Number of emulated frames per second, defaults to Config.FRAME_RATE
+        :param scale: Size of pixel in recorded animation, defaults to Config.RECORDING_SCALE
+        :param max_frames: Maximum number of frames in animation, defaults to Config.RECORDING_MAX_FRAMES
+        """
+        from PIL import Image
+
+        self.image = Image
+        self.path = path
+        self.frame_rate = frame_rate
+        self.scale = scale
+        self.palette = [component for color in Config.SCREEN_COLORS for component in color[:3]]
+        self.max_frames = max_frames
+        self.frames_dropped = 0
+        self.frames = []
+        self.durations = []
+
+    def write(self, bitmap: np.ndarray, repeats: int) -> bool:
+        """
+        :param bitmap: Frame, it has the same layout as Screen.bitmap, it is kept without copying, so it should not be
+                       changed later
+        :param repeats: Number of emulated frames for which frame was displayed
+        :return: True if frame was added to animation, False if animation already has max_frames frames
+        """
+        if len(self.frames) >= self.max_frames:
+            if not self.frames_dropped:
+                logging.warning("Recording reached {} frames, further frames are not recorded".format(
+                    self.max_frames))
+            self.frames_dropped += 1
+            return False
+        self.frames.append(bitmap)
+        self.durations.append(round(repeats * 1000 / self.frame_rate))
+        return True
+
+    def image_frame(self, bitmap: np.ndarray):
+        """
+        Returns scaled frame as palette image
+        """
+        pixels = np.repeat(np.repeat(bitmap.T.astype("uint8"), self.scale, axis=0), self.scale, axis=1)
+        frame = self.image.fromarray(pixels, mode="P")
+        frame.putpalette(self.palette)
+        return frame
+
+    def close(self):
+        if not self.frames:
+            return
+        image_format = "PNG" if self.path.suffix.lower() in (".png", ".apng") else "GIF"
+        self.image_frame(self.frames[0]).save(self.path, format=image_format, save_all=True,
+                                              append_images=(self.image_frame(bitmap) for bitmap in self.frames[1:]),
+                                              duration=self.durations, loop=0)
+
+
+def create_writer(path: Path, frame_rate: int = Config.FRAME_RATE, scale: int = Config.RECORDING_SCALE):
+    """
+    Creates writer for format selected by suffix of path, falls back to RawWriter when Pillow is not installed
+
+    :param path: Path of recording
+    :param frame_rate: Number of emulated frames per second, defaults to Config.FRAME_RATE
+    :param scale: Size of pixel in recorded animation, defaults to Config.RECORDING_SCALE
+    """
+    if path.suffix.lower() not in ANIMATION_SUFFIXES:
+        return RawWriter(path)
+
+    if importlib.util.find_spec("PIL") is None:
+        raw_path = path.with_suffix(".raw")
+        logging.warning("Pillow is not installed, recording is saved as raw bitmaps to {}".format(raw_path))
+        return RawWriter(raw_path)
+    return AnimationWriter(path, frame_rate, scale)
+
+
+class Recorder(threading.Thread):
+    """
+    Records frames on a background thread. Capturing a frame only copies the bitmap into a bounded queue, encoding
+    happens on the recorder thread. When encoding falls behind, captured frames are dropped instead of blocking
+    emulation. Identical consecutive frames are stored once, together with number of times they were repeated
+    """
+
+    def __init__(self, path: Path, frame_rate: int = Config.FRAME_RATE, scale: int = Config.RECORDING_SCALE,
+                 queue_size: int = Config.RECORDING_QUEUE_SIZE):
+        """
+        :param path: Path of recording, .gif, .png and .apng are animated images, anything else is raw recording
+        :param frame_rate: Number of frames captured per second, defaults to Config.FRAME_RATE
+        :param scale: Size of pixel in recorded animation, defaults to Config.RECORDING_SCALE
+        :param queue_size: Maximum number of frames waiting for encoding, defaults to Config.RECORDING_QUEUE_SIZE
+        """
+        super().__init__(name="PyCHIP8 recorder", daemon=True)
+        self.writer = create_writer(Path(path), frame_rate, scale)
+        self.queue = queue.Queue(queue_size)
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_written = 0
+        self.error: Optional[Exception] = None
+
+    def capture(self, bitmap: np.ndarray) -> bool:
+        """
+        Queues copy of frame for encoding, it never blocks
+
+        :param bitmap: Frame, it has the same layout as Screen.bitmap
+        :return: True if frame was queued, False if it was dropped because queue is full
+        """
+        try:
+            self.queue.put_nowait(bitmap.copy())
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+        self.frames_captured += 1
+        return True
+
+    def run(self):
+        """
+        Encodes queued frames until recording is stopped
+        """
+        last: Optional[np.ndarray] = None
+        repeats = 0
+
+        try:
+            while True:
+                bitmap = self.queue.get()
+                if bitmap is None:
+                    break
+                if last is not None and last.shape == bitmap.shape and np.array_equal(last, bitmap):
+                    repeats += 1
+                    continue
+                if last is not None and self.writer.write(last, repeats):
+                    self.frames_written += 1
+                last, repeats = bitmap, 1
+
+            if last is not None and self.writer.write(last, repeats):
+                self.frames_written += 1
+        except Exception as exception:
+            logging.exception("Recording stopped")
+            self.error = exception
+        finally:
+            self.writer.close()
+
+    def stop(self):
+        """
+        Encodes frames that are still queued, finishes recording and waits until the thread finishes
+        """
+        if self.is_alive():
+            self.queue.put(None)
+        self.join()
+        logging.info("Frames captured: {} dropped: {} written: {}".format(
+            self.frames_captured, self.frames_dropped, self.frames_written))
@@ -0,0 +1,108 @@
+import random
+from typing import Optional
+
+from PyCHIP8.conf import Constants
+from PyCHIP8.cpu import CPU, MEMORY_OFFSET, STATE_SIZE
+from PyCHIP8.headless import CYCLES_PER_FRAME, emulate_frame
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.screen import BACKING_SHAPE
+from PyCHIP8.transpiler import CompiledRunner
+
+np = lazy_import("numpy")
+
+
+class RunAhead:
+    """
+    Hides input latency of ROMs that read keys in one frame and draw the result in a later one. After every real frame
+    state is saved, frames_ahead more frames are emulated with keys that are currently held, their picture is displayed
+    and then state is restored, so the next real frame continues from the saved state.
+
+    Saved state is the CPU state buffer, screen bitmap and mode, halted flag, key latched for FX0A and state of the
+    random generator used by CXNN, so restored CPU repeats exactly the frames that were displayed unless keys change.
+    All of it is copied into buffers allocated once. CPU that stops running in a frame emulated ahead stays stopped,
+    its last frames were already displayed
+    """
+
+    def __init__(self, cpu: CPU, frames_ahead: int, cycles_per_frame: int = CYCLES_PER_FRAME,
+                 runner: Optional[CompiledRunner] = None):
+        """
+        :param cpu: CPU to run
+        :param frames_ahead: Number of frames emulated ahead of the real frame
+        :param cycles_per_frame: Number of instructions executed in one frame, defaults to CYCLES_PER_FRAME
+        :param runner: Runner executing instructions (CompiledRunner or PredecodedRunner), it is told about memory
+                       restored to saved state, if None instructions are interpreted by CPU, defaults to None
+        :throws ValueError: When frames_ahead is not positive
+        """
+        if frames_ahead < 1:
+            raise ValueError("Number of frames to run ahead has to be positive, got {}".format(frames_ahead))
+        self.cpu = cpu
+        self.frames_ahead = frames_ahead
+        self.cycles_per_frame = cycles_per_frame
+        self.runner = runner
+
+        self.state = np.zeros(STATE_SIZE, dtype="uint8")
+        self.live_state = np.frombuffer(cpu.state, dtype="uint8")
+        self.bitmap = np.zeros(BACKING_SHAPE, dtype="int8")
+        self.mode = cpu.screen.mode
+        self.halted = False
+        self.latched_key = None
+        self.random_state = None
+
+    def save(self):
+        """
+        Saves state of CPU and screen, it is restored by restore method
+        """
+        cpu = self.cpu
+        bitmap = cpu.screen.bitmap
+        np.copyto(self.state, self.live_state)
+        width, height = bitmap.shape
+        np.copyto(self.bitmap[:width, :height], bitmap)
+        self.mode = cpu.screen.mode
+        self.halted = cpu.halted
+        self.latched_key = cpu.keypad.latched_key
+        self.random_state = random.getstate()
+
+    def run(self) -> int:
+        """
+        Emulates frames_ahead frames, stops early when CPU stops running
+
+        :return: Number of executed instructions
+        """
+        cpu = self.cpu
+        executed = 0
+        for _ in range(self.frames_ahead):
+            executed += emulate_frame(cpu, self.cycles_per_frame, self.runner)
+            if not cpu.running:
+                break
+        return executed
+
+    def restore(self):
+        """
+        Restores state saved by save method. Screen bitmap is restored into the current Screen.bitmap, so it may be
+        replaced (for example by FrameBuffer.publish) between save and restore. Instructions decoded or compiled by
+        runner from memory written in frames emulated ahead are dropped
+        """
+        cpu = self.cpu
+        live_memory = self.live_state[MEMORY_OFFSET:]
+        changed = np.flatnonzero(live_memory != self.state[MEMORY_OFFSET:])
+        np.copyto(self.live_state, self.state)
+        if self.runner is not None and changed.size:
+            self.runner.written(int(changed[0]), int(changed[-1] - changed[0]) + 1)
+
+        screen = cpu.screen
+        if screen.mode != self.mode:
+            if self.mode == Constants.EXTENDED_MODE:
+                screen.enable_extended_screen()
+            else:
+                screen.disable_extended_screen()
+        width, height = screen.bitmap.shape
+        np.copyto(screen.bitmap, self.bitmap[:width, :height])
+        screen.dirty = True
+
+        cpu.halted = self.halted
+        keypad = cpu.keypad
+        if keypad.latched_key is None and self.latched_key is not None and keypad.keys[self.latched_key]:
+            # Press taken by FX0A in frames emulated ahead is given back, unless the key was released since then or
+            # another key was pressed meanwhile
+            keypad.latched_key = self.latched_key
+        random.setstate(self.random_state)
@@ -1,13 +1,42 @@
-import numpy as np
-import pygame
-from pygame import display, draw
+from __future__ import annotations
+
+from typing import Optional, Sequence
 
 from PyCHIP8.conf import Constants, Config
+from PyCHIP8.lazy import lazy_import
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+# Mask selecting all bitplanes
+ALL_PLANES = (1 << Config.NUMBER_OF_PLANES) - 1
+
+# Shape of array backing graphics memory, normal mode uses its top left corner
+BACKING_SHAPE = (Config.SCREEN_WIDTH_EXTENDED, Config.SCREEN_HEIGHT_EXTENDED)
+
+
+def backing_array(bitmap: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Returns array of BACKING_SHAPE of which bitmap is a view, new array is allocated if there is no such array
+
+    :param bitmap: Graphics memory, None if screen has none yet
+    """
+    backing = bitmap.base if bitmap is not None and bitmap.base is not None else bitmap
+    if backing is None or backing.shape != BACKING_SHAPE or backing.dtype != np.int8:
+        backing = np.zeros(BACKING_SHAPE, dtype="int8")
+    return backing
 
 
 class Screen:
     """
     This class represents screen on which emulator will display images
+
+    Graphics memory (bitmap) is indexed [x, y], value of pixel is a mask of XO-CHIP bitplanes in which the pixel is
+    set, so it is also index of pixel color in Config.SCREEN_COLORS. Plain CHIP-8 programs draw only on plane 0.
+    Bitmap is a view of array of extended screen size (see BACKING_SHAPE), so switching modes does not allocate.
+
+    Window keeps the size of normal screen multiplied by scale in both modes, extended screen is drawn with pixels
+    half the size
     """
 
     def __init__(self, mode: str = Constants.NORMAL_MODE, scale: int = 10):
@@ -22,9 +51,15 @@ class Screen:
         self.set_according_screen_size()
 
         self.scale = scale
-        display.init()
+        self.font = None
+        # Lines of text drawn over the image, see draw_overlay
+        self.overlay: Sequence[str] = ()
+        # Set when bitmap changed since it was last drawn on surface
+        self.dirty = True
+        pygame.display.init()
 
-        self.surface = display.set_mode((self.width * self.scale, self.height * self.scale), depth=8)
+        self.surface = pygame.display.set_mode(
+            (Config.SCREEN_WIDTH_NORMAL * self.scale, Config.SCREEN_HEIGHT_NORMAL * self.scale), depth=8)
         self.clear()
 
     @property
@@ -47,6 +82,14 @@ class Screen:
         else:
             raise ValueError("Mode must be either extended or normal")
 
+    def clone(self) -> HeadlessScreen:
+        """
+        Returns screen that does not open any window, with the same mode and copy of graphics memory
+        """
+        screen = HeadlessScreen(self.mode, self.scale)
+        np.copyto(screen.bitmap, self.bitmap)
+        return screen
+
     def set_according_screen_size(self):
         """
         This method is used to set screen size according to current screen mode
@@ -59,51 +102,90 @@ class Screen:
             self.width = Config.SCREEN_WIDTH_EXTENDED
             self.height = Config.SCREEN_HEIGHT_EXTENDED
 
-    @staticmethod
-    def refresh():
+    def refresh(self):
         """
-        Refresh image displayed on screen
+        Refresh image displayed on screen, bitmap is drawn on surface only if it changed
         """
-        display.flip()
+        if not self.dirty:
+            return
+        self.compose(self.bitmap)
+        if self.overlay:
+            self.draw_overlay(self.overlay)
+        self.dirty = False
+        pygame.display.flip()
 
-    def clear(self):
+    def clear(self, planes: int = ALL_PLANES):
         """
-        This method is used to clear graphics memory and clear displayed screen (set color to color 0)
+        This method is used to clear graphics memory
+
+        :param planes: Mask of bitplanes to clear, defaults to all planes
         """
-        self.bitmap = np.zeros((self.width, self.height), dtype="int8")
-        self.surface.fill(Config.SCREEN_COLORS[0])
+        bitmap = getattr(self, "bitmap", None)
+        if planes == ALL_PLANES or bitmap is None or bitmap.shape != (self.width, self.height):
+            self.clear_bitmap()
+        else:
+            np.bitwise_and(bitmap, ~planes, out=bitmap)
+        self.dirty = True
 
-    def scroll_down(self, number_of_lines: int):
+    def clear_bitmap(self):
         """
-        Moves every line of bitmap down by a number defined in number_of_lines parameter
+        This method is used to clear graphics memory, existing bitmap is reused if it has the right size, so any
+        references to it (for example frame buffers) stay valid. When size changes, bitmap becomes a view of the same
+        backing array (see BACKING_SHAPE), a new array is allocated only if bitmap is not a view of such array
+        """
+        bitmap = getattr(self, "bitmap", None)
+        if bitmap is None or bitmap.shape != (self.width, self.height):
+            bitmap = self.bitmap = backing_array(bitmap)[:self.width, :self.height]
+        bitmap.fill(0)
+
+    def scroll_planes(self, shift: int, axis: int, planes: int):
+        """
+        Moves pixels of selected bitplanes along axis of bitmap, pixels moved out of bitmap are dropped and vacated
+        pixels are cleared, other planes are not changed
+
+        :param shift: Number of pixels to move, positive values move towards higher indexes
+        :param axis: Axis of bitmap along which pixels are moved
+        :param planes: Mask of bitplanes to move
+        """
+        bitmap = self.bitmap
+        moved = np.roll(bitmap & planes, shift, axis=axis)
+        vacated = [slice(None), slice(None)]
+        vacated[axis] = slice(None, shift) if shift >= 0 else slice(shift, None)
+        moved[tuple(vacated)] = 0
+        np.bitwise_and(bitmap, ~planes, out=bitmap)
+        np.bitwise_or(bitmap, moved, out=bitmap)
+        self.dirty = True
+
+    def scroll_down(self, number_of_lines: int, planes: int = ALL_PLANES):
+        """
+        Moves every line of bitmap down by a number defined in number_of_lines parameter, lines are along axis 1 of
+        bitmap (y)
         :param number_of_lines: Defines number of lines each line should be moved down
+        :param planes: Mask of bitplanes to scroll, defaults to all planes
         """
-        self.bitmap = np.roll(self.bitmap, number_of_lines, axis=0)
-        self.bitmap[:number_of_lines, :] = 0
+        self.scroll_planes(number_of_lines, 1, planes)
 
-    def scroll_up(self, number_of_lines):
+    def scroll_up(self, number_of_lines, planes: int = ALL_PLANES):
         """
         Moves every line of bitmap up by a number defined in number_of_lines parameter
         :param number_of_lines: Defines number of lines each line should be moved up
+        :param planes: Mask of bitplanes to scroll, defaults to all planes
         """
-        height = self.bitmap.shape[0]
-        self.bitmap = np.roll(self.bitmap, -number_of_lines, axis=0)
-        self.bitmap[height - number_of_lines:, :] = 0
+        self.scroll_planes(-number_of_lines, 1, planes)
 
-    def scroll_right(self):
+    def scroll_right(self, planes: int = ALL_PLANES):
         """
-        Moves every vertical line of bitmap right by 4
+        Moves every vertical line of bitmap right by 4, vertical lines are along axis 0 of bitmap (x)
+        :param planes: Mask of bitplanes to scroll, defaults to all planes
         """
-        self.bitmap = np.roll(self.bitmap, 4, axis=1)
-        self.bitmap[:, :4] = 0
+        self.scroll_planes(4, 0, planes)
 
-    def scroll_left(self):
+    def scroll_left(self, planes: int = ALL_PLANES):
         """
         Moves every vertical line of bitmap left by 4
+        :param planes: Mask of bitplanes to scroll, defaults to all planes
         """
-        width = self.bitmap.shape[1]
-        self.bitmap = np.roll(self.bitmap, -4, axis=1)
-        self.bitmap[:, width - 4:] = 0
+        self.scroll_planes(-4, 0, planes)
 
     def disable_extended_screen(self):
         """
@@ -137,8 +219,8 @@ class Screen:
         :param y: y-coordinate of pixel in bitmap
         :param pixel: value of pixel (0 or 1) to be set at position (x, y)
         """
-        draw.rect(self.surface, Config.SCREEN_COLORS[pixel],
-                  (x * self.scale, y * self.scale, self.scale, self.scale))
+        pygame.draw.rect(self.surface, Config.SCREEN_COLORS[pixel],
+                         (x * self.scale, y * self.scale, self.scale, self.scale))
 
     def xor_pixel_value(self, x: int, y: int, pixel: int) -> int:
         """
@@ -155,6 +237,34 @@ class Screen:
 
         return self.bitmap[x, y]
 
+    def xor_sprite(self, x: int, y: int, sprite: np.ndarray, clip: bool) -> bool:
+        """
+        Draws sprite on bitmap with XOR operation, all bitplanes at once
+
+        :param x: x-coordinate of top left corner of sprite, it is wrapped to screen width
+        :param y: y-coordinate of top left corner of sprite, it is wrapped to screen height
+        :param sprite: Pixels of sprite indexed [x, y], value of pixel is a mask of planes in which it is set
+        :param clip: If True parts of sprite that do not fit on screen are not drawn, otherwise they are drawn on the
+                     opposite side of screen
+        :return: True if any pixel that was set is turned off
+        """
+        width, height = self.bitmap.shape
+        x %= width
+        y %= height
+        sprite_width, sprite_height = sprite.shape
+
+        if clip or (x + sprite_width <= width and y + sprite_height <= height):
+            sprite = sprite[:width - x, :height - y]
+            region = (slice(x, x + sprite.shape[0]), slice(y, y + sprite.shape[1]))
+        else:
+            region = np.ix_(np.arange(x, x + sprite_width) % width, np.arange(y, y + sprite_height) % height)
+
+        pixels = self.bitmap[region]
+        collision = bool((pixels & sprite).any())
+        self.bitmap[region] = pixels ^ sprite
+        self.dirty = True
+        return collision
+
     def draw_frame(self, *, scaling_method: str = "repeat"):
 
         """
@@ -174,3 +284,76 @@ class Screen:
             raise ValueError("Unknown scaling method")
         surface = pygame.surfarray.make_surface(scaled_bitmap)
         self.surface.blit(surface, (0, 0))
+
+    def compose(self, bitmap: np.ndarray):
+        """
+        Draws whole frame stored in bitmap on surface, values of pixels are mapped to colors by palette, so colors of
+        combined bitplanes are produced only here. Frame of either mode is scaled to the size of surface
+
+        :param bitmap: Frame to be drawn, it has the same layout as Screen.bitmap
+        """
+        frame = pygame.surfarray.make_surface(bitmap.astype("uint8"))
+        frame.set_palette([color[:3] for color in Config.SCREEN_COLORS])
+        self.surface.blit(pygame.transform.scale(frame, self.surface.get_size()), (0, 0))
+
+    def present(self, bitmap: np.ndarray, overlay: Sequence[str] = ()):
+        """
+        Draws whole frame stored in bitmap on the screen and refreshes displayed image. This method is used when
+        emulation runs on a different thread than presentation, in which case bitmap is a frame published by that thread
+
+        :param bitmap: Frame to be displayed, it has the same layout as Screen.bitmap
+        :param overlay: Lines of text drawn over the frame, defaults to no text
+        """
+        self.compose(bitmap)
+        if overlay:
+            self.draw_overlay(overlay)
+        pygame.display.flip()
+
+    def draw_overlay(self, lines: Sequence[str]):
+        """
+        Draws lines of text in the top left corner of the window, font is loaded on first use
+
+        :param lines: Lines of text to draw
+        """
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, Config.TELEMETRY_FONT_SIZE)
+        y = 0
+        for line in lines:
+            text = self.font.render(line, True, Config.SCREEN_COLORS[1][:3], Config.SCREEN_COLORS[0][:3])
+            self.surface.blit(text, (0, y))
+            y += text.get_height()
+
+
+class HeadlessScreen(Screen):
+    """
+    Screen that only keeps graphics memory, it does not open any window. It is used when emulation runs on a separate
+    thread or without any display at all
+    """
+
+    def __init__(self, mode: str = Constants.NORMAL_MODE, scale: int = 10):
+        """
+        This method is used to set screen related fields
+
+        :param mode: Defines mode (normal or extended) in which screen is initialized, defaults to normal
+        :param scale: Not used for drawing, kept so both screen classes can be created the same way, defaults to 10
+        """
+        self.mode = mode
+        self.set_according_screen_size()
+
+        self.scale = scale
+        self.surface = None
+        self.font = None
+        self.overlay = ()
+        self.dirty = True
+        self.clear()
+
+    def refresh(self):
+        """
+        There is no displayed image to refresh
+        """
+
+    def draw_pixel(self, x: int, y: int, pixel: int):
+        """
+        There is no surface to draw on, pixel values are kept only in bitmap
+        """
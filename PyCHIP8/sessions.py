@@ -0,0 +1,341 @@
+import argparse
+import itertools
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU, state_template
+from PyCHIP8.headless import CYCLES_PER_FRAME, emulate_frame
+from PyCHIP8.quirks import Quirks, rom_hash, select_quirks
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledProgram, CompiledRunner, compile_rom
+
+RUNNING = "running"
+PAUSED = "paused"
+STOPPED = "stopped"
+
+# Pass of a session advances by STRIDE_SCALE / priority for every executed batch, see SessionManager
+STRIDE_SCALE = 1 << 20
+
+
+class SharedRom:
+    """
+    ROM contents, CPU state template, quirks and compiled program shared by all sessions running the same ROM
+    """
+
+    def __init__(self, key: str, rom: bytes, quirks: Quirks, program: Optional[CompiledProgram]):
+        """
+        :param key: Key of ROM in SessionManager.roms
+        :param rom: ROM contents
+        :param quirks: Quirks selected for ROM
+        :param program: Compiled ROM, None if sessions interpret instructions
+        """
+        self.key = key
+        self.rom = rom
+        self.template = state_template(rom)
+        self.quirks = quirks
+        self.program = program
+        self.sessions = 0
+
+
+class Session:
+    """
+    Single emulator instance owned by SessionManager
+    """
+
+    def __init__(self, session_id: int, name: str, shared: SharedRom, priority: int):
+        """
+        :param session_id: Identifier unique within manager
+        :param name: Name of ROM, used only in reports
+        :param shared: ROM data shared with other sessions
+        :param priority: Relative share of CPU time when sessions compete for it
+        """
+        self.id = session_id
+        self.name = name
+        self.shared = shared
+
+        self.cpu = CPU(HeadlessScreen())
+        self.cpu.set_quirks(shared.quirks)
+        self.cpu.reset_to(shared.template)
+        self.runner = CompiledRunner(self.cpu, shared.program) if shared.program is not None else None
+
+        self.state = RUNNING
+        self.priority = 1
+        self.stride = STRIDE_SCALE
+        self.set_priority(priority)
+        self.pass_value = 0
+        self.next_frame = 0.0
+
+        self.instructions = 0
+        self.frames = 0
+        self.busy_time = 0.0
+        self.started = time.perf_counter()
+
+    def set_priority(self, priority: int):
+        """
+        :param priority: Relative share of CPU time, positive integer
+        :throws ValueError: When priority is not positive
+        """
+        if priority < 1:
+            raise ValueError("Priority must be positive")
+        self.priority = priority
+        self.stride = STRIDE_SCALE // priority
+
+    def run_batch(self, frames: int) -> int:
+        """
+        Emulates given number of frames
+
+        :param frames: Number of frames to emulate
+        :return: Number of executed instructions
+        """
+        cpu = self.cpu
+        start = time.perf_counter()
+        executed = 0
+        for _ in range(frames):
+            executed += emulate_frame(cpu, CYCLES_PER_FRAME, self.runner)
+            if not cpu.running:
+                self.state = STOPPED
+                break
+        self.busy_time += time.perf_counter() - start
+        self.instructions += executed
+        self.frames += frames
+        self.pass_value += self.stride
+        return executed
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns throughput of session, instructions per second are counted over whole session lifetime and over time
+        spent executing its batches. Halted session waits for key, its batches execute no instructions
+        """
+        elapsed = time.perf_counter() - self.started
+        return {
+            "id": self.id,
+            "rom": self.name,
+            "state": self.state,
+            "halted": self.cpu.halted,
+            "priority": self.priority,
+            "instructions": self.instructions,
+            "frames": self.frames,
+            "instructions_per_second": self.instructions / elapsed if elapsed > 0 else 0.0,
+            "busy_instructions_per_second": self.instructions / self.busy_time if self.busy_time > 0 else 0.0,
+        }
+
+
+class SessionManager:
+    """
+    Runs many emulator instances in a single process, cooperatively time slicing them in batches of whole frames.
+
+    Sessions are scheduled with stride scheduling: every session has a pass value, which advances by stride inversely
+    proportional to its priority after each batch, and the runnable session with the lowest pass runs next. Under load
+    sessions get CPU time proportional to their priorities, a session that is resumed or started joins at the current
+    pass, so it does not get a burst of batches for the time it was not running
+    """
+
+    def __init__(self, compiled: bool = True, batch_frames: int = Config.SESSION_BATCH_FRAMES,
+                 cache_dir: Optional[Path] = Config.COMPILED_CACHE_DIR):
+        """
+        :param compiled: If True sessions execute compiled ROMs, defaults to True
+        :param batch_frames: Number of frames emulated by session before scheduler switches to another one,
+                             defaults to Config.SESSION_BATCH_FRAMES
+        :param cache_dir: Directory with compiled ROMs, if None they are not cached on disk,
+                          defaults to Config.COMPILED_CACHE_DIR
+        """
+        self.compiled = compiled
+        self.batch_frames = batch_frames
+        self.cache_dir = cache_dir
+
+        self.sessions: Dict[int, Session] = {}
+        self.roms: Dict[str, SharedRom] = {}
+        self.ids = itertools.count(1)
+        # Pass of the last scheduled session
+        self.virtual_time = 0
+
+    def shared_rom(self, rom: bytes, quirks_profile: Optional[str] = None) -> SharedRom:
+        """
+        Returns shared data of ROM, ROM is compiled only when no other session runs it
+
+        :param rom: ROM contents
+        :param quirks_profile: Name of quirk profile, defaults to None (profile is selected by ROM hash)
+        """
+        key = "{}:{}".format(rom_hash(rom), quirks_profile)
+        shared = self.roms.get(key)
+        if shared is None:
+            program = compile_rom(rom, self.cache_dir) if self.compiled else None
+            shared = SharedRom(key, rom, select_quirks(rom, quirks_profile), program)
+            self.roms[key] = shared
+        return shared
+
+    def start(self, rom: bytes, name: str = "", priority: int = 1, quirks_profile: Optional[str] = None) -> Session:
+        """
+        Creates new running session
+
+        :param rom: ROM contents
+        :param name: Name of ROM, used only in reports, defaults to empty name
+        :param priority: Relative share of CPU time, defaults to 1
+        :param quirks_profile: Name of quirk profile, defaults to None (profile is selected by ROM hash)
+        :throws ValueError: When priority is not positive
+        """
+        shared = self.shared_rom(bytes(rom), quirks_profile)
+        session = Session(next(self.ids), name, shared, priority)
+        session.pass_value = self.virtual_time
+        session.next_frame = time.perf_counter()
+        shared.sessions += 1
+        self.sessions[session.id] = session
+        return session
+
+    def start_file(self, rom_path: Path, priority: int = 1, quirks_profile: Optional[str] = None) -> Session:
+        """
+        Creates new running session of ROM file
+
+        :param rom_path: Path to ROM file
+        :param priority: Relative share of CPU time, defaults to 1
+        :param quirks_profile: Name of quirk profile, defaults to None (profile is selected by ROM hash)
+        :throws FileNotFoundError: When ROM file does not exist
+        """
+        rom_path = Path(rom_path)
+        return self.start(rom_path.read_bytes(), rom_path.name, priority, quirks_profile)
+
+    def stop(self, session_id: int):
+        """
+        Stops and removes session, shared ROM data is released with the last session using it
+
+        :param session_id: Identifier of session
+        :throws KeyError: When there is no such session
+        """
+        session = self.sessions.pop(session_id)
+        session.state = STOPPED
+        session.cpu.exit()
+        shared = session.shared
+        shared.sessions -= 1
+        if shared.sessions == 0:
+            del self.roms[shared.key]
+
+    def pause(self, session_id: int):
+        """
+        Pauses running session, it keeps its state but is not scheduled until resumed
+
+        :throws KeyError: When there is no such session
+        """
+        session = self.sessions[session_id]
+        if session.state == RUNNING:
+            session.state = PAUSED
+
+    def resume(self, session_id: int):
+        """
+        Resumes paused session
+
+        :throws KeyError: When there is no such session
+        """
+        session = self.sessions[session_id]
+        if session.state == PAUSED:
+            session.state = RUNNING
+            session.pass_value = max(session.pass_value, self.virtual_time)
+            session.next_frame = time.perf_counter()
+
+    def set_priority(self, session_id: int, priority: int):
+        """
+        Changes relative share of CPU time of session
+
+        :throws KeyError: When there is no such session
+        :throws ValueError: When priority is not positive
+        """
+        self.sessions[session_id].set_priority(priority)
+
+    def runnable(self, now: Optional[float] = None) -> List[Session]:
+        """
+        Returns running sessions, if now is given only those whose next frame is due
+
+        :param now: Current time (time.perf_counter), defaults to None
+        """
+        return [session for session in self.sessions.values()
+                if session.state == RUNNING and (now is None or session.next_frame <= now)]
+
+    def step(self, now: Optional[float] = None) -> Optional[Session]:
+        """
+        Runs single batch of the runnable session with the lowest pass
+
+        :param now: Current time, if given only sessions whose next frame is due are considered, defaults to None
+        :return: Session which was run, None if no session is runnable
+        """
+        sessions = self.runnable(now)
+        if not sessions:
+            return None
+        session = min(sessions, key=lambda candidate: candidate.pass_value)
+        self.virtual_time = session.pass_value
+        session.run_batch(self.batch_frames)
+        return session
+
+    def run(self, batches: int) -> int:
+        """
+        Runs given number of batches as fast as possible, without pacing
+
+        :param batches: Number of batches
+        :return: Number of executed batches, it is lower when all sessions stop or pause
+        """
+        for executed in range(batches):
+            if self.step() is None:
+                return executed
+        return batches
+
+    def serve(self, duration: Optional[float] = None, frame_rate: int = Config.FRAME_RATE):
+        """
+        Runs sessions at frame_rate frames per second each, until duration passes or there are no running sessions.
+        When host can not keep up, due sessions are still picked by pass, so higher priority sessions keep their
+        speed and lower priority sessions slow down, schedule of a session more than a batch behind is reset
+
+        :param duration: Time in seconds, defaults to None (no limit)
+        :param frame_rate: Frames per second emulated by every session, defaults to Config.FRAME_RATE
+        """
+        batch_interval = self.batch_frames / frame_rate
+        end = time.perf_counter() + duration if duration is not None else None
+        while True:
+            now = time.perf_counter()
+            if end is not None and now >= end:
+                return
+            session = self.step(now)
+            if session is None:
+                running = self.runnable()
+                if not running:
+                    return
+                time.sleep(max(0.0, min(candidate.next_frame for candidate in running) - now))
+                continue
+            session.next_frame += batch_interval
+            if session.next_frame < now - batch_interval:
+                session.next_frame = now
+
+    def stats(self) -> List[Dict[str, object]]:
+        """
+        Returns throughput of all sessions
+        """
+        return [session.stats() for session in self.sessions.values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run many CHIP-8 sessions in one process')
+    parser.add_argument('roms', nargs='+', help='Paths to ROM files, every ROM is started in given number of sessions')
+    parser.add_argument('--sessions', type=int, default=1, help='Number of sessions of every ROM')
+    parser.add_argument('--seconds', type=float, default=5.0, help='How long sessions run')
+    parser.add_argument('--unpaced', action='store_true', help='Run sessions as fast as possible')
+    parser.add_argument('--interpreted', action='store_true', help='Interpret instructions instead of compiling ROMs')
+    args = parser.parse_args()
+
+    manager = SessionManager(compiled=not args.interpreted)
+    for rom in args.roms:
+        for _ in range(args.sessions):
+            manager.start_file(Path(rom))
+
+    if args.unpaced:
+        end = time.perf_counter() + args.seconds
+        while time.perf_counter() < end and manager.run(100) == 100:
+            pass
+    else:
+        manager.serve(args.seconds)
+
+    for stats in manager.stats():
+        print("{id:>4} {rom:<24} {state:<8} priority {priority} frames {frames} "
+              "IPS {instructions_per_second:.0f} busy IPS {busy_instructions_per_second:.0f}".format(**stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import struct
+import time
+from typing import Dict, Optional
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU, I, MEMORY_OFFSET, PC, REGISTERS_SIZE, SP, STATE_SIZE, TIMER_DT, TIMER_ST, V_OFFSET
+from PyCHIP8.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Header of segment: magic, layout version, sequence, frame number, width and height of frame
+HEADER = struct.Struct("<4sHxxIQHH")
+MAGIC = b"PC8S"
+VERSION = 1
+# Sequence is a 32 bit aligned word, so it is written and read in a single access
+SEQUENCE_OFFSET = 8
+
+# Names of segments created by writers in this process
+CREATED_SEGMENTS = set()
+
+FRAME_OFFSET = 32
+FRAME_SIZE = Config.SCREEN_WIDTH_EXTENDED * Config.SCREEN_HEIGHT_EXTENDED
+STATE_OFFSET = FRAME_OFFSET + FRAME_SIZE
+SEGMENT_SIZE = STATE_OFFSET + STATE_SIZE
+
+
+class TornReadException(Exception):
+    """
+    Raised when consistent copy could not be read, because writer kept publishing during all attempts
+    """
+
+
+class SharedStateWriter:
+    """
+    Publishes screen bitmap and CPU state into a shared memory segment, from which other local processes read them
+    without copying or serialization.
+
+    Segment starts with a header (see HEADER) followed by frame (width * height bytes in Screen.bitmap order, room for
+    the extended screen is always reserved) and by the whole CPU state buffer (registers, V registers and memory, see
+    PyCHIP8.cpu). Writes are guarded by a sequence lock: sequence is odd while data is being written and it is
+    incremented to the next even number when data is complete, so readers can detect reads overlapping a write
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        """
+        :param name: Name of created segment, defaults to None (random name, see name attribute)
+        :throws FileExistsError: When segment with this name already exists
+        :throws ImportError: When multiprocessing.shared_memory is not available (Python older than 3.8)
+        """
+        from multiprocessing import shared_memory
+
+        self.segment = shared_memory.SharedMemory(name, create=True, size=SEGMENT_SIZE)
+        self.name = self.segment.name
+        CREATED_SEGMENTS.add(self.name)
+        self.buffer = self.segment.buf
+        self.sequence = 0
+        self.frames = 0
+        HEADER.pack_into(self.buffer, 0, MAGIC, VERSION, self.sequence, self.frames, 0, 0)
+
+    def set_sequence(self, sequence: int):
+        self.sequence = sequence
+        struct.pack_into("<I", self.buffer, SEQUENCE_OFFSET, sequence & 0xFFFFFFFF)
+
+    def publish(self, cpu: CPU, bitmap: Optional["np.ndarray"] = None):
+        """
+        Copies frame and CPU state into segment
+
+        :param cpu: CPU whose state is published
+        :param bitmap: Frame to publish, defaults to None (current bitmap of CPU screen)
+        """
+        if bitmap is None:
+            bitmap = cpu.screen.bitmap
+        width, height = bitmap.shape
+        buffer = self.buffer
+
+        self.set_sequence(self.sequence + 1)
+        self.frames += 1
+        HEADER.pack_into(buffer, 0, MAGIC, VERSION, self.sequence, self.frames, width, height)
+        buffer[FRAME_OFFSET:FRAME_OFFSET + width * height] = bitmap.tobytes()
+        buffer[STATE_OFFSET:SEGMENT_SIZE] = cpu.state
+        self.set_sequence(self.sequence + 1)
+
+    def close(self):
+        """
+        Releases and removes segment, readers which are attached keep their mapping until they close it
+        """
+        self.buffer = None
+        self.segment.close()
+        self.segment.unlink()
+        CREATED_SEGMENTS.discard(self.name)
+
+
+class SharedStateReader:
+    """
+    Reads frames and CPU state published by SharedStateWriter in another process.
+
+    frame and state return views into shared memory, so nothing is copied, but the writer can change them at any time.
+    Zero copy readers call begin before using views and check that validate returns True after they are done, other
+    readers use read_frame and read_state, which return consistent copies
+    """
+
+    def __init__(self, name: str, attempts: int = 1000):
+        """
+        :param name: Name of segment created by writer
+        :param attempts: Number of reads tried by read_frame and read_state before they give up, defaults to 1000
+        :throws FileNotFoundError: When there is no segment with this name
+        :throws ValueError: When segment was not created by SharedStateWriter of the same layout version
+        """
+        from multiprocessing import resource_tracker, shared_memory
+
+        self.segment = shared_memory.SharedMemory(name)
+        # Resource tracker would unlink attached segment when this process exits, but it belongs to the writer, tracker
+        # is shared with writers of this process, so their segments stay registered
+        if self.segment.name not in CREATED_SEGMENTS:
+            resource_tracker.unregister(self.segment._name, "shared_memory")
+        self.buffer = self.segment.buf
+        self.attempts = attempts
+
+        magic, version = HEADER.unpack_from(self.buffer, 0)[:2]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Segment {} does not contain PyCHIP8 state of version {}".format(name, VERSION))
+
+        self.registers = self.buffer[STATE_OFFSET:STATE_OFFSET + REGISTERS_SIZE].cast("H")
+        self.v = self.buffer[STATE_OFFSET + V_OFFSET:STATE_OFFSET + MEMORY_OFFSET]
+        self.memory = self.buffer[STATE_OFFSET + MEMORY_OFFSET:SEGMENT_SIZE]
+
+    @property
+    def sequence(self) -> int:
+        return struct.unpack_from("<I", self.buffer, SEQUENCE_OFFSET)[0]
+
+    @property
+    def frames(self) -> int:
+        """
+        Number of frames published so far
+        """
+        return HEADER.unpack_from(self.buffer, 0)[3]
+
+    def begin(self) -> int:
+        """
+        Waits until no write is in progress
+
+        :return: Sequence which should be passed to validate
+        """
+        while True:
+            sequence = self.sequence
+            if not sequence & 1:
+                return sequence
+            time.sleep(0)
+
+    def validate(self, sequence: int) -> bool:
+        """
+        :param sequence: Value returned by begin
+        :return: True if nothing was published since begin, so data read in between is consistent
+        """
+        return self.sequence == sequence
+
+    def frame(self) -> "np.ndarray":
+        """
+        Returns view of the last published frame in shared memory, indexed [x, y] like Screen.bitmap
+        """
+        width, height = HEADER.unpack_from(self.buffer, 0)[4:]
+        return np.frombuffer(self.buffer, dtype="int8", count=width * height,
+                             offset=FRAME_OFFSET).reshape(width, height)
+
+    def read_frame(self) -> "np.ndarray":
+        """
+        Returns copy of the last published frame
+
+        :throws TornReadException: When no attempt read frame without overlapping write
+        """
+        for _ in range(self.attempts):
+            sequence = self.begin()
+            frame = self.frame().copy()
+            if self.validate(sequence):
+                return frame
+        raise TornReadException("Frame was being written during all {} attempts".format(self.attempts))
+
+    def read_state(self) -> Dict[str, object]:
+        """
+        Returns copy of the last published registers, timers, V registers and memory
+
+        :throws TornReadException: When no attempt read state without overlapping write
+        """
+        registers = self.registers
+        for _ in range(self.attempts):
+            sequence = self.begin()
+            state = {
+                "frames": self.frames,
+                "pc": registers[PC],
+                "sp": registers[SP],
+                "i": registers[I],
+                "timer_dt": registers[TIMER_DT],
+                "timer_st": registers[TIMER_ST],
+                "v": bytes(self.v),
+                "memory": bytes(self.memory),
+            }
+            if self.validate(sequence):
+                return state
+        raise TornReadException("State was being written during all {} attempts".format(self.attempts))
+
+    def close(self):
+        """
+        Releases mapping of segment, all arrays returned by frame have to be deleted before this call
+        """
+        self.registers.release()
+        self.v.release()
+        self.memory.release()
+        self.buffer = None
+        self.segment.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print CPU state exported by emulator to shared memory')
+    parser.add_argument('name', help='Name of shared memory segment given to --export')
+    parser.add_argument('--interval', type=float, default=1.0, help='Time in seconds between printed lines')
+    args = parser.parse_args()
+
+    reader = SharedStateReader(args.name)
+    try:
+        while True:
+            state = reader.read_state()
+            print("frame {frames} pc {pc:#05x} i {i:#05x} dt {timer_dt} st {timer_st} v {registers}".format(
+                registers=state["v"].hex(), **state))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,514 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import selectors
+import socket
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.emulation_thread import EmulationThread
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.lazy import lazy_import
+from PyCHIP8.transpiler import CompiledRunner
+
+np = lazy_import("numpy")
+
+# Every server message starts with header: kind, frame number, frame width, frame height, payload length
+HEADER = struct.Struct("!BIHHI")
+KEYFRAME = 1
+DELTA = 2
+
+# Every client message is the state of all keys as 16 bit mask (see Keypad.mask)
+KEY_MASK = struct.Struct("!H")
+
+
+def encode_varints(values) -> bytes:
+    """
+    Encodes non negative integers as LEB128 varints, small values take a single byte
+
+    :param values: Iterable of non negative integers
+    """
+    encoded = bytearray()
+    for value in values:
+        value = int(value)
+        while value >= 0x80:
+            encoded.append((value & 0x7F) | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    """
+    Decodes integers encoded by encode_varints
+
+    :param data: Encoded integers
+    """
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def encode_runs(pixels: np.ndarray) -> bytes:
+    """
+    Run length encodes array of pixels, every pixel is a mask of bitplanes (see Screen.bitmap). Bitplanes are encoded
+    one after another, runs of a plane alternate between unset and set pixels and the first run is always a run of
+    unset pixels (possibly empty), so only lengths of runs are stored. Trailing empty planes are left out, so frames
+    using only the first plane are encoded as array of zeros and ones would be
+
+    :param pixels: One dimensional array of pixels
+    """
+    planes = [(pixels >> plane) & 1 for plane in range(Config.NUMBER_OF_PLANES)]
+    while len(planes) > 1 and not planes[-1].any():
+        planes.pop()
+
+    encoded = bytearray()
+    for bits in planes:
+        changes = np.flatnonzero(bits[1:] != bits[:-1]) + 1
+        runs = np.diff(np.concatenate(([0], changes, [bits.size])))
+        if bits[0]:
+            runs = np.concatenate(([0], runs))
+        encoded += encode_varints(runs)
+    return bytes(encoded)
+
+
+def decode_runs(data: bytes, size: int) -> np.ndarray:
+    """
+    Decodes pixels encoded by encode_runs
+
+    :param data: Encoded runs
+    :param size: Number of pixels
+    :throws ValueError: When runs of a plane do not add up to size or there are more planes than Screen supports
+    """
+    pixels = np.zeros(size, dtype="int8")
+    plane = 0
+    runs: List[int] = []
+    total = 0
+    for run in decode_varints(data):
+        runs.append(run)
+        total += run
+        if total > size:
+            break
+        if total == size:
+            if plane >= Config.NUMBER_OF_PLANES:
+                raise ValueError("Runs describe more than {} planes".format(Config.NUMBER_OF_PLANES))
+            pixels |= np.repeat(np.arange(len(runs), dtype="int8") % 2, runs) << plane
+            plane += 1
+            runs = []
+            total = 0
+    if runs or plane == 0:
+        raise ValueError("Runs describe {} pixels, expected {}".format(total, size))
+    return pixels
+
+
+class FrameEncoder:
+    """
+    Encodes frames as XOR differences to the previous frame, compressed with run length encoding. Frame that did not
+    change is not encoded at all. Every keyframe_interval encoded frames (and whenever frame size changes) a keyframe
+    is encoded instead, which is a difference to a blank frame, so it can be decoded without any previous frame
+    """
+
+    def __init__(self, keyframe_interval: int = Config.STREAM_KEYFRAME_INTERVAL):
+        """
+        :param keyframe_interval: Number of encoded frames between keyframes,
+                                  defaults to Config.STREAM_KEYFRAME_INTERVAL
+        """
+        self.keyframe_interval = keyframe_interval
+        self.previous: Optional[np.ndarray] = None
+        self.frame_number = 0
+        self.since_keyframe = 0
+
+    def message(self, kind: int, pixels: np.ndarray) -> bytes:
+        """
+        Builds message with header followed by run length encoded pixels of current frame
+
+        :param kind: KEYFRAME or DELTA
+        :param pixels: Pixels of current frame (KEYFRAME) or its difference to previous frame (DELTA)
+        """
+        payload = encode_runs(pixels.ravel())
+        width, height = self.previous.shape
+        return HEADER.pack(kind, self.frame_number, width, height, len(payload)) + payload
+
+    def encode(self, bitmap: np.ndarray) -> Optional[bytes]:
+        """
+        Encodes frame
+
+        :param bitmap: Frame, it has the same layout as Screen.bitmap
+        :return: Message describing frame, None if frame is the same as previous one
+        """
+        self.frame_number += 1
+
+        if self.previous is None or self.previous.shape != bitmap.shape:
+            self.previous = bitmap.copy()
+            self.since_keyframe = 0
+            return self.message(KEYFRAME, bitmap)
+
+        difference = np.bitwise_xor(self.previous, bitmap)
+        if not difference.any():
+            return None
+
+        np.copyto(self.previous, bitmap)
+        self.since_keyframe += 1
+        if self.since_keyframe >= self.keyframe_interval:
+            self.since_keyframe = 0
+            return self.message(KEYFRAME, bitmap)
+        return self.message(DELTA, difference)
+
+    def keyframe(self) -> Optional[bytes]:
+        """
+        Encodes the last encoded frame as keyframe, it is sent to clients that connect between keyframes
+
+        :return: Message describing the last frame, None if no frame was encoded yet
+        """
+        if self.previous is None:
+            return None
+        return self.message(KEYFRAME, self.previous)
+
+
+class FrameDecoder:
+    """
+    Rebuilds frames from messages produced by FrameEncoder
+    """
+
+    def __init__(self):
+        self.bitmap: Optional[np.ndarray] = None
+        self.frame_number = 0
+
+    def decode(self, kind: int, frame_number: int, width: int, height: int, payload: bytes) -> Optional[np.ndarray]:
+        """
+        Applies message to the current frame
+
+        :param kind: KEYFRAME or DELTA
+        :param frame_number: Number of frame described by message
+        :param width: Width of frame
+        :param height: Height of frame
+        :param payload: Run length encoded pixels
+        :return: Current frame, None if delta was received before the first keyframe
+        :throws ValueError: When message is malformed
+        """
+        pixels = decode_runs(payload, width * height).reshape((width, height))
+
+        if kind == KEYFRAME:
+            self.bitmap = pixels
+        elif kind == DELTA:
+            if self.bitmap is None or self.bitmap.shape != pixels.shape:
+                return None
+            np.bitwise_xor(self.bitmap, pixels, out=self.bitmap)
+        else:
+            raise ValueError("Unknown message kind {}".format(kind))
+
+        self.frame_number = frame_number
+        return self.bitmap
+
+
+def receive_exactly(connection: socket.socket, size: int) -> Optional[bytes]:
+    """
+    Receives exactly size bytes from blocking socket
+
+    :return: Received data, None if connection was closed
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def receive_message(connection: socket.socket) -> Optional[Tuple[int, int, int, int, bytes]]:
+    """
+    Receives single message sent by StreamServer
+
+    :return: Kind, frame number, width, height and payload of message, None if connection was closed
+    """
+    header = receive_exactly(connection, HEADER.size)
+    if header is None:
+        return None
+    kind, frame_number, width, height, length = HEADER.unpack(header)
+    payload = receive_exactly(connection, length)
+    if payload is None:
+        return None
+    return kind, frame_number, width, height, payload
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """
+    Parses address of streaming server, unix:PATH is a Unix socket, HOST:PORT (or just PORT) is a TCP socket
+
+    :return: Socket family and address in form expected by socket module
+    :throws ValueError: When port is not a number
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+class StreamClient:
+    """
+    Connection of a single viewer, it stores received bytes until whole key mask arrives
+    """
+
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.received = b""
+        self.key_mask = 0
+
+
+class StreamServer:
+    """
+    Runs CPU headless on emulation thread and streams its frames to connected clients. Every frame is encoded once
+    and the same message is sent to all clients, frames that did not change are not sent at all. Clients send back
+    state of their keys, keys pressed by any client are pressed on CPU keypad
+    """
+
+    def __init__(self, cpu: CPU, address: str, runner: Optional[CompiledRunner] = None,
+                 keyframe_interval: int = Config.STREAM_KEYFRAME_INTERVAL):
+        """
+        :param cpu: CPU with loaded ROM, its screen should not draw on a window (see HeadlessScreen)
+        :param address: Address to listen on, see parse_address
+        :param runner: Runner executing compiled ROM, if None instructions are interpreted by CPU, defaults to None
+        :param keyframe_interval: Number of sent frames between keyframes, defaults to Config.STREAM_KEYFRAME_INTERVAL
+        :throws OSError: When socket could not be bound to address
+        """
+        self.cpu = cpu
+        self.frames = FrameBuffer(cpu.screen.bitmap.shape)
+        self.emulation = EmulationThread(cpu, self.frames, runner=runner)
+        self.encoder = FrameEncoder(keyframe_interval)
+
+        self.family, address = parse_address(address)
+        self.listener = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        elif Path(address).is_socket():
+            # Left by server that was killed before it could clean up
+            os.unlink(address)
+        self.listener.bind(address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.clients: Dict[socket.socket, StreamClient] = {}
+
+        self.messages_sent = 0
+        self.bytes_sent = 0
+
+    def accept(self):
+        """
+        Accepts new client and sends it the current frame
+        """
+        connection, _ = self.listener.accept()
+        connection.settimeout(Config.STREAM_SEND_TIMEOUT)
+        self.clients[connection] = StreamClient(connection)
+        self.selector.register(connection, selectors.EVENT_READ)
+        logging.info("Client connected, {} connected".format(len(self.clients)))
+
+        keyframe = self.encoder.keyframe()
+        if keyframe is not None:
+            self.send(connection, keyframe)
+
+    def disconnect(self, connection: socket.socket):
+        """
+        Closes client connection and releases keys it pressed
+        """
+        if self.clients.pop(connection, None) is None:
+            return
+        self.selector.unregister(connection)
+        connection.close()
+        self.update_keypad()
+        logging.info("Client disconnected, {} connected".format(len(self.clients)))
+
+    def receive(self, connection: socket.socket):
+        """
+        Reads key masks sent by client, only the newest complete mask is used
+        """
+        client = self.clients[connection]
+        try:
+            data = connection.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(connection)
+            return
+
+        client.received += data
+        complete = len(client.received) - len(client.received) % KEY_MASK.size
+        if complete:
+            client.key_mask, = KEY_MASK.unpack_from(client.received, complete - KEY_MASK.size)
+            client.received = client.received[complete:]
+            self.update_keypad()
+
+    def update_keypad(self):
+        """
+        Presses keys pressed by any client
+        """
+        key_mask = 0
+        for client in self.clients.values():
+            key_mask |= client.key_mask
+        self.cpu.keypad.mask = key_mask
+
+    def send(self, connection: socket.socket, message: bytes):
+        """
+        Sends message to client, client is disconnected when sending fails
+        """
+        try:
+            connection.sendall(message)
+        except OSError:
+            self.disconnect(connection)
+            return
+        self.messages_sent += 1
+        self.bytes_sent += len(message)
+
+    def broadcast(self, message: bytes):
+        """
+        Sends the same message to every client
+        """
+        for connection in list(self.clients):
+            self.send(connection, message)
+
+    def poll(self, timeout: float):
+        """
+        Handles new connections and client input
+
+        :param timeout: Maximum time in seconds to wait for socket events
+        """
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.listener:
+                self.accept()
+            else:
+                self.receive(key.fileobj)
+
+    def serve(self):
+        """
+        Runs emulation and streams frames until CPU stops running
+
+        :throws Exception: Exception that stopped emulation thread
+        """
+        frame_interval = 1 / Config.FRAME_RATE
+        self.emulation.start()
+        try:
+            while self.cpu.running:
+                self.poll(frame_interval)
+
+                frame = self.frames.acquire()
+                if frame is not None:
+                    message = self.encoder.encode(frame)
+                    if message is not None:
+                        self.broadcast(message)
+        finally:
+            self.emulation.stop()
+            self.close()
+            logging.info("Frames encoded: {} messages sent: {} bytes sent: {}".format(
+                self.encoder.frame_number, self.messages_sent, self.bytes_sent))
+
+        if self.emulation.error is not None:
+            raise self.emulation.error
+
+    def close(self):
+        """
+        Disconnects all clients and stops listening
+        """
+        for connection in list(self.clients):
+            self.disconnect(connection)
+        self.selector.close()
+        self.listener.close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+
+def view(address: str):
+    """
+    Connects to streaming server and displays received frames in a window, keys pressed in the window are sent back
+    to the server
+
+    :param address: Address of server, see parse_address
+    """
+    import pygame
+
+    from PyCHIP8.keyboard import PygameKeypad
+    from PyCHIP8.screen import Screen
+
+    family, address = parse_address(address)
+    connection = socket.socket(family, socket.SOCK_STREAM)
+    connection.connect(address)
+
+    window = Screen()
+    pygame.display.set_caption("PyCHIP8 viewer")
+    keypad = PygameKeypad()
+    decoder = FrameDecoder()
+    key_mask = 0
+
+    selector = selectors.DefaultSelector()
+    selector.register(connection, selectors.EVENT_READ)
+    running = True
+    while running:
+        for event in pygame.event.get():
+            keypad.handle_event(event)
+            if event.type == pygame.QUIT:
+                running = False
+
+        if keypad.mask != key_mask:
+            key_mask = keypad.mask
+            connection.sendall(KEY_MASK.pack(key_mask))
+
+        if selector.select(1 / Config.FRAME_RATE):
+            message = receive_message(connection)
+            if message is None:
+                break
+            frame = decoder.decode(*message)
+            if frame is not None:
+                window.present(frame)
+
+    selector.close()
+    connection.close()
+
+
+def main():
+    from PyCHIP8.headless import create_headless_cpu
+    from PyCHIP8.transpiler import compile_rom
+
+    parser = argparse.ArgumentParser(description='Stream CHIP-8 emulator frames over a socket')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='Run ROM headless and stream its frames')
+    serve_parser.add_argument('rom', help='Path to ROM file containing CHIP-8 game or program')
+    serve_parser.add_argument('address', help='HOST:PORT or unix:PATH to listen on')
+    serve_parser.add_argument('--compiled', action='store_true', help='Translate ROM to Python code before running')
+    serve_parser.add_argument('--quirks', help='Quirk profile of the ROM, see PyCHIP8.quirks.PROFILES')
+    view_parser = commands.add_parser('view', help='Display frames streamed by server')
+    view_parser.add_argument('address', help='HOST:PORT or unix:PATH of server')
+    args = parser.parse_args()
+
+    if args.command == 'view':
+        view(args.address)
+        return
+
+    cpu = create_headless_cpu(Path(args.rom), args.quirks)
+    runner = CompiledRunner(cpu, compile_rom(Path(args.rom).read_bytes())) if args.compiled else None
+
+    server = StreamServer(cpu, args.address, runner)
+    print("Streaming on {}".format(server.address))
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
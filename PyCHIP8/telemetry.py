@@ -0,0 +1,158 @@
+import bisect
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from PyCHIP8.conf import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets, recording a value is a binary search and an increment, so it can be done every frame
+    """
+
+    def __init__(self, bounds: Sequence[float] = Config.TELEMETRY_BUCKETS):
+        """
+        :param bounds: Upper bounds of buckets in increasing order, values above the last bound go to an extra bucket,
+                       defaults to Config.TELEMETRY_BUCKETS
+        """
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns upper bound of bucket containing given percentile, or maximal recorded value if it is in the last bucket
+
+        :param percent: Percentile in range (0, 100]
+        """
+        if not self.count:
+            return 0.0
+        threshold = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {"mean": self.mean, "p50": self.percentile(50), "p99": self.percentile(99), "max": self.max}
+
+
+class Telemetry:
+    """
+    Runtime statistics of emulation: executed instructions, emulated frames, time spent emulating and presenting
+    frames and how late emulation frames start compared to schedule. Times are recorded in milliseconds
+    """
+
+    def __init__(self, log_interval: float = Config.TELEMETRY_LOG_INTERVAL, clock_speed: int = Config.CPU_CLOCK_SPEED):
+        """
+        :param log_interval: Minimal time in seconds between log lines, defaults to Config.TELEMETRY_LOG_INTERVAL
+        :param clock_speed: Target number of instructions per second, it is changed when ROM with another clock speed
+                            is loaded, defaults to Config.CPU_CLOCK_SPEED
+        """
+        self.log_interval = log_interval
+        self.clock_speed = clock_speed
+
+        self.instructions = 0
+        self.frames = 0
+        self.emulation_time = Histogram()
+        self.presentation_time = Histogram()
+        self.lateness = Histogram()
+
+        # Rates are computed over a window which is restarted by every log line
+        self.window_start = time.perf_counter()
+        self.window_instructions = 0
+        self.window_frames = 0
+        self.instructions_per_second = 0.0
+        self.frames_per_second = 0.0
+
+    def record_frame(self, instructions: int, emulation_time: float, lateness: float):
+        """
+        :param instructions: Number of instructions executed in frame
+        :param emulation_time: Time spent emulating frame in seconds
+        :param lateness: Time in seconds by which frame started later than scheduled
+        """
+        self.instructions += instructions
+        self.frames += 1
+        self.emulation_time.record(emulation_time * 1000)
+        self.lateness.record(lateness * 1000)
+
+    def record_presentation(self, presentation_time: float):
+        """
+        :param presentation_time: Time spent presenting frame in seconds
+        """
+        self.presentation_time.record(presentation_time * 1000)
+
+    def update_rates(self, now: Optional[float] = None):
+        """
+        Computes instructions and frames per second since the window was started and starts a new window
+        """
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self.window_start
+        if elapsed <= 0:
+            return
+        self.instructions_per_second = (self.instructions - self.window_instructions) / elapsed
+        self.frames_per_second = (self.frames - self.window_frames) / elapsed
+        self.window_start = now
+        self.window_instructions = self.instructions
+        self.window_frames = self.frames
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns current statistics, rates are the ones computed by the last update_rates call
+        """
+        return {
+            "instructions": self.instructions,
+            "frames": self.frames,
+            "instructions_per_second": self.instructions_per_second,
+            "target_instructions_per_second": self.clock_speed,
+            "frames_per_second": self.frames_per_second,
+            "emulation_ms": self.emulation_time.summary(),
+            "presentation_ms": self.presentation_time.summary(),
+            "lateness_ms": self.lateness.summary(),
+        }
+
+    def lines(self) -> List[str]:
+        """
+        Returns statistics formatted as short lines, used by log and on-screen overlay
+        """
+        emulation = self.emulation_time.summary()
+        presentation = self.presentation_time.summary()
+        lateness = self.lateness.summary()
+        return [
+            "IPS {:.0f}/{} FPS {:.1f}".format(self.instructions_per_second, self.clock_speed, self.frames_per_second),
+            "emu ms p50 {:.2f} p99 {:.2f}".format(emulation["p50"], emulation["p99"]),
+            "present ms p50 {:.2f} p99 {:.2f}".format(presentation["p50"], presentation["p99"]),
+            "late ms p99 {:.2f} max {:.2f}".format(lateness["p99"], lateness["max"]),
+        ]
+
+    def tick(self) -> bool:
+        """
+        Updates rates and logs statistics if log interval elapsed since the last update, it is cheap enough to be
+        called every frame
+
+        :return: True if rates were updated
+        """
+        now = time.perf_counter()
+        if now - self.window_start < self.log_interval:
+            return False
+        self.update_rates(now)
+        logger.info(" | ".join(self.lines()))
+        return True
@@ -0,0 +1,497 @@
+"""
+Ahead-of-time translation of CHIP-8 ROMs into Python modules.
+
+ROM control flow is walked statically starting at Config.PROGRAM_COUNTER. Every reachable basic block becomes a Python
+function working directly on CPU registers and memory. Instructions that can not be resolved statically (BNNN, FX0A,
+unknown opcodes) are left to the interpreter, and blocks overwritten by the program at runtime are dropped, so such
+code is interpreted as well. Generated modules are cached on disk under the hash of ROM contents, so launching the same
+ROM again only imports an already byte-compiled module. Block stopped because its cycle budget ran out continues with
+the rest of its instructions, they are translated when they are needed for the first time.
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU, LONG_INSTRUCTION
+
+# Version of generated code, it is a part of cache key so changing generator invalidates old modules
+TRANSPILER_VERSION = 5
+
+# Blocks are split after this many instructions, block stops earlier when its cycle budget runs out
+MAX_BLOCK_LENGTH = 32
+
+# Instructions executed by the interpreter, compiled block ends right before them
+INTERPRETED_OPCODES = {0xF00A}
+
+SKIP_OPCODES = {0x3000, 0x4000, 0x5000, 0x9000}
+KEY_SKIP_OPCODES = {0xE09E, 0xE0A1}
+WRITE_OPCODES = {0xF033, 0xF055}
+
+LEADING_ZERO_OPCODES = {0x00E0, 0x00EE, 0x00FB, 0x00FC, 0x00FD, 0x00FE, 0x00FF}
+LEADING_EIGHT_OPCODES = {0x0, 0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0x7, 0xE}
+LEADING_F_OPCODES = {0x07, 0x0A, 0x15, 0x18, 0x1E, 0x29, 0x30, 0x33, 0x55, 0x65}
+
+
+def is_known_opcode(opcode: int) -> bool:
+    """
+    Checks if opcode is one of the opcodes implemented by CPU
+
+    :param opcode: Opcode to check
+    """
+    family = opcode >> 12
+    if family == 0x0:
+        return opcode in LEADING_ZERO_OPCODES or opcode & 0xFFF0 in (0x00B0, 0x00C0)
+    if family in (0x5, 0x9):
+        # 5XY2 and 5XY3 (XO-CHIP) are not skips, they are executed by interpreter
+        return opcode & 0x000F == 0
+    if family == 0x8:
+        return opcode & 0x000F in LEADING_EIGHT_OPCODES
+    if family == 0xE:
+        return opcode & 0xF0FF in KEY_SKIP_OPCODES
+    if family == 0xF:
+        return opcode & 0x00FF in LEADING_F_OPCODES
+    return True
+
+
+class Block:
+    """
+    Basic block found in ROM, it is a sequence of instructions with single entry point
+    """
+
+    def __init__(self, start: int):
+        """
+        :param start: Address of the first instruction in the block
+        """
+        self.start = start
+        self.instructions: List[Tuple[int, int]] = []
+        # Address at which execution continues if the last instruction does not change PC
+        self.next = start
+        self.successors: List[int] = []
+
+    @property
+    def end(self) -> int:
+        """
+        Address right after the last instruction in the block
+        """
+        return self.next if not self.instructions else self.instructions[-1][0] + 2
+
+
+def find_blocks(rom: bytes, start: int = Config.PROGRAM_COUNTER) -> Dict[int, Block]:
+    """
+    Walks control flow of ROM loaded at start address, following jumps, calls and both branches of skips
+
+    :param rom: ROM contents
+    :param start: Address at which ROM is loaded and executed, defaults to Config.PROGRAM_COUNTER
+    :return: Reachable blocks that can be compiled, keyed by their start addresses
+    """
+    rom_end = start + len(rom)
+    blocks: Dict[int, Block] = {}
+    pending = [start]
+
+    while pending:
+        address = pending.pop()
+        if address in blocks or not start <= address < rom_end - 1:
+            continue
+
+        block = Block(address)
+        pc = address
+        while pc < rom_end - 1 and len(block.instructions) < MAX_BLOCK_LENGTH:
+            opcode = (rom[pc - start] << 8) | rom[pc - start + 1]
+            family = opcode & 0xF000
+
+            if opcode == LONG_INSTRUCTION:
+                # Interpreter executes F000 NNNN (XO-CHIP), the second word is not an instruction
+                block.successors.append(pc + 4)
+                break
+            if not is_known_opcode(opcode) or opcode & 0xF0FF in INTERPRETED_OPCODES:
+                # Interpreter executes this instruction and continues with whatever comes next
+                block.successors.append(pc + 2)
+                break
+            is_skip = family in SKIP_OPCODES or opcode & 0xF0FF in KEY_SKIP_OPCODES
+            if is_skip and pc + 3 < rom_end and (rom[pc + 2 - start] << 8) | rom[pc + 3 - start] == LONG_INSTRUCTION:
+                # Skip over F000 NNNN skips four bytes, it is executed by interpreter
+                block.successors.extend((pc + 2, pc + 6))
+                break
+
+            block.instructions.append((pc, opcode))
+            pc += 2
+
+            if family == 0x1000:
+                block.successors.append(opcode & 0x0FFF)
+                break
+            if family == 0x2000:
+                block.successors.extend((opcode & 0x0FFF, pc))
+                break
+            if is_skip:
+                block.successors.extend((pc, pc + 2))
+                break
+            if family == 0xB000 or opcode in (0x00EE, 0x00FD):
+                # Targets of returns are added by calls, BNNN is resolved by interpreter at runtime
+                break
+            if opcode & 0xF0FF in WRITE_OPCODES:
+                block.successors.append(pc)
+                break
+        else:
+            block.successors.append(pc)
+
+        block.next = pc
+        if block.instructions:
+            blocks[address] = block
+        pending.extend(block.successors)
+
+    return blocks
+
+
+def translate_instruction(address: int, opcode: int) -> List[str]:
+    """
+    Translates single instruction into lines of Python code. Generated code has access to cpu, registers (v),
+    memory, execute (CPU.execute_instruction) and written (callback informing about memory writes)
+
+    :param address: Address of the instruction
+    :param opcode: Opcode of the instruction
+    :return: Lines of Python code, without indentation
+    """
+    x = (opcode & 0x0F00) >> 8
+    y = (opcode & 0x00F0) >> 4
+    nn = opcode & 0x00FF
+    nnn = opcode & 0x0FFF
+    family = opcode & 0xF000
+    next_address = address + 2
+
+    if family == 0x1000:
+        return ["cpu.pc = {:#05x}".format(nnn)]
+    if family == 0x2000:
+        return ["sp = cpu.sp",
+                "memory[sp] = {:#04x}".format(next_address & 0xFF),
+                "memory[sp + 1] = {:#04x}".format(next_address >> 8),
+                "written(sp, 2)",
+                "cpu.sp = sp + 2",
+                "cpu.pc = {:#05x}".format(nnn)]
+    if opcode == 0x00EE:
+        return ["sp = cpu.sp - 2",
+                "cpu.sp = sp",
+                "cpu.pc = (memory[sp + 1] << 8) | memory[sp]"]
+    if family == 0x3000:
+        return ["cpu.pc = {:#05x} if v[{}] == {:#04x} else {:#05x}".format(next_address + 2, x, nn, next_address)]
+    if family == 0x4000:
+        return ["cpu.pc = {:#05x} if v[{}] != {:#04x} else {:#05x}".format(next_address + 2, x, nn, next_address)]
+    if family == 0x5000:
+        return ["cpu.pc = {:#05x} if v[{}] == v[{}] else {:#05x}".format(next_address + 2, x, y, next_address)]
+    if family == 0x9000:
+        return ["cpu.pc = {:#05x} if v[{}] != v[{}] else {:#05x}".format(next_address + 2, x, y, next_address)]
+    if family == 0x6000:
+        return ["v[{}] = {:#04x}".format(x, nn)]
+    if family == 0x7000:
+        return ["v[{0}] = (v[{0}] + {1:#04x}) & 0xFF".format(x, nn)]
+    if family == 0x8000:
+        operation = opcode & 0x000F
+        if operation == 0x0:
+            return ["v[{}] = v[{}]".format(x, y)]
+        if operation in (0x1, 0x2, 0x3):
+            operator = {0x1: "|", 0x2: "&", 0x3: "^"}[operation]
+            return ["v[{0}] {1}= v[{2}]".format(x, operator, y)]
+        if operation == 0x4:
+            return ["result = v[{}] + v[{}]".format(x, y),
+                    "v[{}] = result & 0xFF".format(x),
+                    "v[0xF] = result >> 8"]
+        if operation in (0x5, 0x7):
+            minuend, subtrahend = (x, y) if operation == 0x5 else (y, x)
+            return ["first, second = v[{}], v[{}]".format(minuend, subtrahend),
+                    "v[{}] = (first - second) & 0xFF".format(x),
+                    "v[0xF] = 1 if first >= second else 0"]
+    if family == 0xA000:
+        return ["cpu.i = {:#05x}".format(nnn)]
+    if family == 0xF000:
+        operation = opcode & 0x00FF
+        if operation == 0x07:
+            return ["v[{}] = cpu.timer_dt".format(x)]
+        if operation == 0x15:
+            return ["cpu.timer_dt = v[{}]".format(x)]
+        if operation == 0x18:
+            return ["cpu.timer_st = v[{}]".format(x)]
+        if operation == 0x1E:
+            return ["cpu.i = (cpu.i + v[{}]) & 0xFFFF".format(x)]
+        if operation == 0x29:
+            return ["cpu.i = v[{}] * 5".format(x)]
+        if operation in (0x33, 0x55):
+            length = 3 if operation == 0x33 else x + 1
+            return ["i = cpu.i",
+                    "execute({:#06x})".format(opcode),
+                    "written(i, {})".format(length)]
+
+    # Instructions depending on CPU state not available here (screen, keyboard, quirks) are executed by CPU itself
+    lines = ["execute({:#06x})".format(opcode)]
+    if family in (0xB000, 0xE000) or opcode == 0x00FD:
+        lines.insert(0, "cpu.pc = {:#05x}".format(next_address))
+    return lines
+
+
+def translate_block(block: Block) -> List[str]:
+    """
+    Translates block into Python function definition. The function takes cycle budget, executes at most that many
+    instructions and returns number of executed instructions
+
+    :param block: Block to translate
+    :return: Lines of Python code
+    """
+    lines = ["def block_{:04x}(cpu, written, budget):".format(block.start),
+             "    v = cpu.v",
+             "    memory = cpu.memory",
+             "    execute = cpu.execute_instruction"]
+
+    changes_pc = False
+    for executed, (address, opcode) in enumerate(block.instructions, 1):
+        lines.append("    # {:#05x}: {:04x}".format(address, opcode))
+        translated = translate_instruction(address, opcode)
+        lines.extend("    " + line for line in translated)
+        changes_pc = any(line.startswith("cpu.pc =") for line in translated)
+        if executed < len(block.instructions):
+            # Only the last instruction of a block can change PC, so block stopped here continues at the next one
+            lines.extend(["    if budget == {}:".format(executed),
+                          "        cpu.pc = {:#05x}".format(address + 2),
+                          "        return {}".format(executed)])
+
+    if not changes_pc:
+        lines.append("    cpu.pc = {:#05x}".format(block.next))
+    lines.append("    return {}".format(len(block.instructions)))
+    return lines
+
+
+def translate_rom(rom: bytes, start: int = Config.PROGRAM_COUNTER) -> str:
+    """
+    Translates ROM into source code of Python module. Module defines BLOCKS, dictionary mapping start addresses to
+    block functions, and RANGES, dictionary mapping start addresses to addresses right after the blocks
+
+    :param rom: ROM contents
+    :param start: Address at which ROM is loaded and executed, defaults to Config.PROGRAM_COUNTER
+    :return: Source code of the module
+    """
+    blocks = find_blocks(rom, start)
+
+    lines = ['"""',
+             "Generated by PyCHIP8 transpiler version {} from ROM with SHA-1 {}".format(
+                 TRANSPILER_VERSION, hashlib.sha1(rom).hexdigest()),
+             '"""', "", ""]
+    for address in sorted(blocks):
+        lines.extend(translate_block(blocks[address]))
+        lines.extend(["", ""])
+
+    lines.append("BLOCKS = {")
+    lines.extend("    {0:#05x}: block_{0:04x},".format(address) for address in sorted(blocks))
+    lines.append("}")
+    lines.append("")
+    lines.append("RANGES = {")
+    lines.extend("    {:#05x}: {:#05x},".format(address, blocks[address].end) for address in sorted(blocks))
+    lines.append("}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+class CompiledProgram:
+    """
+    Blocks of compiled ROM, shared by all runners executing the same ROM
+    """
+
+    def __init__(self, rom: bytes, blocks: Dict[int, Callable], ranges: Dict[int, int],
+                 start: int = Config.PROGRAM_COUNTER):
+        """
+        :param rom: ROM contents
+        :param blocks: Block functions keyed by their start addresses
+        :param ranges: Addresses right after the blocks keyed by block start addresses
+        :param start: Address at which ROM is loaded, defaults to Config.PROGRAM_COUNTER
+        """
+        self.rom = rom
+        self.blocks = blocks
+        self.ranges = ranges
+        self.start = start
+
+        # For every address, start addresses of blocks containing instruction at this address
+        self.owners: Dict[int, List[int]] = {}
+        for block_start, block_end in ranges.items():
+            for address in range(block_start, block_end):
+                self.owners.setdefault(address, []).append(block_start)
+        # Functions executing ends of blocks, keyed by their start and end addresses
+        self.remainders: Dict[Tuple[int, int], Callable] = {}
+
+    def remainder(self, address: int, end: int) -> Callable:
+        """
+        Returns function executing instructions of block from address to its end, it is translated on first use
+
+        :param address: Address of the first executed instruction
+        :param end: Address right after the last instruction of block
+        """
+        key = (address, end)
+        function = self.remainders.get(key)
+        if function is None:
+            block = Block(address)
+            rom, start = self.rom, self.start
+            block.instructions = [(pc, (rom[pc - start] << 8) | rom[pc - start + 1]) for pc in range(address, end, 2)]
+            block.next = end
+            namespace: dict = {}
+            exec(compile("\n".join(translate_block(block)), "<compiled ROM>", "exec"), namespace)
+            function = self.remainders[key] = namespace["block_{:04x}".format(address)]
+        return function
+
+
+def cache_path(rom: bytes, cache_dir: Path = Config.COMPILED_CACHE_DIR, start: int = Config.PROGRAM_COUNTER) -> Path:
+    """
+    Returns path of the cached module for given ROM loaded at start address
+
+    :param rom: ROM contents
+    :param cache_dir: Directory containing compiled ROMs, defaults to Config.COMPILED_CACHE_DIR
+    :param start: Address at which ROM is loaded, defaults to Config.PROGRAM_COUNTER
+    """
+    return cache_dir / "rom_{}_{:03x}_v{}.py".format(hashlib.sha1(rom).hexdigest(), start, TRANSPILER_VERSION)
+
+
+def compile_rom(rom: bytes, cache_dir: Optional[Path] = Config.COMPILED_CACHE_DIR,
+                start: int = Config.PROGRAM_COUNTER) -> CompiledProgram:
+    """
+    Returns compiled ROM, translating it only if there is no cached module for ROM with the same contents
+
+    :param rom: ROM contents
+    :param cache_dir: Directory containing compiled ROMs, if None module is not cached,
+                      defaults to Config.COMPILED_CACHE_DIR
+    :param start: Address at which ROM is loaded, defaults to Config.PROGRAM_COUNTER
+    """
+    if cache_dir is None:
+        namespace: dict = {}
+        exec(compile(translate_rom(rom, start), "<compiled ROM>", "exec"), namespace)
+        return CompiledProgram(rom, namespace["BLOCKS"], namespace["RANGES"], start)
+
+    path = cache_path(rom, cache_dir, start)
+    if not path.exists():
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(".tmp{}".format(os.getpid()))
+        temporary_path.write_text(translate_rom(rom, start))
+        os.replace(str(temporary_path), str(path))
+
+    spec = importlib.util.spec_from_file_location(path.stem, str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return CompiledProgram(rom, module.BLOCKS, module.RANGES, start)
+
+
+class CompiledRunner:
+    """
+    Executes compiled blocks on a CPU, falling back to the interpreter wherever there is no valid block
+    """
+
+    def __init__(self, cpu: CPU, program: CompiledProgram):
+        """
+        :param cpu: CPU with program ROM already loaded into memory
+        :param program: Compiled ROM
+        """
+        self.cpu = cpu
+        self.program = program
+        self.blocks = dict(program.blocks)
+        self.owners = program.owners
+        self.ranges = program.ranges
+
+        rom_start = program.start
+        rom = program.rom
+        for block_start, block_end in program.ranges.items():
+            if cpu.memory[block_start:block_end] != rom[block_start - rom_start:block_end - rom_start]:
+                self.blocks.pop(block_start, None)
+
+    def written(self, address: int, length: int):
+        """
+        Drops blocks overlapping written memory range, they will be executed by the interpreter from now on
+
+        :param address: First written address
+        :param length: Number of written bytes
+        """
+        owners = self.owners
+        for written_address in range(address, address + length):
+            for block_start in owners.get(written_address, ()):
+                self.blocks.pop(block_start, None)
+
+    def step(self, budget: int = MAX_BLOCK_LENGTH) -> int:
+        """
+        Executes single block or, if there is no block at current PC, single instruction
+
+        :param budget: Maximum number of executed instructions, block is stopped when it runs out, it has to be
+                       positive, defaults to MAX_BLOCK_LENGTH
+        :return: Number of executed instructions
+        """
+        cpu = self.cpu
+        pc = cpu.pc
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.remainder(pc)
+        if block is not None:
+            return block(cpu, self.written, budget)
+        return self.interpret()
+
+    def remainder(self, address: int) -> Optional[Callable]:
+        """
+        Returns function executing the rest of valid block containing instruction at address, None if there is none
+
+        :param address: Address at which execution continues
+        """
+        blocks = self.blocks
+        for block_start in self.owners.get(address, ()):
+            if block_start in blocks and (address - block_start) % 2 == 0:
+                return self.program.remainder(address, self.ranges[block_start])
+        return None
+
+    def interpret(self) -> int:
+        """
+        Executes single instruction with the interpreter, blocks overwritten by the instruction are dropped
+
+        :return: Number of executed instructions
+        """
+        cpu = self.cpu
+        opcode = (cpu.memory[cpu.pc] << 8) | cpu.memory[cpu.pc + 1]
+        if opcode & 0xF0FF in WRITE_OPCODES:
+            address = cpu.i
+            cpu.execute_opcode()
+            self.written(address, 3 if opcode & 0x00FF == 0x33 else ((opcode & 0x0F00) >> 8) + 1)
+        elif opcode & 0xF00F == 0x5002:
+            # XO-CHIP register range store
+            address = cpu.i
+            cpu.execute_opcode()
+            self.written(address, abs(((opcode & 0x0F00) >> 8) - ((opcode & 0x00F0) >> 4)) + 1)
+        elif opcode & 0xF000 == 0x2000:
+            # Return address is pushed to memory, deep recursion can overwrite code
+            address = cpu.sp
+            cpu.execute_opcode()
+            self.written(address, 2)
+        else:
+            cpu.execute_opcode()
+        return 1
+
+    def run(self, cycles: int) -> int:
+        """
+        Executes given number of instructions, less if CPU stops running or halts
+
+        :param cycles: Number of instructions to execute
+        :return: Number of executed instructions
+        """
+        cpu = self.cpu
+        executed = 0
+        while executed < cycles and cpu.running and not cpu.halted:
+            executed += self.step(cycles - executed)
+        return executed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Translate CHIP-8 ROM into Python module')
+    parser.add_argument('rom', help='Path to ROM file containing CHIP-8 game or program')
+    parser.add_argument('-o', '--output', help='Path of generated module, if not given module is stored in cache')
+    args = parser.parse_args()
+
+    rom = Path(args.rom).read_bytes()
+    if args.output:
+        Path(args.output).write_text(translate_rom(rom))
+    else:
+        compile_rom(rom)
+        print(cache_path(rom))
+
+
+if __name__ == "__main__":
+    main()
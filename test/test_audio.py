@@ -0,0 +1,98 @@
+import time
+from unittest.mock import Mock
+
+import numpy as np
+import pygame
+import pytest
+
+from PyCHIP8.audio import NullBeeper, PygameBeeper, create_beeper
+from PyCHIP8.cpu import CPU, state_template
+from PyCHIP8.emulation_thread import EmulationThread
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.screen import HeadlessScreen
+
+
+@pytest.fixture
+def beeper():
+    beeper = NullBeeper()
+    beeper.start = Mock()
+    beeper.stop = Mock()
+    return beeper
+
+
+def test_update_should_start_beep_when_timer_becomes_non_zero(beeper):
+    beeper.update(5)
+
+    assert beeper.playing is True
+    beeper.start.assert_called_once()
+    beeper.stop.assert_not_called()
+
+
+def test_update_should_stop_beep_when_timer_reaches_zero(beeper):
+    beeper.update(1)
+    beeper.update(0)
+
+    assert beeper.playing is False
+    beeper.start.assert_called_once()
+    beeper.stop.assert_called_once()
+
+
+def test_update_should_act_only_on_transitions(beeper):
+    for timer in [0, 0, 3, 2, 1, 0, 0, 4, 3, 0]:
+        beeper.update(timer)
+
+    assert beeper.beeps == 2
+    assert beeper.start.call_count == 2
+    assert beeper.stop.call_count == 2
+
+
+def test_create_beeper_should_return_null_beeper_if_disabled():
+    assert type(create_beeper(enabled=False)) is NullBeeper
+
+
+def test_square_wave_should_consist_of_whole_periods():
+    beeper = NullBeeper()
+    beeper.sample_rate = 44100
+    beeper.channels = 1
+
+    wave = PygameBeeper.square_wave(beeper, 441, 0.5)
+
+    assert wave.dtype == np.int16
+    assert len(wave) % 100 == 0
+    assert np.array_equal(wave[:100], wave[100:200])
+    assert wave[0] == int(0.5 * 32767)
+    assert wave[99] == -int(0.5 * 32767)
+
+
+def test_pygame_beeper_should_play_and_stop(monkeypatch):
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    try:
+        beeper = PygameBeeper()
+    except pygame.error:
+        pytest.skip("Audio device not available")
+
+    beeper.update(2)
+    assert beeper.channel is not None
+    beeper.update(0)
+    assert beeper.channel is None
+    assert beeper.buffer_latency > 0
+
+    beeper.close()
+
+
+def test_stopped_emulation_thread_should_leave_beeper_ready_for_next_thread(beeper):
+    cpu = CPU(HeadlessScreen())
+    # Sound timer = 0x10, loop
+    template = state_template(bytes([0x60, 0x10, 0xF0, 0x18, 0x12, 0x04]))
+
+    for starts in (1, 2):
+        # ROM is reloaded like in a running emulator
+        cpu.reset_to(template)
+        thread = EmulationThread(cpu, FrameBuffer(cpu.screen.bitmap.shape), beeper, frame_rate=200)
+        thread.start()
+        while beeper.start.call_count < starts and thread.is_alive():
+            time.sleep(0.01)
+        thread.stop()
+
+        assert beeper.start.call_count == starts
+        assert beeper.playing is False
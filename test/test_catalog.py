@@ -0,0 +1,125 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from PyCHIP8.catalog import Catalog, analyse_rom, detect_platform, map_rom
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.screen import HeadlessScreen
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture
+def library(tmp_path):
+    (tmp_path / "games").mkdir()
+    # Enable extended screen and loop
+    (tmp_path / "games" / "schip.ch8").write_bytes(bytes([0x00, 0xFF, 0x12, 0x02]))
+    (tmp_path / "games" / "notes.txt").write_text("not a ROM")
+    return tmp_path
+
+
+@pytest.mark.parametrize("rom, platform", [
+    (bytes([0x60, 0x01, 0x12, 0x02]), "chip8"),
+    (bytes([0x00, 0xFF, 0x12, 0x02]), "schip"),
+    (bytes([0xD0, 0x10, 0x12, 0x02]), "schip"),
+    (bytes([0xF2, 0x01, 0x00, 0xFE]), "xochip"),
+    # 00FF after jump is data, it is never executed
+    (bytes([0x12, 0x00, 0x00, 0xFF]), "chip8"),
+    # Skip over F000 NNNN lands on 00FE
+    (bytes([0x30, 0x01, 0xF0, 0x00, 0x12, 0x34, 0x00, 0xFE]), "xochip"),
+])
+def test_detect_platform(rom, platform):
+    assert detect_platform(rom) == platform
+
+
+def test_bundled_roms_should_be_chip8():
+    assert [analyse_rom(ROMS / rom).platform for rom in ["IBM.ch8", "Sirpinski.ch8"]] == ["chip8", "chip8"]
+
+
+def test_known_rom_should_use_its_profile():
+    entry = analyse_rom(ROMS / "IBM.ch8")
+
+    assert entry.profile == "chip8"
+    assert entry.clock_speed == Config.PLATFORM_CLOCK_SPEEDS["chip8"]
+
+
+def test_scan_should_index_roms(library):
+    catalog = Catalog(library / "index.json")
+
+    entries = catalog.scan([library / "games"])
+    catalog.save()
+
+    assert [Path(entry.path).name for entry in entries] == ["schip.ch8"]
+    assert (entries[0].size, entries[0].platform, entries[0].profile) == (4, "schip", "schip")
+    assert Catalog(library / "index.json").entries == catalog.entries
+
+
+def test_unchanged_rom_should_not_be_analysed_again(library, monkeypatch):
+    catalog = Catalog(library / "index.json")
+    catalog.scan([library / "games"])
+    catalog.save()
+
+    reloaded = Catalog(library / "index.json")
+    monkeypatch.setattr("PyCHIP8.catalog.analyse_rom", None)
+    reloaded.scan([library / "games"])
+
+    assert not reloaded.changed
+
+
+def test_changed_rom_should_be_analysed_again(library):
+    catalog = Catalog(None)
+    rom_path = library / "games" / "schip.ch8"
+    catalog.scan([library / "games"])
+
+    rom_path.write_bytes(bytes([0x60, 0x01, 0x12, 0x02]))
+    stat = rom_path.stat()
+    os.utime(str(rom_path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    assert catalog.entry(rom_path).platform == "chip8"
+
+
+def test_entry_should_describe_loaded_contents(library):
+    catalog = Catalog(None)
+    rom_path = library / "games" / "schip.ch8"
+    catalog.scan([library / "games"])
+    # Same size and modification time, but different contents
+    stat = rom_path.stat()
+    rom_path.write_bytes(bytes([0x60, 0x01, 0x12, 0x02]))
+    os.utime(str(rom_path), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    with map_rom(rom_path) as rom:
+        entry = catalog.entry(rom_path, rom)
+        assert entry.sha1 == hashlib.sha1(rom).hexdigest()
+    assert entry.platform == "chip8"
+
+
+def test_removed_rom_should_be_dropped(library):
+    catalog = Catalog(None)
+    catalog.scan([library / "games"])
+
+    (library / "games" / "schip.ch8").unlink()
+
+    assert catalog.scan([library / "games"]) == []
+    assert catalog.entries == {}
+
+
+def test_damaged_index_should_be_replaced(library):
+    (library / "index.json").write_text("{")
+
+    assert Catalog(library / "index.json").entries == {}
+
+
+def test_mapped_rom_should_be_loaded_into_memory(library):
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    (library / "empty.ch8").write_bytes(b"")
+
+    with map_rom(library / "games" / "schip.ch8") as rom:
+        cpu.load_rom_data(rom)
+    with map_rom(library / "empty.ch8") as rom:
+        assert len(rom) == 0
+
+    assert bytes(cpu.memory[0x200:0x204]) == bytes([0x00, 0xFF, 0x12, 0x02])
@@ -0,0 +1,92 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8.control import ControlClient, ControlError, ControlServer
+from PyCHIP8.cpu import CPU
+from PyCHIP8.headless import create_headless_cpu, emulate_frame
+from PyCHIP8.screen import HeadlessScreen
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def client(request, tmp_path):
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    address = "127.0.0.1:0" if request.param == "tcp" else "unix:" + str(tmp_path / "control.sock")
+    server = ControlServer(cpu, address)
+    thread = threading.Thread(target=server.serve, kwargs={"timeout": 0.05})
+    thread.start()
+
+    if request.param == "tcp":
+        address = "127.0.0.1:{}".format(server.address[1])
+    client = ControlClient(address)
+    client.load_rom((ROMS / "IBM.ch8").read_bytes())
+    yield client
+    client.close()
+    server.stop()
+    thread.join()
+
+
+def test_frames_should_match_local_emulation(client):
+    reference = create_headless_cpu(ROMS / "IBM.ch8")
+    for _ in range(20):
+        emulate_frame(reference)
+
+    assert client.run_frames(20) == 20 * 8
+    assert np.array_equal(client.read_frame(), reference.screen.bitmap)
+    assert client.read_memory(0, 0x1000) == bytes(reference.memory[:0x1000])
+    registers = client.read_registers()
+    assert (registers["pc"], registers["i"], registers["v"]) == (reference.pc, reference.i, bytes(reference.v))
+    assert registers["running"] and not registers["halted"]
+
+
+def test_run_cycles_should_not_decrement_timers(client):
+    # Set delay timer to 10
+    client.write_memory(0x200, bytes([0x60, 0x0A, 0xF0, 0x15, 0x12, 0x04]))
+
+    assert client.run_cycles(10) == 10
+    assert client.read_registers()["timer_dt"] == 10
+    client.run_frames(3)
+    assert client.read_registers()["timer_dt"] == 7
+
+
+def test_batch_should_be_answered_in_order(client):
+    with client.batch() as batch:
+        batch.set_keys(0x0020)
+        batch.run_frames(2)
+        batch.read_memory(0x200, 2)
+        batch.read_frame()
+
+    assert batch.results[:3] == [None, 16, bytes([0x00, 0xE0])]
+    assert batch.results[3].shape == (64, 32)
+
+
+def test_failed_command_should_not_stop_batch(client):
+    batch = client.batch()
+    batch.read_memory(0xFFFF, 2)
+    batch.run_frames(1)
+
+    with pytest.raises(ControlError, match="outside of memory"):
+        batch.execute()
+    assert client.read_registers()["pc"] != 0x200
+
+
+def test_restored_state_should_continue_identically(client):
+    client.run_frames(5)
+    state = client.save_state()
+    client.run_frames(10)
+    expected = client.read_frame().copy(), client.read_registers()
+
+    client.load_rom(bytes([0x00, 0xFF, 0x12, 0x02]))
+    client.run_frames(1)
+    client.restore_state(state)
+    client.run_frames(10)
+
+    assert np.array_equal(client.read_frame(), expected[0])
+    assert client.read_registers() == expected[1]
+    with pytest.raises(ControlError):
+        client.restore_state(state[:-1])
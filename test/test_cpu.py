@@ -5,7 +5,10 @@ from unittest.mock import Mock
 import pytest
 
 from PyCHIP8.conf import Config, Constants
-from PyCHIP8.cpu import CPU
+from PyCHIP8.cpu import CPU, LARGE_FONT_ADDRESS, LARGE_FONTSET, state_template
+from PyCHIP8.headless import emulate_frame
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledRunner, compile_rom
 
 
 @pytest.fixture
@@ -44,9 +47,98 @@ def test_reset(cpu, fontset_bytearray):
     assert cpu.timer_dt == 0
     assert cpu.timer_st == 0
 
-    fontset_size = len(fontset_bytearray)
-    assert cpu.memory[fontset_size:] == bytearray(Config.MAX_MEMORY - fontset_size)
-    assert cpu.memory[:fontset_size] == fontset_bytearray
+    fonts_end = LARGE_FONT_ADDRESS + len(LARGE_FONTSET)
+    assert cpu.memory[fonts_end:] == bytearray(Config.MAX_MEMORY - fonts_end)
+    assert cpu.memory[:len(fontset_bytearray)] == fontset_bytearray
+    assert cpu.memory[LARGE_FONT_ADDRESS:fonts_end] == LARGE_FONTSET
+
+
+def test_snapshot_and_restore(cpu):
+    cpu.reset()
+    cpu.pc = 0x300
+    cpu.i = 0x123
+    cpu.timer_st = 7
+    cpu.v[3] = 0x42
+    cpu.memory[0x400] = 0xAB
+    snapshot = cpu.snapshot()
+
+    cpu.reset()
+    cpu.restore(snapshot)
+
+    assert cpu.pc == 0x300
+    assert cpu.i == 0x123
+    assert cpu.timer_st == 7
+    assert cpu.v[3] == 0x42
+    assert cpu.memory[0x400] == 0xAB
+
+
+def test_clone_should_be_independent(cpu):
+    cpu.reset()
+    cpu.v[0] = 1
+    cpu.mode = Constants.EXTENDED_MODE
+
+    clone = cpu.clone(Mock())
+    clone.v[0] = 2
+    clone.pc = 0x400
+
+    assert clone.mode == Constants.EXTENDED_MODE
+    assert cpu.v[0] == 1
+    assert cpu.pc == Config.PROGRAM_COUNTER
+    assert clone.snapshot() != cpu.snapshot()
+
+
+def test_clone_should_copy_screen_and_keypad():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.screen.bitmap[3, 4] = 1
+    cpu.keypad.press(5)
+
+    clone = cpu.clone()
+    clone.screen.bitmap[3, 4] = 0
+    clone.keypad.release(5)
+
+    assert isinstance(clone.screen, HeadlessScreen)
+    assert cpu.screen.bitmap[3, 4] == 1
+    assert cpu.keypad.is_pressed(5)
+
+
+def test_reset_to_template(fontset_bytearray):
+    cpu = CPU(HeadlessScreen())
+    template = state_template(bytes([0x12, 0x00]))
+    cpu.pc = 0x300
+    cpu.screen.bitmap[0, 0] = 1
+    cpu.exit()
+
+    cpu.reset_to(template)
+
+    assert cpu.running
+    assert cpu.pc == Config.PROGRAM_COUNTER
+    assert cpu.sp == Config.STACK_POINTER
+    assert cpu.memory[:len(fontset_bytearray)] == fontset_bytearray
+    assert cpu.memory[0x200:0x202] == bytes([0x12, 0x00])
+    assert not cpu.screen.bitmap.any()
+
+    reset_cpu = CPU(HeadlessScreen())
+    reset_cpu.reset()
+    assert reset_cpu.snapshot() == state_template()
+
+
+def test_state_template_should_reject_too_big_rom():
+    with pytest.raises(ValueError):
+        state_template(bytes(Config.MAX_MEMORY))
+
+
+def test_state_should_be_stored_in_single_buffer(cpu):
+    cpu.pc = 0x234
+    cpu.v[5] = 0x55
+    cpu.memory[0x200] = 0x66
+
+    assert not hasattr(cpu, "__dict__")
+    assert cpu.v.obj is cpu.state
+    assert cpu.memory.obj is cpu.state
+    assert cpu.registers.obj is cpu.state
+    assert cpu.state.count(0x55) == 1
+    assert cpu.state.count(0x66) == 1
 
 
 def test_decrement_values_in_timers_should_decrement_value_if_non_zero(cpu):
@@ -87,9 +179,10 @@ def test_rom_load(cpu):
 def test_load_fontset(cpu, fontset_bytearray):
     cpu.load_fontset()
 
-    fontset_size = len(fontset_bytearray)
-    assert cpu.memory[fontset_size:] == bytearray(Config.MAX_MEMORY - fontset_size)
-    assert cpu.memory[:fontset_size] == fontset_bytearray
+    fonts_end = LARGE_FONT_ADDRESS + len(LARGE_FONTSET)
+    assert cpu.memory[fonts_end:] == bytearray(Config.MAX_MEMORY - fonts_end)
+    assert cpu.memory[:len(fontset_bytearray)] == fontset_bytearray
+    assert cpu.memory[LARGE_FONT_ADDRESS:fonts_end] == LARGE_FONTSET
 
 
 def test_screen_scroll_up(cpu):
@@ -99,7 +192,7 @@ def test_screen_scroll_up(cpu):
     num = 5
     cpu.screen_scroll_up(num)
 
-    cpu.screen.scroll_up.assert_called_with(num)
+    cpu.screen.scroll_up.assert_called_with(num, cpu.planes)
 
 
 def test_screen_scroll_down(cpu):
@@ -109,7 +202,7 @@ def test_screen_scroll_down(cpu):
     num = 5
     cpu.screen_scroll_down(num)
 
-    cpu.screen.scroll_down.assert_called_with(num)
+    cpu.screen.scroll_down.assert_called_with(num, cpu.planes)
 
 
 def test_clear_screen(cpu):
@@ -475,89 +568,145 @@ def test_generate_random_number(cpu):
 
 
 def test_skip_if_key_is_pressed_should_skip_if_key_is_pressed(cpu):
-    possible_keys = Config.KEY_MAPPING.values()
-    # pygame stores key pressed in array containing boolean values, there are 323 possible keys
-    pressed_keys = [False] * 323
-    for key in possible_keys:
-        pressed_keys[key] = True
+    cpu.keypad.mask = 0xFFFF
 
-    def get_pressed():
-        return pressed_keys
-
-    possible_keys = Config.KEY_MAPPING.keys()
     for x in range(0xF):
-        for key in possible_keys:
-            with mock.patch('PyCHIP8.cpu.key.get_pressed', get_pressed):
-                cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
-                cpu.v[x] = key
-                cpu.pc = 0
+        for key in range(Config.NUMBER_OF_KEYS):
+            cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
+            cpu.v[x] = key
+            cpu.pc = 0
 
-                cpu.skip_if_key_is_pressed()
+            cpu.skip_if_key_is_pressed()
 
-                assert cpu.pc == 2
+            assert cpu.pc == 2
 
 
 def test_skip_if_key_is_pressed_should_not_skip_if_key_is_not_pressed(cpu):
-    # pygame stores key pressed in array containing boolean values, there are 323 possible keys
-    pressed_keys = [False] * 323
+    cpu.keypad.mask = 0
 
-    def get_pressed():
-        return pressed_keys
-
-    possible_keys = Config.KEY_MAPPING.keys()
     for x in range(0xF):
-        for key in possible_keys:
-            with mock.patch('PyCHIP8.cpu.key.get_pressed', get_pressed):
-                cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
-                cpu.v[x] = key
-                cpu.pc = 0
+        for key in range(Config.NUMBER_OF_KEYS):
+            cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
+            cpu.v[x] = key
+            cpu.pc = 0
 
-                cpu.skip_if_key_is_pressed()
+            cpu.skip_if_key_is_pressed()
 
-                assert cpu.pc == 0
+            assert cpu.pc == 0
 
 
 def test_skip_if_key_is_not_pressed_should_skip_if_key_is_not_pressed(cpu):
-    # pygame stores key pressed in array containing boolean values, there are 323 possible keys
-    pressed_keys = [False] * 323
+    cpu.keypad.mask = 0
 
-    def get_pressed():
-        return pressed_keys
-
-    possible_keys = Config.KEY_MAPPING.keys()
     for x in range(0xF):
-        for key in possible_keys:
-            with mock.patch('PyCHIP8.cpu.key.get_pressed', get_pressed):
-                cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
-                cpu.v[x] = key
-                cpu.pc = 0
+        for key in range(Config.NUMBER_OF_KEYS):
+            cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
+            cpu.v[x] = key
+            cpu.pc = 0
 
-                cpu.skip_if_key_is_not_pressed()
+            cpu.skip_if_key_is_not_pressed()
 
-                assert cpu.pc == 2
+            assert cpu.pc == 2
 
 
 def test_skip_if_key_is_not_pressed_should_not_skip_if_key_is_pressed(cpu):
-    possible_keys = Config.KEY_MAPPING.values()
-    # pygame stores key pressed in array containing boolean values, there are 323 possible keys
-    pressed_keys = [False] * 323
-    for key in possible_keys:
-        pressed_keys[key] = True
+    cpu.keypad.mask = 0xFFFF
 
-    def get_pressed():
-        return pressed_keys
-
-    possible_keys = Config.KEY_MAPPING.keys()
     for x in range(0xF):
-        for key in possible_keys:
-            with mock.patch('PyCHIP8.cpu.key.get_pressed', get_pressed):
-                cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
-                cpu.v[x] = key
-                cpu.pc = 0
+        for key in range(Config.NUMBER_OF_KEYS):
+            cpu.opcode = 0xE << 12 | (x << 8) | 0x9E
+            cpu.v[x] = key
+            cpu.pc = 0
+
+            cpu.skip_if_key_is_not_pressed()
+
+            assert cpu.pc == 0
+
+
+def test_skip_if_key_is_pressed_should_check_only_key_in_vx(cpu):
+    for key in range(Config.NUMBER_OF_KEYS):
+        cpu.keypad.mask = 0xFFFF ^ (1 << key)
+        cpu.opcode = 0xE << 12 | (1 << 8) | 0x9E
+        cpu.v[1] = key
+        cpu.pc = 0
+
+        cpu.skip_if_key_is_pressed()
+
+        assert cpu.pc == 0
+
+
+def test_wait_for_keypress_should_store_pressed_key(cpu):
+    cpu.keypad.press(0xA)
+    cpu.opcode = (0xF << 12) | (3 << 8) | 0x0A
+    cpu.pc = 2
+
+    cpu.wait_for_keypress()
+
+    assert cpu.v[3] == 0xA
+    assert cpu.pc == 2
+
+
+def test_wait_for_keypress_should_repeat_instruction_if_no_key_is_pressed(cpu):
+    cpu.opcode = (0xF << 12) | (3 << 8) | 0x0A
+    cpu.pc = 2
+
+    cpu.wait_for_keypress()
+
+    assert cpu.pc == 0
+    assert cpu.halted
+
+
+def test_wake_should_end_halted_state_when_key_is_pressed(cpu):
+    cpu.halted = True
+
+    assert not cpu.wake()
+    cpu.keypad.press(0x3)
+    assert cpu.wake()
+    assert not cpu.halted
+
+
+@pytest.mark.parametrize("compiled", [True, False], ids=["compiled", "interpreted"])
+def test_halted_cpu_should_skip_frames_until_key_is_pressed(compiled):
+    # V0 = 1, wait for key in V1, then loop
+    rom = bytes([0x60, 0x01, 0xF1, 0x0A, 0x12, 0x04])
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.memory[0x200:0x200 + len(rom)] = rom
+    runner = CompiledRunner(cpu, compile_rom(rom, cache_dir=None)) if compiled else None
+    cpu.timer_dt = 5
+
+    assert emulate_frame(cpu, 8, runner) == 2
+    assert cpu.halted
+    assert emulate_frame(cpu, 8, runner) == 0
+    assert cpu.timer_dt == 3
+
+    cpu.keypad.press(0x7)
+    assert emulate_frame(cpu, 8, runner) >= 8
+    assert not cpu.halted
+    assert cpu.v[1] == 0x7
+
+
+@pytest.mark.parametrize("compiled", [True, False], ids=["compiled", "interpreted"])
+def test_held_key_should_satisfy_only_one_wait(compiled):
+    # Wait for key in V1, wait for key in V2, then loop
+    rom = bytes([0xF1, 0x0A, 0xF2, 0x0A, 0x12, 0x04])
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.memory[0x200:0x200 + len(rom)] = rom
+    runner = CompiledRunner(cpu, compile_rom(rom, cache_dir=None)) if compiled else None
 
-                cpu.skip_if_key_is_not_pressed()
+    cpu.keypad.press(0x7)
+    emulate_frame(cpu, 8, runner)
+    assert cpu.halted
+    assert (cpu.v[1], cpu.pc) == (0x7, 0x202)
 
-                assert cpu.pc == 0
+    emulate_frame(cpu, 8, runner)
+    assert cpu.halted
+    cpu.keypad.release(0x7)
+    cpu.keypad.press(0x7)
+    emulate_frame(cpu, 8, runner)
+    assert not cpu.halted
+    assert cpu.v[2] == 0x7
 
 
 def test_move_delay_to_register(cpu):
@@ -617,7 +766,7 @@ def test_move_extended_sprite_address_to_index(cpu):
             cpu.opcode = (0xF << 12) | (x << 8) | 0x30
 
             cpu.move_extended_sprite_address_to_index()
-            assert cpu.i == value * 10
+            assert cpu.i == LARGE_FONT_ADDRESS + (value & 0xF) * 10
 
 
 def test_store_bcd_in_memory(cpu):
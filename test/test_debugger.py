@@ -0,0 +1,136 @@
+import io
+
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.debugger import Condition, Debugger, DebuggerShell, memory_accesses
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledRunner, compile_rom
+
+# 0x200: V0 += 1, call 0x208, jump 0x200, padding
+# 0x208: I = 0x300, store V0 at I, V1 += 1, return
+PROGRAM = bytes([0x70, 0x01, 0x22, 0x08, 0x12, 0x00, 0x00, 0x00,
+                 0xA3, 0x00, 0xF0, 0x55, 0x71, 0x01, 0x00, 0xEE])
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.memory[0x200:0x200 + len(PROGRAM)] = PROGRAM
+    return cpu
+
+
+@pytest.fixture
+def debugger(cpu):
+    return Debugger(cpu)
+
+
+def test_run_implementation_should_follow_debugger_state(debugger):
+    assert debugger.run_implementation == debugger.run_fast
+
+    debugger.add_breakpoint(0x204)
+    assert debugger.run_implementation == debugger.run_checked
+
+    debugger.remove_breakpoint(0x204)
+    assert debugger.run_implementation == debugger.run_fast
+
+    debugger.pause()
+    assert debugger.run_implementation == debugger.run_paused
+    assert debugger.run(10) == 0
+
+
+def test_breakpoint(debugger, cpu):
+    debugger.add_breakpoint(0x20C)
+
+    assert debugger.run(100) == 4
+    assert cpu.pc == 0x20C
+    assert debugger.reason == "breakpoint 0x20c"
+
+    debugger.resume()
+    assert debugger.run(100) == 7
+    assert cpu.pc == 0x20C
+    assert cpu.v[0] == 2
+
+
+def test_write_watchpoint(debugger, cpu):
+    debugger.add_watchpoint(0x300)
+
+    debugger.run(100)
+
+    assert cpu.pc == 0x20A
+    assert debugger.reason.startswith("write of 0x300")
+
+
+def test_condition(debugger, cpu):
+    debugger.add_condition(Condition("v1", "==", 3))
+
+    debugger.run(100)
+
+    assert cpu.v[1] == 3
+    assert cpu.pc == 0x20E
+
+    debugger.clear()
+    debugger.add_condition(Condition("i", "changed"))
+    debugger.resume()
+    debugger.run(100)
+    # I is set to the same value every time, so it changes only once
+    assert debugger.paused is False
+
+
+def test_step_over_and_out(debugger, cpu):
+    debugger.pause()
+    debugger.step()
+    assert cpu.pc == 0x202
+
+    debugger.step_over()
+    debugger.run(100)
+    assert cpu.pc == 0x204
+    assert cpu.v[1] == 1
+    assert debugger.paused
+
+    debugger.step(4)
+    assert cpu.pc == 0x20A
+    assert debugger.call_stack() == [0x204]
+
+    debugger.step_out()
+    debugger.run(100)
+    assert cpu.pc == 0x204
+    assert debugger.call_stack() == []
+
+
+def test_watchpoint_with_compiled_runner(cpu):
+    runner = CompiledRunner(cpu, compile_rom(PROGRAM, cache_dir=None))
+    debugger = Debugger(cpu, runner)
+    debugger.add_watchpoint(0x208, 2)
+    cpu.i = 0x208
+    cpu.memory[0x200:0x202] = bytes([0xF0, 0x55])
+
+    debugger.run(100)
+
+    assert debugger.reason.startswith("write of 0x208")
+
+
+def test_memory_accesses(cpu):
+    cpu.i = 0x300
+
+    assert memory_accesses(cpu, 0xF265) == (range(0x300, 0x303), range(0))
+    assert memory_accesses(cpu, 0xD125) == (range(0x300, 0x305), range(0))
+    assert memory_accesses(cpu, 0x2400) == (range(0), range(cpu.sp, cpu.sp + 2))
+
+
+def test_shell(debugger, cpu):
+    debugger.pause()
+    output = io.StringIO()
+    shell = DebuggerShell(debugger, io.StringIO("break 0x20c\ninfo\nstep 2\nregs\nstack\nbreak nowhere\n"), output)
+
+    shell.cmdloop()
+
+    assert "Breakpoints: 0x20c" in output.getvalue()
+    assert "0x208: a300" in output.getvalue()
+    assert "v0=01" in output.getvalue()
+    assert "0x204" in output.getvalue()
+    assert "Error" in output.getvalue()
+    # End of input quits shell, which removes breakpoints and resumes execution
+    assert not debugger.breakpoints
+    assert not debugger.paused
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.differential import LockstepExecutor, campaign, check_random_rom, check_rom
+from PyCHIP8.screen import HeadlessScreen
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    # V3 += 1, draw 0 at (V3, V3), jump back to start
+    cpu.memory[0x200:0x206] = bytes([0x73, 0x01, 0xD3, 0x35, 0x12, 0x00])
+    return cpu
+
+
+@pytest.mark.parametrize("rom", ["IBM.ch8", "Sirpinski.ch8"])
+def test_compiled_engine_should_match_reference(rom):
+    assert check_rom(ROMS / rom, "compiled", instructions=20000) is None
+
+
+def test_lockstep_executor_should_report_first_divergence(cpu):
+    def faulty_step():
+        cpu.execute_opcode()
+        if cpu.opcode == 0xD335 and cpu.v[3] == 4:
+            cpu.v[5] = 1
+        return 1
+
+    divergence = LockstepExecutor(cpu, faulty_step).run(1000)
+
+    assert divergence.location == "v[5]"
+    assert (divergence.engine, divergence.reference) == (1, 0)
+    assert divergence.instructions == 11
+    assert divergence.trace[-2:] == ["0x200: 7301", "0x202: d335"]
+
+
+def test_lockstep_executor_should_compare_screens(cpu):
+    def faulty_step():
+        cpu.execute_opcode()
+        cpu.screen.bitmap[63, 31] = 1
+        return 1
+
+    divergence = LockstepExecutor(cpu, faulty_step).run(1000)
+
+    assert divergence.location == "screen[63, 31]"
+    assert divergence.instructions == 1
+
+
+def test_deep_recursion_overwriting_code_should_not_diverge():
+    # Random ROM in which stack grows into program memory and overwrites compiled code
+    assert check_random_rom((1, "compiled", 2000)) == (1, None)
+
+
+def test_campaign():
+    assert campaign(8, "compiled", instructions=500, jobs=2) == []
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8.environment import Environment
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture(params=[True, False], ids=["compiled", "interpreted"])
+def environment(request):
+    return Environment(ROMS / "Sirpinski.ch8", compiled=request.param, cache_dir=None)
+
+
+def test_observation_should_be_read_only_view_of_bitmap(environment):
+    observation = environment.reset()
+
+    bitmap = environment.cpu.screen.bitmap
+    assert observation.shape == bitmap.shape
+    assert np.shares_memory(observation, bitmap)
+    assert not observation.flags.writeable
+    with pytest.raises(ValueError):
+        observation[0, 0] = 1
+
+    observation, _, _, _ = environment.step(0)
+    assert observation is environment.reset()
+
+
+def test_reset_should_restore_snapshot(environment):
+    environment.reset(seed=1)
+    for _ in range(30):
+        environment.step(0)
+    first_run = environment.observation().copy()
+    assert first_run.any()
+
+    assert not environment.reset(seed=1).any()
+    assert environment.cpu.pc == 0x200
+    for _ in range(30):
+        environment.step(0)
+
+    assert (environment.observation() == first_run).all()
+
+
+def test_step_should_hold_keys_and_compute_reward():
+    environment = Environment(ROMS / "IBM.ch8", reward=lambda memory: memory[0x300], frame_skip=2, max_frames=4,
+                              cache_dir=None)
+    environment.reset()
+    environment.cpu.memory[0x300] = 7
+
+    _, reward, done, info = environment.step(0b1000000000000010)
+
+    assert environment.cpu.keypad.is_pressed(1) and environment.cpu.keypad.is_pressed(15)
+    assert (reward, done, info["frames"]) == (7, False, 2)
+    assert environment.step(0)[2]
+
+
+def test_done_function():
+    environment = Environment(ROMS / "IBM.ch8", done=lambda memory: memory[0x300] == 1, cache_dir=None)
+    environment.reset()
+
+    assert not environment.step(0)[2]
+    environment.cpu.memory[0x300] = 1
+    assert environment.step(0)[2]
+
+
+def test_step_should_report_halted_program(tmp_path):
+    # Wait for key in V0, then loop
+    rom_path = tmp_path / "wait.ch8"
+    rom_path.write_bytes(bytes([0xF0, 0x0A, 0x12, 0x02]))
+    environment = Environment(rom_path, cache_dir=None)
+    environment.reset()
+
+    assert environment.step(0)[3]["halted"]
+    assert not environment.step(1 << 4)[3]["halted"]
+    assert environment.cpu.v[0] == 0x4
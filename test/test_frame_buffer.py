@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from PyCHIP8.conf import Config
+from PyCHIP8.frame_buffer import FrameBuffer
+
+SHAPE = (Config.SCREEN_WIDTH_NORMAL, Config.SCREEN_HEIGHT_NORMAL)
+
+
+@pytest.fixture
+def frames():
+    return FrameBuffer(SHAPE)
+
+
+def test_acquire_should_return_none_if_nothing_was_published(frames):
+    assert frames.acquire() is None
+    assert frames.frames_consumed == 0
+
+
+def test_publish_should_hand_over_the_same_array_without_copying(frames):
+    bitmap = frames.back
+    bitmap[1, 2] = 1
+
+    new_back = frames.publish(bitmap)
+    frame = frames.acquire()
+
+    assert frame is bitmap
+    assert new_back is not bitmap
+    assert frame is not new_back
+
+
+def test_publish_should_bring_new_back_buffer_up_to_date(frames):
+    bitmap = frames.back
+    bitmap[3, 4] = 1
+
+    new_back = frames.publish(bitmap)
+
+    assert np.array_equal(new_back, bitmap)
+
+
+def test_acquire_should_return_none_if_frame_was_already_acquired(frames):
+    frames.publish(frames.back)
+
+    assert frames.acquire() is not None
+    assert frames.acquire() is None
+
+
+def test_acquire_should_return_newest_frame(frames):
+    bitmap = frames.back
+    for value in range(3):
+        bitmap[0, 0] = value
+        bitmap = frames.publish(bitmap)
+
+    frame = frames.acquire()
+
+    assert frame[0, 0] == 2
+
+
+def test_counters(frames):
+    bitmap = frames.back
+    for _ in range(5):
+        bitmap = frames.publish(bitmap)
+    frames.acquire()
+    bitmap = frames.publish(bitmap)
+    frames.acquire()
+
+    assert frames.frames_produced == 6
+    assert frames.frames_consumed == 2
+    assert frames.frames_dropped == 4
+
+
+def test_publish_should_adopt_bitmap_with_different_shape(frames):
+    extended = np.zeros((Config.SCREEN_WIDTH_EXTENDED, Config.SCREEN_HEIGHT_EXTENDED), dtype="int8")
+    extended[100, 50] = 1
+
+    new_back = frames.publish(extended)
+
+    assert new_back.shape == extended.shape
+    assert np.array_equal(new_back, extended)
+    assert frames.acquire() is extended
@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8.golden import (ascii_diff, check_case, check_manifest, decode_frame, encode_frame, save_png_diff,
+                             update_case)
+
+GOLDEN_MANIFEST = Path(__file__).parent / "golden.json"
+
+# Waits for key, draws its digit and loops forever
+KEY_ROM = bytes([0xF0, 0x0A, 0xF0, 0x29, 0xD1, 0x15, 0x12, 0x06])
+
+
+@pytest.fixture
+def key_case(tmp_path):
+    (tmp_path / "key.ch8").write_bytes(KEY_ROM)
+    return {"name": "key", "rom": "key.ch8", "inputs": {"5": 1 << 7}, "checkpoints": [4, 6]}
+
+
+def test_golden_frames():
+    assert check_manifest(GOLDEN_MANIFEST) == []
+
+
+def test_check_case_should_follow_scripted_inputs(key_case, tmp_path):
+    update_case(key_case, tmp_path)
+
+    assert not decode_frame(key_case["golden"]["4"]["frame"]).any()
+    # Digit 7 drawn at (0, 0)
+    assert decode_frame(key_case["golden"]["6"]["frame"])[:4, 0].all()
+    assert check_case(key_case, tmp_path) == []
+
+
+def test_check_case_should_dump_diff_on_mismatch(key_case, tmp_path):
+    update_case(key_case, tmp_path)
+    key_case["inputs"] = {"5": 1 << 1}
+
+    mismatches = check_case(key_case, tmp_path, tmp_path / "diff")
+
+    assert [mismatch.frame for mismatch in mismatches] == [6]
+    diff = (tmp_path / "diff" / "key_6.txt").read_text().splitlines()
+    assert len(diff) == 32
+    # Top line of 7 is expected, digit 1 has only its third pixel set in its top line
+    assert diff[0].startswith("--#-.")
+
+
+def test_frame_encoding_round_trip():
+    bitmap = np.zeros((64, 32), dtype="int8")
+    bitmap[5, 7] = 1
+    bitmap[6, 7] = 2
+    bitmap[7, 7] = 3
+
+    frame = encode_frame(bitmap)
+
+    assert np.array_equal(decode_frame(json.loads(json.dumps(frame))), bitmap)
+
+
+def test_ascii_diff():
+    expected = np.array([[1, 0], [1, 0]], dtype="int8")
+    actual = np.array([[1, 1], [0, 0]], dtype="int8")
+
+    assert ascii_diff(expected, actual) == "#-\n+.\n"
+
+
+def test_ascii_diff_with_planes():
+    expected = np.array([[3, 2], [2, 0]], dtype="int8")
+    actual = np.array([[3, 1], [0, 2]], dtype="int8")
+
+    assert ascii_diff(expected, actual) == "#-\nx+\n"
+
+
+def test_png_diff_with_planes(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    expected = np.array([[3, 2], [2, 0]], dtype="int8")
+    actual = np.array([[3, 1], [0, 2]], dtype="int8")
+
+    save_png_diff(tmp_path / "diff.png", expected, actual, scale=1)
+
+    pixels = np.asarray(image.open(tmp_path / "diff.png"))
+    assert pixels[0, 0].tolist() == [255, 255, 255]
+    assert pixels[1, 0].tolist() == [255, 255, 0]
+    assert pixels[0, 1].tolist() == [255, 0, 0]
+    assert pixels[1, 1].tolist() == [0, 255, 0]
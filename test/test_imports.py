@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+import pytest
+
+# Heavy dependencies which should not be loaded when only emulator core is imported
+HEAVY_MODULES = ["pygame", "numpy"]
+
+CORE_MODULES = ["PyCHIP8.conf", "PyCHIP8.cpu", "PyCHIP8.keypad", "PyCHIP8.screen", "PyCHIP8.transpiler"]
+
+
+def import_time(modules):
+    """
+    Imports modules in a new interpreter started with -X importtime
+
+    :return: Dictionary mapping names of imported modules to their cumulative import time in microseconds and total
+             time of importing PyCHIP8 modules in microseconds
+    """
+    code = "import " + ", ".join(modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+        # Nested imports are indented, their time is already included in the time of top level import
+        if name.startswith(" PyCHIP8"):
+            total += int(cumulative)
+    return times, total
+
+
+@pytest.mark.parametrize("module", CORE_MODULES)
+def test_core_module_should_not_import_heavy_dependencies(module):
+    times, _ = import_time([module])
+
+    assert module in times
+    for heavy_module in HEAVY_MODULES:
+        assert heavy_module not in times
+
+
+def test_core_import_time():
+    _, total = import_time(CORE_MODULES)
+
+    # Generous limit, it only catches heavy imports sneaking back into the core
+    assert total < 500000
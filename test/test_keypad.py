@@ -0,0 +1,76 @@
+import pygame
+import pytest
+
+from PyCHIP8.conf import Config
+from PyCHIP8.keyboard import PygameKeypad, resolve_key_mapping
+from PyCHIP8.keypad import Keypad
+
+
+@pytest.fixture
+def keypad():
+    return Keypad()
+
+
+def test_mask(keypad):
+    keypad.mask = 0b1000000000000101
+
+    assert keypad.is_pressed(0x0)
+    assert not keypad.is_pressed(0x1)
+    assert keypad.is_pressed(0x2)
+    assert keypad.is_pressed(0xF)
+    assert keypad.mask == 0b1000000000000101
+
+
+def test_wait_for_key_should_take_last_press_once(keypad):
+    assert keypad.wait_for_key() is None
+
+    keypad.press(0x5)
+    keypad.press(0xC)
+
+    assert keypad.wait_for_key() == 0xC
+    assert keypad.wait_for_key() is None
+    keypad.press(0xC)
+    assert keypad.wait_for_key() is None
+
+
+def test_released_key_should_not_be_waited_for(keypad):
+    keypad.press(0x3)
+    keypad.release(0x3)
+
+    assert keypad.wait_for_key() is None
+
+
+def test_mask_should_latch_lowest_new_key(keypad):
+    keypad.mask = 0b0100
+    keypad.wait_for_key()
+
+    keypad.mask = 0b1110_0100
+
+    assert keypad.wait_for_key() == 0x5
+
+
+def test_resolve_key_mapping():
+    key_codes = resolve_key_mapping(Config.KEY_MAPPING)
+
+    assert key_codes[pygame.K_1] == 0x0
+    assert key_codes[pygame.K_q] == 0x4
+    assert key_codes[pygame.K_v] == 0xF
+    assert len(key_codes) == Config.NUMBER_OF_KEYS
+
+
+def test_resolve_key_mapping_should_reject_unknown_keys():
+    with pytest.raises(ValueError):
+        resolve_key_mapping({0x0: "not a key"})
+
+
+def test_handle_event_should_update_key_state():
+    keypad = PygameKeypad()
+
+    assert keypad.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_w)) == 0x5
+    assert keypad.is_pressed(0x5)
+
+    assert keypad.handle_event(pygame.event.Event(pygame.KEYUP, key=pygame.K_w)) is None
+    assert not keypad.is_pressed(0x5)
+
+    assert keypad.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p)) is None
+    assert keypad.mask == 0
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.differential import campaign, check_rom
+from PyCHIP8.predecoder import PredecodedRunner
+from PyCHIP8.screen import HeadlessScreen
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    return cpu
+
+
+def load(cpu: CPU, program: bytes, address: int = 0x200) -> PredecodedRunner:
+    cpu.memory[address:address + len(program)] = program
+    return PredecodedRunner(cpu)
+
+
+def test_register_pair_should_be_executed_as_one_step(cpu):
+    runner = load(cpu, bytes([0x61, 0x0A, 0x62, 0x0B]))
+
+    assert runner.step() == 2
+    assert (cpu.v[1], cpu.v[2], cpu.pc) == (0x0A, 0x0B, 0x204)
+
+
+def test_load_index_and_draw_should_be_executed_as_one_step(cpu):
+    runner = load(cpu, bytes([0xA0, 0x00, 0xD0, 0x05]))
+
+    assert runner.step() == 2
+    assert (cpu.i, cpu.pc) == (0x000, 0x204)
+    assert cpu.screen.bitmap[:4, 0].all()
+
+
+def test_counted_loop_should_run_until_limit(cpu):
+    # V1 += 1, skip jump when V1 == 3, jump back to start
+    runner = load(cpu, bytes([0x71, 0x01, 0x31, 0x03, 0x12, 0x00]))
+
+    assert [runner.step() for _ in range(3)] == [3, 3, 2]
+    assert (cpu.v[1], cpu.pc) == (3, 0x206)
+
+
+def test_delay_timer_wait_should_run_until_timer_expires(cpu):
+    # V1 = DT, skip jump when V1 == 0, jump back to start
+    runner = load(cpu, bytes([0xF1, 0x07, 0x31, 0x00, 0x12, 0x00]))
+    cpu.timer_dt = 1
+
+    assert runner.step() == 3
+    assert cpu.pc == 0x200
+    cpu.decrement_values_in_timers()
+    assert runner.step() == 2
+    assert (cpu.v[1], cpu.pc) == (0, 0x206)
+
+
+def test_run_should_not_exceed_cycle_budget(cpu):
+    # V1 += 1, skip jump when V1 == 0x40, jump back to start
+    program = bytes([0x71, 0x01, 0x31, 0x40, 0x12, 0x00])
+    runner = load(cpu, program)
+    reference = CPU(HeadlessScreen())
+    reference.reset()
+    reference.memory[0x200:0x200 + len(program)] = program
+
+    for _ in range(10):
+        assert runner.run(8) == 8
+        for _ in range(8):
+            reference.execute_opcode()
+        assert (cpu.v[1], cpu.pc) == (reference.v[1], reference.pc)
+
+
+def test_step_should_not_fuse_beyond_budget(cpu):
+    runner = load(cpu, bytes([0x61, 0x0A, 0x62, 0x0B]))
+
+    assert runner.step(1) == 1
+    assert (cpu.v[1], cpu.v[2], cpu.pc) == (0x0A, 0x00, 0x202)
+
+
+def test_fusion_can_be_disabled(cpu):
+    runner = load(cpu, bytes([0x61, 0x0A, 0x62, 0x0B]))
+    runner.fuse = False
+
+    assert runner.step() == 1
+    assert cpu.pc == 0x202
+
+
+def test_jump_into_middle_of_fused_sequence_should_execute_single_instructions(cpu):
+    # V1 = 1, V2 = 2, V3 += 1, jump to the second instruction
+    runner = load(cpu, bytes([0x61, 0x01, 0x62, 0x02, 0x73, 0x01, 0x12, 0x02]))
+
+    assert runner.run(4) == 4
+    assert runner.step() == 1
+    assert (cpu.v[2], cpu.pc) == (2, 0x204)
+    assert cpu.v[3] == 1
+
+
+def test_writes_should_invalidate_decoded_instructions(cpu):
+    # V0 = 1, V1 = 5, I = 0x208, store V0..V1 at I, then instruction 6005 written over 0x208 is executed
+    runner = load(cpu, bytes([0x60, 0x60, 0x61, 0x05, 0xA2, 0x08, 0xF1, 0x55, 0x60, 0x00, 0x12, 0x08]))
+    runner.decode(0x208)
+
+    runner.run(5)
+
+    assert cpu.v[0] == 0x05
+
+
+def test_call_should_invalidate_decoded_stack(cpu):
+    runner = load(cpu, bytes([0x22, 0x04, 0x00, 0x00, 0x00, 0xEE]))
+    sp = cpu.sp
+    runner.decode(sp)
+
+    runner.step()
+
+    assert runner.handlers[sp] is None
+
+
+@pytest.mark.parametrize("rom", ["IBM.ch8", "Sirpinski.ch8"])
+def test_predecoded_engine_should_match_reference(rom):
+    assert check_rom(ROMS / rom, "predecoded", instructions=20000) is None
+
+
+def test_predecoded_engine_should_match_reference_on_random_roms():
+    assert campaign(20, "predecoded", jobs=1) == []
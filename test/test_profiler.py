@@ -0,0 +1,127 @@
+import json
+import pstats
+import time
+from pathlib import Path
+
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.emulation_thread import EmulationThread
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.headless import CYCLES_PER_FRAME, emulate_frame
+from PyCHIP8.profiler import SUBSYSTEMS, ProfiledCPU, SubsystemProfiler
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledRunner, compile_rom
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture
+def profiler():
+    return SubsystemProfiler()
+
+
+@pytest.fixture
+def cpu(profiler):
+    cpu = ProfiledCPU(HeadlessScreen(), profiler=profiler)
+    cpu.reset()
+    cpu.load_rom(ROMS / "IBM.ch8")
+    return cpu
+
+
+def test_profiled_cpu_should_execute_like_cpu(cpu):
+    reference = CPU(HeadlessScreen())
+    reference.reset()
+    reference.load_rom(ROMS / "IBM.ch8")
+
+    for _ in range(20):
+        emulate_frame(cpu)
+        emulate_frame(reference)
+
+    assert cpu.state == reference.state
+    assert (cpu.screen.bitmap == reference.screen.bitmap).all()
+
+
+def test_profiled_cpu_should_attribute_fetch_execute_and_draw(cpu, profiler):
+    executed = profiler.timed("execute", emulate_frame)(cpu, 100)
+
+    assert (profiler.calls["fetch"], profiler.calls["execute"]) == (executed, 1)
+    # IBM logo is drawn from six sprites
+    assert profiler.calls["draw"] == 6
+    assert profiler.totals["fetch"] > 0 and profiler.totals["draw"] > 0 and profiler.totals["execute"] > 0
+
+
+def test_unknown_instruction_should_still_be_reported(cpu):
+    cpu.memory[cpu.pc:cpu.pc + 2] = bytes([0x00, 0x01])
+
+    with pytest.raises(CPU.UnknownInstructionException):
+        cpu.execute_opcode()
+
+
+def test_nested_time_should_be_attributed_once(profiler):
+    profiler.add("execute", 100)
+    profiler.add("draw", 30, parent="execute")
+    profiler.stop()
+
+    report = profiler.report()
+
+    assert (profiler.totals["execute"], profiler.totals["draw"]) == (70, 30)
+    assert sum(values["ns"] for values in report["subsystems"].values()) == report["wall_ns"]
+    assert list(report["subsystems"]) == list(SUBSYSTEMS) + ["other"]
+
+
+def test_timed_function_should_return_its_result(profiler):
+    measured = profiler.timed("events", lambda value: value * 2)
+
+    assert measured(21) == 42
+    assert profiler.calls["events"] == 1
+
+
+def test_report_should_be_saved_as_json(tmp_path, profiler):
+    profiler.add("sleep", 1000)
+    profiler.stop()
+
+    profiler.save(tmp_path / "profile.json")
+
+    report = json.loads((tmp_path / "profile.json").read_text())
+    assert report["subsystems"]["sleep"] == {"ns": 1000, "calls": 1, "share": 1000 / report["wall_ns"]}
+    assert not (tmp_path / "profile.prof").exists()
+    assert profiler.table()[0].split() == ["subsystem", "ms", "share", "calls", "us/call"]
+
+
+def test_cprofile_window_should_be_bounded(tmp_path):
+    profiler = SubsystemProfiler(cprofile_seconds=0)
+    cpu = ProfiledCPU(HeadlessScreen(), profiler=profiler)
+    cpu.reset()
+    cpu.load_rom(ROMS / "IBM.ch8")
+
+    profiler.tick()
+    emulate_frame(cpu)
+    profiler.tick()
+    emulate_frame(cpu)
+    profiler.stop()
+    profiler.save(tmp_path / "profile.json")
+
+    stats = pstats.Stats(str(tmp_path / "profile.prof"))
+    # ProfiledCPU.execute_opcode and CPU.execute_opcode, each called once per instruction of a single frame
+    calls = [values[1] for function, values in stats.stats.items() if function[2] == "execute_opcode"]
+    assert calls == [CYCLES_PER_FRAME] * 2
+
+
+def test_emulation_thread_should_attribute_frames_and_pacing(profiler):
+    cpu = ProfiledCPU(HeadlessScreen(), profiler=profiler)
+    cpu.reset()
+    rom = (ROMS / "IBM.ch8").read_bytes()
+    cpu.load_rom(ROMS / "IBM.ch8")
+    runner = CompiledRunner(cpu, compile_rom(rom, cache_dir=None))
+    thread = EmulationThread(cpu, FrameBuffer(cpu.screen.bitmap.shape), runner=runner, frame_rate=100,
+                             profiler=profiler)
+
+    thread.start()
+    while profiler.calls["pacing"] < 3 and thread.is_alive():
+        time.sleep(0.01)
+    thread.stop()
+
+    assert thread.error is None
+    assert profiler.calls["fetch"] == 0
+    assert profiler.calls["execute"] >= 3
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.quirks import PROFILES, Quirks, parse_overrides, rom_hash, select_quirks
+from PyCHIP8.screen import HeadlessScreen
+
+IBM_ROM = (Path(__file__).parent.parent / "ROMS" / "IBM.ch8").read_bytes()
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    return cpu
+
+
+def test_select_quirks_should_use_database_of_known_roms():
+    assert rom_hash(IBM_ROM) == "1ba58656810b67fd131eb9af3e3987863bf26c90"
+    assert select_quirks(IBM_ROM) == PROFILES["chip8"]
+    assert select_quirks(b"\x12\x00") == Quirks()
+
+
+def test_select_quirks_should_prefer_given_profile_and_apply_overrides():
+    quirks = select_quirks(IBM_ROM, "schip", {"clip_sprites": False})
+
+    assert quirks == Quirks(jump_uses_vx=True)
+
+    with pytest.raises(ValueError):
+        select_quirks(IBM_ROM, "unknown")
+
+
+def test_parse_overrides():
+    assert parse_overrides(["shift_uses_vy=1", "clip_sprites=off"]) == {"shift_uses_vy": True, "clip_sprites": False}
+
+    with pytest.raises(ValueError):
+        parse_overrides(["shift_uses_vy"])
+    with pytest.raises(ValueError):
+        parse_overrides(["unknown=1"])
+
+
+def test_lookup_tables_should_be_shared_by_cpus_with_the_same_quirks(cpu):
+    other = CPU(HeadlessScreen())
+
+    cpu.set_quirks(PROFILES["chip8"])
+    other.set_quirks(Quirks(shift_uses_vy=True, load_store_increments_i=True, clip_sprites=True))
+
+    assert cpu.opcode_lookup is other.opcode_lookup
+    assert cpu.leading_f_opcodes_lookup is other.leading_f_opcodes_lookup
+    assert cpu.opcode_lookup is not CPU.OPCODE_LOOKUP
+    assert CPU.OPCODE_LOOKUP[0xD] is CPU.draw_sprite
+
+
+def test_default_quirks_should_use_class_lookup_tables(cpu):
+    assert cpu.quirks == Quirks()
+    assert cpu.opcode_lookup is CPU.OPCODE_LOOKUP
+    assert cpu.leading_eight_opcodes_lookup is CPU.LEADING_EIGHT_OPCODES_LOOKUP
+
+
+def test_shift_uses_vy(cpu):
+    cpu.set_quirks(Quirks(shift_uses_vy=True))
+    cpu.v[1] = 0x00
+    cpu.v[2] = 0x81
+
+    cpu.execute_instruction(0x812E)
+    assert cpu.v[1] == 0x02
+    assert cpu.v[0xF] == 1
+
+    cpu.execute_instruction(0x8126)
+    assert cpu.v[1] == 0x40
+    assert cpu.v[0xF] == 1
+    assert cpu.v[2] == 0x81
+
+
+def test_load_store_increments_i(cpu):
+    cpu.set_quirks(Quirks(load_store_increments_i=True))
+    cpu.i = 0x300
+    cpu.v[0:3] = bytes([1, 2, 3])
+
+    cpu.execute_instruction(0xF255)
+    assert cpu.memory[0x300:0x303] == bytes([1, 2, 3])
+    assert cpu.i == 0x303
+
+    cpu.i = 0x300
+    cpu.execute_instruction(0xF165)
+    assert cpu.i == 0x302
+
+
+def test_jump_uses_vx(cpu):
+    cpu.set_quirks(Quirks(jump_uses_vx=True))
+    cpu.v[0] = 0x10
+    cpu.v[3] = 0x02
+
+    cpu.execute_instruction(0xB340)
+
+    assert cpu.pc == 0x342
+
+
+def test_clip_sprites(cpu):
+    cpu.set_quirks(Quirks(clip_sprites=True))
+    width, height = cpu.screen.width, cpu.screen.height
+    cpu.i = 0x300
+    cpu.memory[0x300:0x302] = bytes([0xFF, 0xFF])
+    cpu.v[0] = width - 4
+    cpu.v[1] = height - 1
+
+    cpu.execute_instruction(0xD012)
+
+    assert cpu.screen.bitmap.sum() == 4
+    assert cpu.screen.bitmap[width - 4:, height - 1].all()
+    assert not cpu.screen.bitmap[:4, :].any()
+    assert cpu.v[0xF] == 0
+
+    cpu.execute_instruction(0xD012)
+    assert cpu.screen.bitmap.sum() == 0
+    assert cpu.v[0xF] == 1
+
+
+def test_clone_should_keep_quirks(cpu):
+    cpu.set_quirks(PROFILES["schip"])
+
+    clone = cpu.clone(HeadlessScreen())
+
+    assert clone.quirks == PROFILES["schip"]
+    assert clone.opcode_lookup is cpu.opcode_lookup
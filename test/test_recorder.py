@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from PyCHIP8.recorder import RAW_FRAME_HEADER, AnimationWriter, RawWriter, Recorder, create_writer
+
+
+def read_raw_recording(path):
+    data = path.read_bytes()
+    frames = []
+    offset = 0
+    while offset < len(data):
+        length, width, height, repeats = RAW_FRAME_HEADER.unpack_from(data, offset)
+        offset += RAW_FRAME_HEADER.size
+        bitmap = np.frombuffer(data, dtype="uint8", count=length, offset=offset).reshape((width, height))
+        frames.append((bitmap, repeats))
+        offset += length
+    return frames
+
+
+def test_recorder_should_deduplicate_consecutive_frames(tmp_path):
+    path = tmp_path / "recording.raw"
+    recorder = Recorder(path)
+    recorder.start()
+
+    bitmap = np.zeros((64, 32), dtype="int8")
+    recorder.capture(bitmap)
+    recorder.capture(bitmap)
+    bitmap[3, 4] = 1
+    recorder.capture(bitmap)
+    # Captured frame is a copy, so changing bitmap later does not change recording
+    bitmap[3, 4] = 0
+    recorder.stop()
+
+    frames = read_raw_recording(path)
+    assert [repeats for _, repeats in frames] == [2, 1]
+    assert not frames[0][0].any()
+    assert frames[1][0][3, 4] == 1
+    assert recorder.frames_written == 2
+
+
+def test_capture_should_drop_frames_when_queue_is_full(tmp_path):
+    recorder = Recorder(tmp_path / "recording.raw", queue_size=2)
+    bitmap = np.zeros((64, 32), dtype="int8")
+
+    # Recorder thread is not started, so nothing is taken from the queue
+    assert recorder.capture(bitmap)
+    assert recorder.capture(bitmap)
+    assert not recorder.capture(bitmap)
+    assert recorder.frames_dropped == 1
+
+    recorder.start()
+    recorder.stop()
+    assert recorder.frames_written == 1
+
+
+def test_create_writer_should_select_format_by_suffix(tmp_path):
+    writer = create_writer(tmp_path / "recording.bin")
+    assert isinstance(writer, RawWriter)
+    writer.close()
+
+
+def test_animation_writer(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "recording.gif"
+
+    writer = create_writer(path, scale=2)
+    assert isinstance(writer, AnimationWriter)
+    for value in (0, 1):
+        writer.write(np.full((64, 32), value, dtype="int8"), 3)
+    writer.close()
+
+    with image.open(path) as animation:
+        assert animation.size == (128, 64)
+        assert animation.n_frames == 2
+
+
+def test_animation_writer_should_stop_at_max_frames(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "recording.gif"
+
+    writer = AnimationWriter(path, max_frames=2)
+    assert [writer.write(np.full((64, 32), value % 2, dtype="int8"), 1) for value in range(4)] == [
+        True, True, False, False]
+    assert writer.frames_dropped == 2
+    writer.close()
+
+    with image.open(path) as animation:
+        assert animation.n_frames == 2
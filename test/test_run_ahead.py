@@ -0,0 +1,150 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8.conf import Constants
+from PyCHIP8.cpu import CPU
+from PyCHIP8.emulation_thread import EmulationThread
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.headless import create_headless_cpu, emulate_frame
+from PyCHIP8.predecoder import PredecodedRunner
+from PyCHIP8.run_ahead import RunAhead
+from PyCHIP8.screen import HeadlessScreen
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+# Draws digit 0 at random positions
+RANDOM_SPRITES = bytes([0xC0, 0x3F, 0xC1, 0x1F, 0xD0, 0x15, 0x12, 0x00])
+
+# Counts V3 up by one while waiting 10 frames for delay timer, then patches 7301 into 7305 and waits again
+SELF_MODIFYING = bytes([
+    0x60, 0x0A, 0xF0, 0x15, 0x73, 0x01, 0xF0, 0x07, 0x30, 0x00, 0x12, 0x04,
+    0xA2, 0x04, 0x60, 0x73, 0x61, 0x05, 0xF1, 0x55, 0x60, 0x0A, 0xF0, 0x15, 0x12, 0x04,
+])
+
+
+def create_cpu(rom: bytes) -> CPU:
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.memory[0x200:0x200 + len(rom)] = rom
+    return cpu
+
+
+def test_displayed_frame_should_be_ahead_of_real_frame():
+    cpu = create_headless_cpu(ROMS / "IBM.ch8")
+    reference = create_headless_cpu(ROMS / "IBM.ch8")
+    run_ahead = RunAhead(cpu, 2)
+
+    for frame in range(10):
+        emulate_frame(cpu)
+        run_ahead.save()
+        run_ahead.run()
+        displayed = cpu.screen.bitmap.copy()
+        run_ahead.restore()
+
+        emulate_frame(reference)
+        assert cpu.state == reference.state
+        assert np.array_equal(cpu.screen.bitmap, reference.screen.bitmap)
+        ahead = reference.clone()
+        emulate_frame(ahead)
+        emulate_frame(ahead)
+        assert np.array_equal(displayed, ahead.screen.bitmap)
+
+
+def test_real_frames_should_repeat_random_numbers_of_displayed_frames():
+    cpu = create_cpu(RANDOM_SPRITES)
+    run_ahead = RunAhead(cpu, 1)
+    displayed = []
+
+    for frame in range(10):
+        emulate_frame(cpu)
+        assert not displayed or np.array_equal(cpu.screen.bitmap, displayed[-1])
+        run_ahead.save()
+        run_ahead.run()
+        displayed.append(cpu.screen.bitmap.copy())
+        run_ahead.restore()
+
+
+def test_restore_should_switch_screen_mode_back():
+    cpu = create_cpu(bytes([0x00, 0xFF, 0x12, 0x02]))
+    run_ahead = RunAhead(cpu, 1)
+    cpu.screen.bitmap[3, 3] = 1
+
+    run_ahead.save()
+    run_ahead.run()
+    assert cpu.screen.mode == Constants.EXTENDED_MODE
+    run_ahead.restore()
+
+    assert cpu.screen.mode == Constants.NORMAL_MODE
+    assert cpu.screen.bitmap.shape == (64, 32)
+    assert np.argwhere(cpu.screen.bitmap).tolist() == [[3, 3]]
+    assert cpu.pc == 0x200
+
+
+def test_runner_should_forget_memory_written_ahead():
+    cpu = create_cpu(SELF_MODIFYING)
+    reference = create_cpu(SELF_MODIFYING)
+    runner = PredecodedRunner(cpu)
+    reference_runner = PredecodedRunner(reference)
+    run_ahead = RunAhead(cpu, 3, runner=runner)
+
+    for frame in range(20):
+        emulate_frame(cpu, runner=runner)
+        run_ahead.save()
+        run_ahead.run()
+        run_ahead.restore()
+
+        emulate_frame(reference, runner=reference_runner)
+        assert cpu.state == reference.state
+    assert cpu.memory[0x205] == 0x05
+
+
+def test_stopped_cpu_should_stay_stopped():
+    cpu = create_cpu(bytes([0x00, 0xE0, 0x00, 0xFD]))
+    run_ahead = RunAhead(cpu, 3, cycles_per_frame=1)
+
+    run_ahead.save()
+    assert run_ahead.run() == 2
+    run_ahead.restore()
+
+    assert not cpu.running
+    assert cpu.pc == 0x200
+
+
+def test_frames_ahead_should_be_positive():
+    with pytest.raises(ValueError):
+        RunAhead(create_cpu(RANDOM_SPRITES), 0)
+
+
+def test_emulation_thread_should_publish_frames_ahead():
+    cpu = create_headless_cpu(ROMS / "IBM.ch8")
+    frames = FrameBuffer(cpu.screen.bitmap.shape)
+    thread = EmulationThread(cpu, frames, frame_rate=200, run_ahead=2)
+
+    thread.start()
+    while frames.frames_produced < 5 and thread.is_alive():
+        time.sleep(0.01)
+    thread.stop()
+
+    assert thread.error is None
+    assert frames.acquire() is not None
+
+
+def test_key_taken_ahead_should_be_taken_again_by_real_frame():
+    # Wait for key in V1, then loop
+    cpu = create_cpu(bytes([0xF1, 0x0A, 0x12, 0x02]))
+    run_ahead = RunAhead(cpu, 2)
+    emulate_frame(cpu)
+    assert cpu.halted
+
+    cpu.keypad.press(0x9)
+    run_ahead.save()
+    run_ahead.run()
+    assert cpu.v[1] == 0x9
+    run_ahead.restore()
+
+    assert cpu.halted and cpu.v[1] == 0
+    emulate_frame(cpu)
+    assert cpu.v[1] == 0x9
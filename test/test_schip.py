@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from PyCHIP8.cpu import CPU, LARGE_FONT_ADDRESS
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.screen import BACKING_SHAPE, HeadlessScreen
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    return cpu
+
+
+def test_large_sprite_should_be_16_by_16(cpu):
+    cpu.execute_instruction(0x00FF)
+    # Left byte set on every other row
+    cpu.memory[0x300:0x320] = bytes([0xFF, 0x00, 0x00, 0x00] * 8)
+    cpu.i = 0x300
+    cpu.v[0], cpu.v[1] = 120, 10
+
+    cpu.execute_instruction(0xD010)
+
+    drawn = np.argwhere(cpu.screen.bitmap)
+    assert sorted({x for x, _ in drawn}) == list(range(120, 128))
+    assert sorted({y for _, y in drawn}) == list(range(10, 26, 2))
+    assert cpu.v[0xF] == 0
+
+    cpu.execute_instruction(0xD010)
+    assert not cpu.screen.bitmap.any()
+    assert cpu.v[0xF] == 1
+
+
+def test_large_sprite_should_wrap_around(cpu):
+    cpu.memory[0x300:0x320] = bytes([0xFF, 0xFF] * 16)
+    cpu.i = 0x300
+    cpu.v[0], cpu.v[1] = 56, 24
+
+    cpu.execute_instruction(0xD010)
+
+    assert cpu.screen.bitmap.sum() == 256
+    assert cpu.screen.bitmap[63, 31] and cpu.screen.bitmap[0, 0] and cpu.screen.bitmap[7, 7]
+
+
+def test_large_font_digit(cpu):
+    cpu.v[3] = 8
+    cpu.execute_instruction(0xF330)
+    assert cpu.i == LARGE_FONT_ADDRESS + 80
+
+    cpu.execute_instruction(0xD00A)
+
+    rows = np.packbits(cpu.screen.bitmap[:8, :10].T.astype("uint8"), axis=1).ravel()
+    assert bytes(rows) == bytes([0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF, 0xC3, 0xC3, 0xFF, 0xFF])
+
+
+def test_large_font_should_survive_subroutine_calls(cpu):
+    # CALL 0x208, FX30 with V3 = 0, draw, RET at 0x208
+    cpu.memory[0x200:0x20A] = bytes([0x22, 0x08, 0xF3, 0x30, 0xD0, 0x0A, 0x12, 0x06, 0x00, 0xEE])
+
+    for _ in range(4):
+        cpu.execute_opcode()
+
+    rows = np.packbits(cpu.screen.bitmap[:8, :10].T.astype("uint8"), axis=1).ravel()
+    assert bytes(rows) == bytes([0xFF, 0xFF, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF])
+
+
+def test_mode_switch_should_reuse_backing_array(cpu):
+    screen = cpu.screen
+    backing = screen.bitmap.base
+    screen.bitmap[0, 0] = 1
+
+    cpu.execute_instruction(0x00FF)
+    assert screen.bitmap.shape == BACKING_SHAPE
+    assert screen.bitmap.base is backing
+    assert not screen.bitmap.any()
+
+    screen.bitmap[100, 50] = 1
+    cpu.execute_instruction(0x00FE)
+    assert screen.bitmap.shape == (64, 32)
+    assert screen.bitmap.base is backing
+    assert not screen.bitmap.any()
+
+
+def test_scrolls_should_move_along_screen_axes(cpu):
+    cpu.execute_instruction(0x00FF)
+    bitmap = cpu.screen.bitmap
+    bitmap[10, 20] = 1
+
+    cpu.execute_instruction(0x00C3)
+    assert np.argwhere(bitmap).tolist() == [[10, 23]]
+
+    cpu.execute_instruction(0x00FB)
+    assert np.argwhere(bitmap).tolist() == [[14, 23]]
+
+    cpu.execute_instruction(0x00FC)
+    cpu.execute_instruction(0x00FC)
+    assert np.argwhere(bitmap).tolist() == [[6, 23]]
+
+    cpu.execute_instruction(0x00C3)
+    cpu.execute_instruction(0x00FC)
+    cpu.execute_instruction(0x00FC)
+    assert np.argwhere(bitmap).tolist() == []
+
+
+def test_frame_buffer_should_not_allocate_on_mode_switch(cpu):
+    screen = cpu.screen
+    frames = FrameBuffer(screen.bitmap.shape)
+    screen.bitmap = frames.publish(screen.bitmap)
+    backings = {id(frames.back.base)}
+
+    for opcode in (0x00FF, 0x00FE, 0x00FF):
+        cpu.execute_instruction(opcode)
+        screen.bitmap[1, 1] = 1
+        screen.bitmap = frames.publish(screen.bitmap)
+        frame = frames.acquire()
+        assert frame.shape == screen.bitmap.shape
+        assert frame[1, 1] == 1
+        backings.update(id(array.base) for array in (frame, screen.bitmap))
+
+    assert len(backings) == 3
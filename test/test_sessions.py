@@ -0,0 +1,83 @@
+import pytest
+
+from PyCHIP8.sessions import PAUSED, RUNNING, STOPPED, SessionManager
+
+# V0 += 1, jump back to start
+LOOP = bytes([0x70, 0x01, 0x12, 0x00])
+# Exit (SCHIP 00FD)
+EXIT = bytes([0x00, 0xFD])
+
+
+@pytest.fixture
+def manager():
+    return SessionManager(cache_dir=None)
+
+
+def test_sessions_of_the_same_rom_should_share_compiled_program(manager):
+    first = manager.start(LOOP)
+    second = manager.start(LOOP)
+    other = manager.start(EXIT)
+
+    assert first.runner.program is second.runner.program
+    assert first.runner.owners is second.runner.owners
+    assert other.runner.program is not first.runner.program
+    assert len(manager.roms) == 2
+
+    manager.stop(first.id)
+    assert len(manager.roms) == 2
+    manager.stop(second.id)
+    assert len(manager.roms) == 1
+
+
+def test_scheduler_should_split_batches_by_priority(manager):
+    low = manager.start(LOOP)
+    high = manager.start(LOOP, priority=3)
+
+    assert manager.run(400) == 400
+
+    assert low.frames == 100
+    assert high.frames == 300
+    assert high.instructions == pytest.approx(3 * low.instructions, rel=0.1)
+
+
+def test_pause_and_resume(manager):
+    paused = manager.start(LOOP)
+    running = manager.start(LOOP)
+    manager.pause(paused.id)
+
+    manager.run(10)
+    assert paused.state == PAUSED
+    assert (paused.frames, running.frames) == (0, 10)
+
+    # Resumed session joins at current pass instead of catching up
+    manager.resume(paused.id)
+    manager.run(10)
+    assert paused.state == RUNNING
+    assert paused.frames == pytest.approx(5, abs=1)
+
+
+def test_stopped_sessions_are_not_scheduled(manager):
+    session = manager.start(EXIT)
+
+    assert manager.run(10) == 1
+    assert session.state == STOPPED
+    assert manager.stats()[0]["state"] == STOPPED
+
+
+def test_errors(manager):
+    session = manager.start(LOOP, name="loop")
+
+    with pytest.raises(ValueError):
+        manager.set_priority(session.id, 0)
+    with pytest.raises(KeyError):
+        manager.pause(session.id + 1)
+    assert manager.stats()[0]["rom"] == "loop"
+
+
+def test_serve_should_pace_sessions(manager):
+    sessions = [manager.start(LOOP) for _ in range(4)]
+
+    manager.serve(duration=0.25, frame_rate=60)
+
+    for session in sessions:
+        assert 10 <= session.frames <= 17
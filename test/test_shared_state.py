@@ -0,0 +1,83 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8 import shared_state
+from PyCHIP8.headless import create_headless_cpu, emulate_frame
+
+# Shared memory is available since Python 3.8
+pytest.importorskip("multiprocessing.shared_memory")
+
+ROMS = Path(__file__).parent.parent / "ROMS"
+
+
+@pytest.fixture
+def cpu():
+    cpu = create_headless_cpu(ROMS / "IBM.ch8")
+    for _ in range(30):
+        emulate_frame(cpu)
+    return cpu
+
+
+@pytest.fixture
+def writer():
+    writer = shared_state.SharedStateWriter()
+    yield writer
+    writer.close()
+
+
+def test_reader_should_see_published_frame_and_state(cpu, writer):
+    writer.publish(cpu)
+    reader = shared_state.SharedStateReader(writer.name)
+
+    state = reader.read_state()
+    frame = reader.read_frame()
+
+    assert np.array_equal(frame, cpu.screen.bitmap)
+    assert (state["frames"], state["pc"], state["i"]) == (1, cpu.pc, cpu.i)
+    assert state["v"] == bytes(cpu.v)
+    assert state["memory"] == bytes(cpu.memory)
+    reader.close()
+
+
+def test_validate_should_detect_publish_during_read(cpu, writer):
+    writer.publish(cpu)
+    reader = shared_state.SharedStateReader(writer.name)
+
+    sequence = reader.begin()
+    frame = reader.frame()
+    assert reader.validate(sequence)
+    writer.publish(cpu)
+    assert not reader.validate(sequence)
+
+    del frame
+    reader.close()
+
+
+def test_reader_should_reject_foreign_segment():
+    from multiprocessing import shared_memory
+
+    segment = shared_memory.SharedMemory(create=True, size=shared_state.SEGMENT_SIZE)
+    try:
+        with pytest.raises(ValueError):
+            shared_state.SharedStateReader(segment.name)
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+def test_frame_should_be_readable_from_other_process(cpu, writer):
+    writer.publish(cpu)
+    code = ("from PyCHIP8.shared_state import SharedStateReader\n"
+            "reader = SharedStateReader({!r})\n"
+            "print(int(reader.read_frame().sum()), reader.read_state()['pc'])\n"
+            "reader.close()\n").format(writer.name)
+
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, cwd=str(Path(__file__).parent.parent), check=True)
+
+    assert result.stdout.split() == [str(int(cpu.screen.bitmap.sum())), str(cpu.pc)]
+    assert "Traceback" not in result.stderr
@@ -0,0 +1,130 @@
+import socket
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.streaming import (DELTA, HEADER, KEY_MASK, KEYFRAME, FrameDecoder, FrameEncoder, StreamServer, decode_runs,
+                               decode_varints, encode_runs, encode_varints, receive_message)
+
+IBM_ROM = Path(__file__).parent.parent / "ROMS" / "IBM.ch8"
+
+
+@pytest.fixture
+def bitmap():
+    bitmap = np.zeros((64, 32), dtype="int8")
+    bitmap[10:20, 5] = 1
+    bitmap[63, 31] = 1
+    return bitmap
+
+
+def test_varints_round_trip():
+    values = [0, 1, 127, 128, 300, 8192]
+
+    encoded = encode_varints(values)
+
+    assert len(encoded) == 1 + 1 + 1 + 2 + 2 + 2
+    assert decode_varints(encoded) == values
+
+
+def test_runs_round_trip(bitmap):
+    pixels = bitmap.ravel()
+
+    encoded = encode_runs(pixels)
+
+    assert np.array_equal(decode_runs(encoded, pixels.size), pixels)
+    assert np.array_equal(decode_runs(encode_runs(1 - pixels), pixels.size), 1 - pixels)
+    with pytest.raises(ValueError):
+        decode_runs(encoded, pixels.size + 1)
+
+
+def test_runs_round_trip_with_planes():
+    pixels = np.array([0, 2, 3, 1, 1, 0, 2, 2], dtype="int8")
+
+    encoded = encode_runs(pixels)
+
+    assert np.array_equal(decode_runs(encoded, pixels.size), pixels)
+    # Frames using only the first plane do not encode empty second plane
+    assert encode_runs(pixels & 1) == encoded[:len(encode_runs(pixels & 1))]
+    assert len(encode_runs(pixels & 1)) < len(encoded)
+    with pytest.raises(ValueError):
+        decode_runs(encoded + encode_runs(pixels), pixels.size)
+
+
+def test_encoder_should_stream_frames_with_planes(bitmap):
+    encoder = FrameEncoder()
+    decoder = FrameDecoder()
+    bitmap[3, 4] = 2
+    bitmap[5, 6] = 3
+
+    for frame_bitmap in (bitmap, bitmap ^ np.int8(2)):
+        message = encoder.encode(frame_bitmap)
+        kind, frame_number, width, height, _ = HEADER.unpack_from(message)
+        frame = decoder.decode(kind, frame_number, width, height, message[HEADER.size:])
+        assert np.array_equal(frame, frame_bitmap)
+
+
+def test_encoder_should_skip_unchanged_frames(bitmap):
+    encoder = FrameEncoder()
+    decoder = FrameDecoder()
+
+    first = encoder.encode(bitmap)
+    assert first[0] == KEYFRAME
+    assert encoder.encode(bitmap) is None
+
+    bitmap[0, 0] = 1
+    delta = encoder.encode(bitmap)
+    assert delta[0] == DELTA
+    assert len(delta) < len(first) + 4
+
+    for message in (first, delta):
+        kind, frame_number, width, height, _ = HEADER.unpack_from(message)
+        frame = decoder.decode(kind, frame_number, width, height, message[HEADER.size:])
+    assert np.array_equal(frame, bitmap)
+    assert decoder.frame_number == 3
+
+
+def test_encoder_should_send_periodic_keyframes(bitmap):
+    encoder = FrameEncoder(keyframe_interval=2)
+
+    kinds = []
+    for column in range(5):
+        bitmap[column, 0] ^= 1
+        kinds.append(encoder.encode(bitmap)[0])
+
+    assert kinds == [KEYFRAME, DELTA, KEYFRAME, DELTA, KEYFRAME]
+
+
+def test_server_should_stream_frames_and_receive_keys():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.load_rom(IBM_ROM)
+    server = StreamServer(cpu, "127.0.0.1:0")
+    serving = threading.Thread(target=server.serve)
+    serving.start()
+
+    try:
+        with socket.create_connection(server.address, timeout=5) as connection:
+            decoder = FrameDecoder()
+            frame = None
+            while frame is None or not frame.any():
+                frame = decoder.decode(*receive_message(connection))
+
+            connection.sendall(KEY_MASK.pack(0b101))
+            deadline = time.perf_counter() + 5
+            while cpu.keypad.mask != 0b101 and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            pressed = cpu.keypad.mask
+    finally:
+        cpu.exit()
+        serving.join(5)
+
+    assert pressed == 0b101
+    # Keys pressed by client are released when it disconnects
+    assert cpu.keypad.mask == 0
+    assert np.array_equal(frame, cpu.screen.bitmap)
+    assert server.messages_sent >= 1
@@ -0,0 +1,92 @@
+import logging
+import time
+
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.emulation_thread import EmulationThread
+from PyCHIP8.frame_buffer import FrameBuffer
+from PyCHIP8.headless import emulate_frame
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.telemetry import Histogram, Telemetry
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    # Jump to itself
+    cpu.memory[0x200:0x202] = bytes([0x12, 0x00])
+    return cpu
+
+
+def test_histogram():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1, 1.5, 3, 3, 10):
+        histogram.record(value)
+
+    assert histogram.counts == [2, 1, 2, 1]
+    assert histogram.count == 6
+    assert histogram.max == 10
+    assert histogram.mean == pytest.approx(19 / 6)
+    assert histogram.percentile(50) == 2
+    assert histogram.percentile(99) == 10
+    assert Histogram((1,)).percentile(50) == 0
+
+
+def test_rates_and_stats():
+    telemetry = Telemetry()
+    telemetry.window_start = 0
+    for _ in range(6):
+        telemetry.record_frame(8, 0.001, 0.0005)
+    telemetry.record_presentation(0.003)
+
+    telemetry.update_rates(0.1)
+    stats = telemetry.stats()
+
+    assert stats["instructions_per_second"] == pytest.approx(480)
+    assert stats["frames_per_second"] == pytest.approx(60)
+    assert stats["emulation_ms"]["p50"] == 1
+    assert stats["lateness_ms"]["max"] == pytest.approx(0.5)
+    assert stats["presentation_ms"]["p99"] == 4
+    assert telemetry.lines()[0].startswith("IPS 480/")
+
+
+def test_target_should_follow_clock_speed():
+    telemetry = Telemetry(clock_speed=1000)
+
+    assert telemetry.stats()["target_instructions_per_second"] == 1000
+    assert telemetry.lines()[0].startswith("IPS 0/1000 ")
+
+
+def test_tick_should_log_after_interval(caplog):
+    telemetry = Telemetry(log_interval=0)
+    telemetry.record_frame(8, 0.001, 0)
+
+    with caplog.at_level(logging.INFO, logger="PyCHIP8.telemetry"):
+        assert telemetry.tick()
+
+    assert "IPS" in caplog.text
+    assert not Telemetry(log_interval=60).tick()
+
+
+def test_emulate_frame_should_return_executed_instructions(cpu):
+    assert emulate_frame(cpu, 8) == 8
+
+    cpu.exit()
+    assert emulate_frame(cpu, 8) == 1
+
+
+def test_emulation_thread_should_record_frames(cpu):
+    telemetry = Telemetry()
+    emulation = EmulationThread(cpu, FrameBuffer(cpu.screen.bitmap.shape), frame_rate=200, clock_speed=1000,
+                                telemetry=telemetry)
+    emulation.start()
+    deadline = time.monotonic() + 5
+    while telemetry.frames < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    emulation.stop(1)
+
+    assert telemetry.instructions >= 15
+    assert telemetry.emulation_time.count == telemetry.frames
+    assert telemetry.stats()["target_instructions_per_second"] == 1000
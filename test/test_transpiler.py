@@ -0,0 +1,133 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from PyCHIP8.conf import Config
+from PyCHIP8.cpu import CPU
+from PyCHIP8.headless import emulate_frame
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledRunner, cache_path, compile_rom, find_blocks, translate_rom
+
+SELF_MODIFYING_ROM = bytes([
+    0x60, 0x70,  # 0x200: V0 = 0x70
+    0x61, 0x01,  # 0x202: V1 = 0x01
+    0xA2, 0x0A,  # 0x204: I = 0x20A
+    0xF1, 0x55,  # 0x206: store V0, V1 at 0x20A, instruction there becomes 0x7001 (V0 += 1)
+    0x12, 0x0A,  # 0x208: jump to 0x20A
+    0x60, 0x05,  # 0x20A: V0 = 0x05
+    0x12, 0x0C,  # 0x20C: jump to 0x20C
+])
+
+
+def create_cpu(rom: bytes) -> CPU:
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    cpu.memory[Config.PROGRAM_COUNTER:Config.PROGRAM_COUNTER + len(rom)] = rom
+    return cpu
+
+
+def test_find_blocks_should_follow_jumps_and_both_branches_of_skips():
+    rom = bytes([
+        0x30, 0x01,  # 0x200: skip if V0 == 1
+        0x12, 0x08,  # 0x202: jump to 0x208
+        0x22, 0x0A,  # 0x204: call 0x20A
+        0x12, 0x04,  # 0x206: jump to 0x204
+        0x12, 0x08,  # 0x208: jump to 0x208
+        0x00, 0xEE,  # 0x20A: return
+    ])
+
+    blocks = find_blocks(rom)
+
+    assert sorted(blocks) == [0x200, 0x202, 0x204, 0x206, 0x208, 0x20A]
+    assert blocks[0x200].successors == [0x202, 0x204]
+
+
+def test_find_blocks_should_leave_key_wait_to_interpreter():
+    rom = bytes([0x60, 0x01, 0xF0, 0x0A, 0x12, 0x04])
+
+    blocks = find_blocks(rom)
+
+    assert blocks[0x200].instructions == [(0x200, 0x6001)]
+    assert blocks[0x200].next == 0x202
+    assert 0x202 not in blocks
+    assert 0x204 in blocks
+
+
+@pytest.mark.parametrize("rom_path", ["ROMS/IBM.ch8", "ROMS/Sirpinski.ch8"])
+def test_compiled_rom_should_behave_like_interpreter(rom_path):
+    rom = Path(rom_path).read_bytes()
+    interpreted = create_cpu(rom)
+    compiled = create_cpu(rom)
+    runner = CompiledRunner(compiled, compile_rom(rom, cache_dir=None))
+
+    executed = runner.run(20000)
+    for _ in range(executed):
+        interpreted.execute_opcode()
+
+    assert compiled.pc == interpreted.pc
+    assert compiled.sp == interpreted.sp
+    assert compiled.i == interpreted.i
+    assert compiled.v == interpreted.v
+    assert compiled.memory == interpreted.memory
+    assert np.array_equal(compiled.screen.bitmap, interpreted.screen.bitmap)
+
+
+def test_runner_should_interpret_overwritten_code():
+    cpu = create_cpu(SELF_MODIFYING_ROM)
+    runner = CompiledRunner(cpu, compile_rom(SELF_MODIFYING_ROM, cache_dir=None))
+
+    runner.run(10)
+
+    assert 0x20A not in runner.blocks
+    assert cpu.v[0] == 0x71
+    assert cpu.pc == 0x20C
+
+
+def test_compile_rom_should_cache_module(tmp_path):
+    rom = Path("ROMS/IBM.ch8").read_bytes()
+
+    program = compile_rom(rom, cache_dir=tmp_path)
+
+    assert cache_path(rom, tmp_path).read_text() == translate_rom(rom)
+    assert sorted(compile_rom(rom, cache_dir=tmp_path).blocks) == sorted(program.blocks)
+
+
+def test_compiled_add_to_index_should_wrap_like_interpreter():
+    rom = bytes([0x60, 0x20, 0xF0, 0x1E, 0x12, 0x04])  # V0 = 0x20, I += V0, loop
+    interpreted = create_cpu(rom)
+    compiled = create_cpu(rom)
+    interpreted.i = compiled.i = 0xFFF0
+    runner = CompiledRunner(compiled, compile_rom(rom, cache_dir=None))
+
+    executed = runner.run(3)
+    for _ in range(executed):
+        interpreted.execute_opcode()
+
+    assert 0x200 in runner.blocks
+    assert compiled.i == interpreted.i == 0x0010
+
+
+def test_compiled_frame_should_execute_as_many_instructions_as_interpreted():
+    rom = bytes([0x70, 0x01] * 31 + [0x12, 0x00])  # V0 += 1 31 times, jump back to start
+    interpreted = create_cpu(rom)
+    compiled = create_cpu(rom)
+    runner = CompiledRunner(compiled, compile_rom(rom, cache_dir=None))
+    assert 0x200 in runner.blocks
+
+    for _ in range(10):
+        assert emulate_frame(compiled, 8, runner) == emulate_frame(interpreted, 8) == 8
+        assert compiled.pc == interpreted.pc
+        assert compiled.v == interpreted.v
+    # Blocks stopped by budget continue in compiled remainders, not in the interpreter
+    assert runner.remainder(compiled.pc) is not None
+
+
+def test_compile_rom_should_cache_modules_per_load_address(tmp_path):
+    rom = bytes([0x12, 0x00])  # jump to 0x200, a block only when ROM is loaded at 0x200
+
+    compile_rom(rom, cache_dir=tmp_path)
+    program = compile_rom(rom, cache_dir=tmp_path, start=0x600)
+
+    assert cache_path(rom, tmp_path) != cache_path(rom, tmp_path, 0x600)
+    assert sorted(program.blocks) == [0x600]
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from PyCHIP8.cpu import CPU
+from PyCHIP8.screen import HeadlessScreen
+from PyCHIP8.transpiler import CompiledRunner, compile_rom, find_blocks
+
+
+@pytest.fixture
+def cpu():
+    cpu = CPU(HeadlessScreen())
+    cpu.reset()
+    return cpu
+
+
+def load(cpu, program: bytes):
+    cpu.memory[0x200:0x200 + len(program)] = program
+
+
+def test_long_load_should_reach_whole_memory(cpu):
+    load(cpu, bytes([0xF0, 0x00, 0xFF, 0xF0, 0x60, 0x2A, 0xF0, 0x55]))
+
+    for _ in range(3):
+        cpu.execute_opcode()
+
+    assert cpu.i == 0xFFF0
+    assert cpu.pc == 0x208
+    assert cpu.memory[0xFFF0] == 0x2A
+
+
+def test_only_f000_should_be_long_load(cpu):
+    load(cpu, bytes([0xF1, 0x00, 0x12, 0x34]))
+
+    with pytest.raises(CPU.UnknownInstructionException):
+        cpu.execute_opcode()
+    assert cpu.i == 0
+
+
+def test_skip_should_skip_whole_long_instruction(cpu):
+    load(cpu, bytes([0x30, 0x00, 0xF0, 0x00, 0x12, 0x34, 0x00, 0xE0]))
+
+    cpu.execute_opcode()
+
+    assert cpu.pc == 0x206
+
+
+def test_register_range_store_and_load(cpu):
+    cpu.v[2:5] = bytes([1, 2, 3])
+    cpu.i = 0x300
+
+    cpu.execute_instruction(0x5242)
+    assert bytes(cpu.memory[0x300:0x303]) == bytes([1, 2, 3])
+
+    cpu.execute_instruction(0x5422)
+    assert bytes(cpu.memory[0x300:0x303]) == bytes([3, 2, 1])
+
+    cpu.v[7:10] = bytes(3)
+    cpu.execute_instruction(0x5793)
+    assert bytes(cpu.v[7:10]) == bytes([3, 2, 1])
+    assert cpu.i == 0x300
+
+
+def test_drawing_on_both_planes(cpu):
+    cpu.memory[0x300:0x302] = bytes([0b10000000, 0b11000000])
+    cpu.i = 0x300
+
+    cpu.execute_instruction(0xF301)
+    cpu.execute_instruction(0xD001)
+
+    assert cpu.screen.bitmap[0, 0] == 0b11
+    assert cpu.screen.bitmap[1, 0] == 0b10
+    assert cpu.v[0xF] == 0
+
+    # Drawing only on plane 1 turns off its pixels and leaves plane 0 as it was
+    cpu.i = 0x301
+    cpu.execute_instruction(0xF201)
+    cpu.execute_instruction(0xD001)
+
+    assert cpu.screen.bitmap[0, 0] == 0b01
+    assert cpu.screen.bitmap[1, 0] == 0
+    assert cpu.v[0xF] == 1
+
+
+def test_wrapped_and_clipped_sprites(cpu):
+    cpu.memory[0x300] = 0xFF
+    cpu.i = 0x300
+    cpu.v[0] = 60
+
+    cpu.execute_instruction(0xD011)
+    assert np.flatnonzero(cpu.screen.bitmap[:, 0]).tolist() == [0, 1, 2, 3, 60, 61, 62, 63]
+
+    cpu.screen.clear()
+    cpu.draw_clipped_sprite()
+    assert np.flatnonzero(cpu.screen.bitmap[:, 0]).tolist() == [60, 61, 62, 63]
+
+
+def test_scroll_and_clear_should_change_only_selected_planes(cpu):
+    screen = cpu.screen
+    screen.bitmap[:, :] = 0b11
+
+    cpu.execute_instruction(0xF101)
+    cpu.execute_instruction(0x00FB)
+
+    # Scroll right moves pixels along x, columns on the left are vacated
+    assert (screen.bitmap[:4, :] == 0b10).all()
+    assert (screen.bitmap[4:, :] == 0b11).all()
+
+    cpu.execute_instruction(0x00E0)
+    assert (screen.bitmap[4:, :] == 0b10).all()
+
+
+def test_compiled_blocks_should_not_decode_long_instruction_argument():
+    rom = bytes([0x30, 0x00, 0xF0, 0x00, 0x12, 0x34, 0x60, 0x01, 0x12, 0x06])
+
+    blocks = find_blocks(rom)
+
+    assert 0x204 not in blocks
+    assert 0x206 in blocks
+
+
+def test_compiled_runner_should_drop_blocks_overwritten_by_register_range_store(cpu):
+    # V0 = 0x60, V1 = 0x05, I = 0x20A, save V0 - V1 over instruction at 0x20A, loop at 0x20A
+    rom = bytes([0x60, 0x60, 0x61, 0x05, 0xA2, 0x0A, 0x50, 0x12, 0x12, 0x0A, 0x60, 0x01, 0x12, 0x0A])
+    load(cpu, rom)
+    runner = CompiledRunner(cpu, compile_rom(rom, cache_dir=None))
+
+    runner.run(10)
+
+    assert 0x20A not in runner.blocks
+    assert cpu.v[0] == 0x05